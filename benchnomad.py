@@ -0,0 +1,740 @@
+#!/usr/bin/env python3
+
+# /// script
+# requires-python = ">=3.12"
+# dependencies = [
+#    "namemaker"
+# ]
+# ///
+
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import cache
+from typing import Any
+
+import csv2trav
+from nomadread import read_planets
+from nomaddice import nomad_dice
+from nomadgen import (
+    NameSet,
+    Planet,
+    Sector,
+    SectorBounds,
+    SerialNameSet,
+    StarHex,
+    make_planet,
+    make_stars,
+    sector,
+    star_systems,
+)
+from nomadout import (
+    write_as_json,
+    write_as_short_text,
+    write_as_text,
+    write_as_xsv,
+)
+
+###################### CONSTANTS ###############################
+
+DEFAULT_SIZES: str = "8x10,32x40,100x100,1000x1000"
+DEFAULT_NAMELIST: str = "names/kobol-names.txt"
+DEFAULT_REPEAT: int = 5
+DEFAULT_WARMUP: int = 1
+DEFAULT_TOLERANCE: float = 0.25
+SEED: int = 20240601
+
+# size of the sector used to benchmark writers and readers
+WRITER_BOUNDS: SectorBounds = SectorBounds(height=40, width=32)
+
+DICE_VARIANTS: list[tuple[int, int]] = [(1, 0), (2, 0), (2, +1), (2, -1), (2, +2)]
+
+# (benchmark name, python arguments, modules the command must not import,
+# most times as long as `python -c pass` its imports may take).  Each run
+# is timed against a bare startup just before it, so a slow or busy
+# machine slows both; the budgets are about twice the ratios on a laptop.
+IMPORT_CHECKS: list[tuple[str, list[str], set[str], float]] = [
+    (
+        "import[nomaddice]",
+        ["-c", "import nomaddice"],
+        {"nomadtables", "namemaker"},
+        2.5,
+    ),
+    (
+        "import[nomadgen]",
+        ["-c", "import nomadgen"],
+        {"namemaker", "json", "csv"},
+        11.0,
+    ),
+    (
+        "import[nomadsec]",
+        ["-c", "import nomadsec"],
+        {
+            "namemaker",
+            "json",
+            "csv",
+            "argparse",
+            "pyarrow",
+            "nomadmask",
+            "nomadgen",
+            "nomadtables",
+        },
+        6.0,
+    ),
+    (
+        "nomadsec.py --help",
+        ["nomadsec.py", "--help"],
+        {
+            "namemaker",
+            "json",
+            "csv",
+            "pyarrow",
+            "nomadmask",
+            "nomadcompress",
+            "concurrent.futures",
+            "nomadgen",
+            "nomadtables",
+            "nomaddice",
+        },
+        6.5,
+    ),
+]
+
+# The bare startup the import budgets are measured against
+STARTUP_ARGS: list[str] = ["-c", "pass"]
+
+DICE_CALLS: int = 100_000
+PLANET_CALLS: int = 10_000
+NAME_CALLS: int = 1_000
+# names in the exclude list read by the exclude benchmarks
+EXCLUDE_NAMES: int = 100_000
+TRADE_TURNS: int = 10
+EVOLVE_TURNS: int = 100
+
+####################### HARNESS ###############################
+
+
+@dataclass(frozen=True, slots=True)
+class Benchmark:
+    name: str
+    # called once per repeat (untimed); returns the timed callable
+    setup: Callable[[], Callable[[], object]]
+    # operations performed by one call of the timed callable, or a
+    # function that counts them once setup has run
+    number: int | Callable[[], int] = 1
+
+
+@dataclass(frozen=True, slots=True)
+class BenchResult:
+    name: str
+    number: int
+    times: list[float]
+
+    @property
+    def best(self) -> float:
+        return min(self.times) / self.number
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.times) / self.number
+
+    @property
+    def stdev(self) -> float:
+        if len(self.times) < 2:
+            return 0.0
+        return statistics.stdev(self.times) / self.number
+
+    def as_dict(self) -> dict:
+        return {
+            "number": self.number,
+            "times": self.times,
+            "best": self.best,
+            "median": self.median,
+            "stdev": self.stdev,
+        }
+
+
+def run_benchmark(bench: Benchmark, warmup: int, repeat: int) -> BenchResult:
+    times: list[float] = []
+    for i in range(warmup + repeat):
+        random.seed(SEED)
+        fn = bench.setup()
+        start: float = time.perf_counter()
+        fn()
+        elapsed: float = time.perf_counter() - start
+        if i >= warmup:
+            times.append(elapsed)
+    number: int = bench.number() if callable(bench.number) else bench.number
+    return BenchResult(bench.name, number, times)
+
+
+def _import_time(pyargs: list[str]) -> tuple[float, set[str]]:
+    # seconds spent in top-level imports, and every module imported
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *pyargs],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us: int = 0
+    seen: set[str] = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        seen.add(module.strip())
+        if not module.startswith("  "):
+            total_us += int(cumulative)
+    return total_us / 1e6, seen
+
+
+def run_import_benchmark(
+    name: str,
+    pyargs: list[str],
+    forbidden: set[str],
+    budget: float,
+    warmup: int,
+    repeat: int,
+) -> dict:
+    """
+    Run `python -X importtime` on `pyargs` and time the imports it does,
+    also noting any `forbidden` module it imports and its median time as
+    a multiple of `python -c pass` run just before each repeat, which
+    should be at most `budget`.
+    """
+    times: list[float] = []
+    ratios: list[float] = []
+    seen: set[str] = set()
+    for i in range(warmup + repeat):
+        startup, _ = _import_time(STARTUP_ARGS)
+        elapsed, modules = _import_time(pyargs)
+        seen |= modules
+        if i >= warmup:
+            times.append(elapsed)
+            ratios.append(elapsed / startup)
+    result: dict = BenchResult(name, 1, times).as_dict()
+    result["forbidden"] = sorted(seen & forbidden)
+    result["startup_ratio"] = statistics.median(ratios)
+    result["budget"] = budget
+    return result
+
+
+def over_budget(result: dict) -> bool:
+    return result.get("startup_ratio", 0.0) > result.get("budget", math.inf)
+
+
+####################### BENCHMARKS ##############################
+
+
+def parse_size(size: str) -> SectorBounds:
+    width, height = size.lower().split("x")
+    return SectorBounds(height=int(height), width=int(width))
+
+
+def _sample_sector(bounds: SectorBounds) -> tuple[list[Planet], list[StarHex]]:
+    random.seed(SEED)
+    return sector(SerialNameSet(), bounds=bounds)
+
+
+# The functions below only list their benchmarks.  Anything costly to
+# set up (sample sectors, name models, stores) is built by a cached
+# fixture on first use, so `-k` skips the setup of what it filters out.
+
+
+def dice_benchmarks() -> list[Benchmark]:
+    def setup(nkeep: int, nadv: int) -> Callable[[], object]:
+        def fn() -> None:
+            for _ in range(DICE_CALLS):
+                nomad_dice(nkeep, nadv)
+
+        return fn
+
+    return [
+        Benchmark(
+            f"nomad_dice[{nkeep}D{nadv:+d}]",
+            lambda nkeep=nkeep, nadv=nadv: setup(nkeep, nadv),
+            DICE_CALLS,
+        )
+        for nkeep, nadv in DICE_VARIANTS
+    ]
+
+
+def generation_benchmarks(sizes: list[SectorBounds]) -> list[Benchmark]:
+    star: StarHex = StarHex(x=1, y=1, name="Star")
+    result: list[Benchmark] = [
+        Benchmark(
+            "make_planet",
+            lambda: lambda: [
+                make_planet(star, star.name) for _ in range(PLANET_CALLS)
+            ],
+            PLANET_CALLS,
+        )
+    ]
+    for b in sizes:
+        tag: str = f"{b.width}x{b.height}"
+        result.extend(
+            [
+                Benchmark(
+                    f"make_stars[{tag}]",
+                    lambda b=b: lambda: make_stars(SerialNameSet(), bounds=b),
+                ),
+                Benchmark(
+                    f"sector[{tag}]",
+                    lambda b=b: lambda: sector(SerialNameSet(), bounds=b),
+                ),
+                Benchmark(
+                    f"star_systems[{tag}]",
+                    lambda b=b: lambda: list(star_systems(SerialNameSet(), bounds=b)),
+                ),
+            ]
+        )
+    return result
+
+
+def writer_benchmarks() -> list[Benchmark]:
+    fixture = cache(lambda: _sample_sector(WRITER_BOUNDS))
+    writers: dict[str, Callable[[io.StringIO, list, list], None]] = {
+        "write_as_text": lambda f, planets, _: write_as_text(f, planets),
+        "write_as_short_text": lambda f, planets, _: write_as_short_text(f, planets),
+        "write_as_xsv": lambda f, planets, _: write_as_xsv(f, planets),
+        "write_as_json": lambda f, planets, stars: write_as_json(
+            f, WRITER_BOUNDS, planets, stars
+        ),
+    }
+
+    def collect() -> Callable[[], object]:
+        planets, stars = fixture()
+        return lambda: Sector(WRITER_BOUNDS, stars, planets)
+
+    def write(w: Callable[[io.StringIO, list, list], None]) -> Callable[[], object]:
+        planets, stars = fixture()
+        return lambda: w(io.StringIO(), planets, stars)
+
+    def count() -> int:
+        return len(fixture()[0])
+
+    return [
+        Benchmark("Sector", collect, count),
+        *(
+            Benchmark(name, lambda w=w: write(w), count)
+            for name, w in writers.items()
+        ),
+    ]
+
+
+def compress_benchmarks() -> list[Benchmark]:
+    import importlib.util
+
+    from nomadcompress import CODECS, BlockCompressor, Codec
+
+    fixture = cache(lambda: _sample_sector(WRITER_BOUNDS))
+
+    def write(codec: Codec) -> Callable[[], object]:
+        planets, _ = fixture()
+
+        def fn() -> None:
+            raw = BlockCompressor(io.BytesIO(), codec, closefd=False)
+            with io.TextIOWrapper(raw, encoding="UTF-8") as f:
+                write_as_xsv(f, planets)
+
+        return fn
+
+    return [
+        Benchmark(
+            f"write_as_xsv[{codec.name}]",
+            lambda codec=codec: write(codec),
+            lambda: len(fixture()[0]),
+        )
+        for codec in CODECS
+        if not codec.package or importlib.util.find_spec(codec.package)
+    ]
+
+
+def name_benchmarks(namelist: str) -> list[Benchmark]:
+    @cache
+    def namemaker() -> Callable[[str], NameSet]:
+        from namemaker import make_name_set  # type: ignore
+
+        return make_name_set
+
+    @cache
+    def native() -> Callable[..., Any]:
+        from nomadnames import open_model, open_names
+
+        open_model(namelist)  # compile it once, as the first run would
+        return open_names
+
+    def load() -> Callable[[], object]:
+        make_name_set = namemaker()
+        return lambda: make_name_set(namelist)
+
+    def make_names() -> Callable[[], object]:
+        nameset: NameSet = namemaker()(namelist)
+        return lambda: [nameset.make_name() for _ in range(NAME_CALLS)]
+
+    def load_native() -> Callable[[], object]:
+        open_names = native()
+        return lambda: open_names(namelist)
+
+    def make_native_names() -> Callable[[], object]:
+        nameset: NameSet = native()(namelist)
+        return lambda: [nameset.make_name() for _ in range(NAME_CALLS)]
+
+    def make_native_batch() -> Callable[[], object]:
+        nameset = native()(namelist)
+        return lambda: nameset.make_names(NAME_CALLS)
+
+    return [
+        Benchmark("NameSet.load", load),
+        Benchmark("NameSet.make_name", make_names, NAME_CALLS),
+        Benchmark("MarkovNameSet.load", load_native),
+        Benchmark("MarkovNameSet.make_name", make_native_names, NAME_CALLS),
+        Benchmark("MarkovNameSet.make_names", make_native_batch, NAME_CALLS),
+    ]
+
+
+def exclude_benchmarks(namelist: str) -> list[Benchmark]:
+    # the benchmarks hold on to the directory, which goes when they do
+    tempdir = tempfile.TemporaryDirectory()
+
+    @cache
+    def fixture() -> tuple[list[str], str, str]:
+        from nomadexclude import build_store
+        from nomadnames import open_names
+
+        # names from an earlier run, not the ones the benchmarks go on to make
+        rng = random.Random(SEED + 1)
+        names: list[str] = open_names(namelist, rng=rng).make_names(EXCLUDE_NAMES)
+        path: str = os.path.join(tempdir.name, "exclude.nexclude")
+        with open(path, "wb") as f:
+            f.write(build_store(names))
+        return names, "\n".join(names) + "\n", path
+
+    def read_list() -> Callable[[], object]:
+        from nomadnames import open_names
+        from nomadsec import read_exclude_file
+
+        _, text, _ = fixture()
+        nameset: NameSet = open_names(namelist)
+        return lambda: read_exclude_file(nameset, io.StringIO(text))
+
+    def open_close() -> Callable[[], object]:
+        from nomadexclude import open_store
+
+        _, _, path = fixture()
+        return lambda: open_store(path).close()
+
+    def make_excluded_names() -> Callable[[], object]:
+        from nomadexclude import ExcludedNameSet, open_store
+        from nomadnames import open_names
+
+        _, _, path = fixture()
+        nameset = ExcludedNameSet(open_names(namelist), open_store(path))
+        return lambda: [nameset.make_name() for _ in range(NAME_CALLS)]
+
+    def lookup() -> Callable[[], object]:
+        from nomadexclude import open_store
+
+        names, _, path = fixture()
+        store = open_store(path)
+        return lambda: [name in store for name in names[:NAME_CALLS]]
+
+    return [
+        Benchmark("read_exclude_file", read_list),
+        Benchmark("ExcludeStore.open", open_close),
+        Benchmark("ExcludeStore.contains", lookup, NAME_CALLS),
+        Benchmark("ExcludedNameSet.make_name", make_excluded_names, NAME_CALLS),
+    ]
+
+
+def map_benchmarks() -> list[Benchmark]:
+    @cache
+    def fixture() -> tuple[list, Any]:
+        from nomadmap import map_hexes, map_view
+
+        planets, stars = _sample_sector(WRITER_BOUNDS)
+        hexes = map_hexes(Sector(WRITER_BOUNDS, stars, planets))
+        return hexes, map_view(WRITER_BOUNDS)
+
+    def draw(fmt: str) -> Callable[[], object]:
+        from nomadmap import render
+
+        hexes, view = fixture()
+        return lambda: render(hexes, WRITER_BOUNDS, view, fmt)
+
+    return [
+        Benchmark(f"nomadmap.render[{fmt}]", lambda fmt=fmt: draw(fmt))
+        for fmt in ("svg", "png")
+    ]
+
+
+def trade_benchmarks() -> list[Benchmark]:
+    @cache
+    def fixture() -> Sector:
+        planets, stars = _sample_sector(WRITER_BOUNDS)
+        return Sector(WRITER_BOUNDS, stars, planets)
+
+    def build() -> Callable[[], object]:
+        from nomadtrade import TradeNetwork
+
+        sec: Sector = fixture()
+        return lambda: TradeNetwork(sec)
+
+    def run() -> Callable[[], object]:
+        from nomadtrade import TradeNetwork, simulate
+
+        network = TradeNetwork(fixture())
+        return lambda: simulate(network, TRADE_TURNS)
+
+    return [
+        Benchmark("TradeNetwork", build),
+        Benchmark("nomadtrade.simulate", run, TRADE_TURNS),
+    ]
+
+
+def evolve_benchmarks() -> list[Benchmark]:
+    @cache
+    def fixture() -> Sector:
+        planets, stars = _sample_sector(WRITER_BOUNDS)
+        return Sector(WRITER_BOUNDS, stars, planets)
+
+    def advance() -> Callable[[], object]:
+        from nomadevolve import SectorState
+
+        state = SectorState(fixture())
+        rng = random.Random(SEED)
+
+        def fn() -> None:
+            for _ in range(EVOLVE_TURNS):
+                state.advance(rng)
+
+        return fn
+
+    def snapshot() -> Callable[[], object]:
+        from nomadevolve import SectorState
+
+        return SectorState(fixture()).snapshot
+
+    return [
+        Benchmark("SectorState.advance", advance, EVOLVE_TURNS),
+        Benchmark(
+            "SectorState.snapshot", snapshot, lambda: len(fixture().planets)
+        ),
+    ]
+
+
+def csv2trav_benchmarks() -> list[Benchmark]:
+    @cache
+    def fixture() -> tuple[list[Planet], str]:
+        planets, _ = _sample_sector(WRITER_BOUNDS)
+        csvfile = io.StringIO()
+        write_as_xsv(csvfile, planets)
+        return planets, csvfile.getvalue()
+
+    def write() -> Callable[[], object]:
+        planets, _ = fixture()
+        return lambda: csv2trav.write_genie(io.StringIO(), planets)
+
+    def convert() -> Callable[[], object]:
+        _, csvdata = fixture()
+        return lambda: csv2trav.write_genie(
+            io.StringIO(), read_planets(io.StringIO(csvdata))
+        )
+
+    return [
+        Benchmark("csv2trav.write_genie", write, lambda: len(fixture()[0])),
+        Benchmark("csv2trav[csv]", convert, lambda: len(fixture()[0])),
+    ]
+
+
+######################### REPORTS ######################################
+
+
+def compare(
+    results: dict[str, dict], baseline: dict[str, dict], tolerance: float
+) -> list[str]:
+    """
+    Return the names of benchmarks whose median per-operation time
+    is more than `tolerance` (a fraction) slower than the baseline.
+    """
+    regressions: list[str] = []
+    for name, r in results.items():
+        if name not in baseline:
+            continue
+        ratio: float = r["median"] / baseline[name]["median"]
+        r["baseline_ratio"] = ratio
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.3f} {unit}"
+    return f"{seconds / 1e-9:8.1f} ns"
+
+
+def report(out, results: dict[str, dict], regressions: list[str]) -> None:
+    width: int = max((len(n) for n in results), default=10)
+    out.write(
+        f"{'Benchmark':{width}s}  {'best/op':>11s}  {'median/op':>11s}  vs. base\n"
+    )
+    for name, r in results.items():
+        ratio: str = (
+            f"{r['baseline_ratio']:.2f}x" if "baseline_ratio" in r else "-"
+        )
+        flag: str = "  REGRESSION" if name in regressions else ""
+        if r.get("forbidden"):
+            flag += f" (imports {', '.join(r['forbidden'])})"
+        if over_budget(r):
+            flag += (
+                f" ({r['startup_ratio']:.1f}x startup, budget {r['budget']:.1f}x)"
+            )
+        out.write(
+            f"{name:{width}s}  {_format_time(r['best'])}  "
+            f"{_format_time(r['median'])}  {ratio:>8s}{flag}\n"
+        )
+
+
+######################### MAIN #########################################
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the `nomadsec.py` generation pipeline"
+    )
+    parser.add_argument(
+        "-s",
+        "--sizes",
+        help=f"comma-separated WIDTHxHEIGHT map sizes (default {DEFAULT_SIZES})",
+        default=DEFAULT_SIZES,
+    )
+    parser.add_argument(
+        "-n",
+        "--namelist",
+        help="text file providing example names",
+        default=DEFAULT_NAMELIST,
+    )
+    parser.add_argument(
+        "-k",
+        "--filter",
+        help="only run benchmarks whose names match this regular expression",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        help="timed runs of each benchmark",
+        default=DEFAULT_REPEAT,
+        type=int,
+    )
+    parser.add_argument(
+        "-w",
+        "--warmup",
+        help="untimed runs of each benchmark",
+        default=DEFAULT_WARMUP,
+        type=int,
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="write results as JSON to this file",
+        type=argparse.FileType(mode="w", encoding="UTF-8"),
+    )
+    parser.add_argument(
+        "-b",
+        "--baseline",
+        help="JSON results of an earlier run to compare against",
+        type=argparse.FileType(mode="r", encoding="UTF-8"),
+    )
+    parser.add_argument(
+        "-t",
+        "--tolerance",
+        help="fraction slower than the baseline that counts as a regression",
+        default=DEFAULT_TOLERANCE,
+        type=float,
+    )
+    args = parser.parse_args()
+
+    benchmarks: list[Benchmark] = [
+        *dice_benchmarks(),
+        *generation_benchmarks([parse_size(s) for s in args.sizes.split(",")]),
+        *writer_benchmarks(),
+        *compress_benchmarks(),
+        *name_benchmarks(args.namelist),
+        *exclude_benchmarks(args.namelist),
+        *csv2trav_benchmarks(),
+        *map_benchmarks(),
+        *trade_benchmarks(),
+        *evolve_benchmarks(),
+    ]
+    if args.filter:
+        benchmarks = [b for b in benchmarks if re.search(args.filter, b.name)]
+
+    results: dict[str, dict] = {}
+    for bench in benchmarks:
+        print(f"running {bench.name} ...", file=sys.stderr)
+        results[bench.name] = run_benchmark(
+            bench, args.warmup, args.repeat
+        ).as_dict()
+
+    for name, pyargs, forbidden, budget in IMPORT_CHECKS:
+        if args.filter and not re.search(args.filter, name):
+            continue
+        print(f"running {name} ...", file=sys.stderr)
+        results[name] = run_import_benchmark(
+            name, pyargs, forbidden, budget, args.warmup, args.repeat
+        )
+
+    # importing a forbidden module or going over budget is a regression
+    # whatever the baseline
+    regressions: list[str] = [
+        n
+        for n, r in results.items()
+        if r.get("forbidden") or over_budget(r)
+    ]
+    if args.baseline:
+        with args.baseline as infile:
+            baseline: dict[str, dict] = json.load(infile)["results"]
+        # a check can be both over budget and slower than the baseline
+        regressions = list(
+            dict.fromkeys(regressions + compare(results, baseline, args.tolerance))
+        )
+
+    report(sys.stdout, results, regressions)
+
+    if args.output:
+        with args.output as outfile:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "timestamp": time.time(),
+                    "repeat": args.repeat,
+                    "warmup": args.warmup,
+                    "results": results,
+                    "regressions": regressions,
+                },
+                outfile,
+                indent=4,
+            )
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
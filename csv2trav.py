@@ -6,10 +6,19 @@
 # ///
 
 import argparse
-import csv
-import json
-import sys
-from dataclasses import dataclass
+from collections.abc import Iterable
+
+from nomadcompress import CompressedFileType
+from nomadread import SectorFormat, read_planets
+from nomadgen import Planet
+from nomadtables import (
+    Characteristic,
+    TechAge,
+    TradeClass,
+    TRADE_CLASS_TO_ABBREVS,
+    WorldTag,
+    world_tag_mask,
+)
 
 
 EXTENDED_HEX = "0123456789ABCDEFGHJKLMNPQRSTUVWXYZ"
@@ -22,116 +31,111 @@ GENIE_HEADER = (
 )
 
 
-TRADE_CLASS_CODES: dict[str, str] = {
-    "Agricultural": "Ag",
-    "Garden": "Ga",
-    "Non-Agricultural": "Na",
-    "Non-Industrial": "Ni",
-    "Industrial": "In",
-    "Poor": "Po",
-    "Resource": "Re",
-    "Rich": "Ri",
-}
-
-
-CHARA_TO_TRADE_CODES: dict[str, str] = {
-    "Asteroid": "As",
-    "Desert": "De",
-    "Iceball": "IC",
-    "Marginal": "Ba",
-    "Ocean": "Wa",
+CHARA_TO_TRADE_CODES: dict[Characteristic, str] = {
+    Characteristic.ASTEROID: "As",
+    Characteristic.DESERT: "De",
+    Characteristic.ICEBALL: "IC",
+    Characteristic.MARGINAL: "Ba",
+    Characteristic.OCEAN: "Wa",
 }
 
 PLANET_SIZE_DEFAULT: int = 8
 
 ATMOSPHERE_CODE_DEFAULT: int = 6
 
-CHARA_TO_ATMOSPHERE_CODES: dict[str, int] = {
-    "Asteroid": 0,
-    "Corrosive": 11,
-    "Desert": 6,
-    "Iceball": 3,
-    "Inert": 10,
-    "Marginal": 5,
-    "Ocean": 6,
-    "Prime": 6,
-    "Primordial": 10,
-    "Rockball": 3,
-    "Tainted": 7,
+CHARA_TO_ATMOSPHERE_CODES: dict[Characteristic, int] = {
+    Characteristic.ASTEROID: 0,
+    Characteristic.CORROSIVE: 11,
+    Characteristic.DESERT: 6,
+    Characteristic.ICEBALL: 3,
+    Characteristic.INERT: 10,
+    Characteristic.MARGINAL: 5,
+    Characteristic.OCEAN: 6,
+    Characteristic.PRIME: 6,
+    Characteristic.PRIMORDIAL: 10,
+    Characteristic.ROCKBALL: 3,
+    Characteristic.TAINTED: 7,
 }
 
 HYDROGRAPHIC_CODE_DEFAULT: int = 5
 
-CHARA_TO_HYDROGRAPHICS_CODES: dict[str, int] = {
-    "Asteroid": 0,
-    "Corrosive": 11,
-    "Desert": 1,
-    "Iceball": 6,
-    "Inert": 4,
-    "Marginal": 5,
-    "Ocean": 9,
-    "Prime": 7,
-    "Primordial": 8,
-    "Rockball": 2,
-    "Tainted": 3,
+CHARA_TO_HYDROGRAPHICS_CODES: dict[Characteristic, int] = {
+    Characteristic.ASTEROID: 0,
+    Characteristic.CORROSIVE: 11,
+    Characteristic.DESERT: 1,
+    Characteristic.ICEBALL: 6,
+    Characteristic.INERT: 4,
+    Characteristic.MARGINAL: 5,
+    Characteristic.OCEAN: 9,
+    Characteristic.PRIME: 7,
+    Characteristic.PRIMORDIAL: 8,
+    Characteristic.ROCKBALL: 2,
+    Characteristic.TAINTED: 3,
 }
 
 GOVERNMENT_CODE_DEFAULT: int = 5
 
-GOV_TAGS_TO_CODES: dict[str, int] = {
-    "Athenian Democracy": 2,
-    "Corporate": 1,
-    "Captive Government": 6,
-    "Charismatic Dictator": 10,
-    "Democracy": 4,
-    "Feudal": 5,
-    "Multiple Govs.": 7,
-    "Theocracy": 13,
+GOV_TAGS_TO_CODES: dict[WorldTag, int] = {
+    WorldTag.ATHENIAN_DEMOCRACY: 2,
+    WorldTag.CORPORATE: 1,
+    WorldTag.CAPTIVE_GOVERNMENT: 6,
+    WorldTag.CHARISMATIC_DICTATOR: 10,
+    WorldTag.DEMOCRACY: 4,
+    WorldTag.FEUDAL: 5,
+    WorldTag.MULTIPLE_GOVS: 7,
+    WorldTag.THEOCRACY: 13,
 }
 
 LAW_CODE_DEFAULT: int = 5
 
-LAW_TAGS_TO_CODES: dict[str, int] = {
-    "Liberal": 2,
-    "Minimal Laws": 1,
-    "Police State": 9,
-    "Restrictive Laws": 7,
+LAW_TAGS_TO_CODES: dict[WorldTag, int] = {
+    WorldTag.LIBERAL: 2,
+    WorldTag.MINIMAL_LAWS: 1,
+    WorldTag.POLICE_STATE: 9,
+    WorldTag.RESTRICTIVE_LAWS: 7,
 }
 
 
-AMBER_ZONE_TAGS: set[str] = {
-    "Civil War",
-    "Feral World",
-    "Impending Doom",
-    "Police State",
-    "Radioactive",
-    "Xenophobia",
-    "Hostile Space",
-    "Slavery",
+AMBER_ZONE_TAGS: set[WorldTag] = {
+    WorldTag.CIVIL_WAR,
+    WorldTag.FERAL_WORLD,
+    WorldTag.IMPENDING_DOOM,
+    WorldTag.POLICE_STATE,
+    WorldTag.RADIOACTIVE,
+    WorldTag.XENOPHOBIA,
+    WorldTag.HOSTILE_SPACE,
+    WorldTag.SLAVERY,
 }
 
 
-RED_ZONE_TAGS: set[str] = {
-    "Quarantined",
-    "Zombies",
+RED_ZONE_TAGS: set[WorldTag] = {
+    WorldTag.QUARANTINED,
+    WorldTag.ZOMBIES,
 }
 
 
-TECH_AGE_CODES_TO_LEVELS: dict[str, int] = {
-    "NT": 0,
-    "EP": 1,
-    "LP": 2,
-    "EM": 3,
-    "LM": 4,
-    "EA": 5,
-    "LA": 6,
-    "ES": 7,
-    "LS": 8,
-    "EI": 9,
-    "LI": 10,
-    "EG": 12,
-    "LG": 15,
-    "C": 20,
+# One bit per tag (see `world_tag_mask()`), so each check is one AND
+GOV_TAGS_MASK: int = world_tag_mask(GOV_TAGS_TO_CODES)
+LAW_TAGS_MASK: int = world_tag_mask(LAW_TAGS_TO_CODES)
+AMBER_ZONE_MASK: int = world_tag_mask(AMBER_ZONE_TAGS)
+RED_ZONE_MASK: int = world_tag_mask(RED_ZONE_TAGS)
+
+
+TECH_AGE_TO_LEVELS: dict[TechAge, int] = {
+    TechAge.NO_TECHNOLOGY: 0,
+    TechAge.EARLY_PRIMITIVE: 1,
+    TechAge.LATE_PRIMITIVE: 2,
+    TechAge.EARLY_MECHANICAL: 3,
+    TechAge.LATE_MECHANICAL: 4,
+    TechAge.EARLY_ATOMIC: 5,
+    TechAge.LATE_ATOMIC: 6,
+    TechAge.EARLY_SPACE: 7,
+    TechAge.LATE_SPACE: 8,
+    TechAge.EARLY_INTERSTELLAR: 9,
+    TechAge.LATE_INTERSTELLAR: 10,
+    TechAge.EARLY_GALACTIC: 12,
+    TechAge.LATE_GALACTIC: 15,
+    TechAge.COSMIC: 20,
 }
 
 TECH_LEVEL_DEFAULT: int = 8
@@ -149,49 +153,35 @@ TECH_LEVEL_HIGH_TECH: int = 10
 TECH_LEVEL_LOW_TECH: int = 2
 
 
-@dataclass
-class PlanetData:
-    name: str
-    loc: str
-    trade_class: str
-    chara: str
-    population: int
-    tech_age: str
-    tags: set[str]
-
-
 def _ehex(n: int) -> str:
     if n >= len(EXTENDED_HEX):
         raise ValueError
     return EXTENDED_HEX[n]
 
 
-def _name(planet: PlanetData) -> str:
+def _name(planet: Planet) -> str:
     return planet.name[:13]
 
 
-def _trade_class_code(trade_class: str) -> str:
-    if trade_class not in TRADE_CLASS_CODES:
-        return ""
-    return TRADE_CLASS_CODES[trade_class]
+def _tags(planet: Planet) -> tuple[WorldTag | None, WorldTag | None]:
+    # one from each table, so never the same tag twice
+    return planet.world_tag_1, planet.world_tag_2
+
 
+def _tag_mask(planet: Planet) -> int:
+    t1, t2 = planet.world_tag_1, planet.world_tag_2
+    return (t1.bit if t1 else 0) | (t2.bit if t2 else 0)
 
-def _tech_age_code(tech_age: str) -> str:
-    if tech_age == "Cosmic":
-        return "C"
-    words: list[str] = tech_age.split(" ")
-    assert len(words) == 2
-    return words[0][0] + words[1][0]
 
+def _trade_class_code(trade_class: TradeClass) -> str:
+    return TRADE_CLASS_TO_ABBREVS.get(trade_class, "")
 
-def _tech_level(planet: PlanetData) -> int:
-    tac: str = _tech_age_code(planet.tech_age)
-    if tac not in TECH_AGE_CODES_TO_LEVELS:
-        return TECH_LEVEL_DEFAULT
-    return TECH_AGE_CODES_TO_LEVELS[tac]
 
+def _tech_level(planet: Planet) -> int:
+    return TECH_AGE_TO_LEVELS.get(planet.tech_age, TECH_LEVEL_DEFAULT)
 
-def _starport_code(planet: PlanetData) -> str:
+
+def _starport_code(planet: Planet) -> str:
     tl: int = _tech_level(planet)
     tcc: str = _trade_class_code(planet.trade_class)
 
@@ -206,23 +196,21 @@ def _starport_code(planet: PlanetData) -> str:
     return "B" if tcc in {"Ag", "Ri", "In"} else "C"
 
 
-def _size_code(planet: PlanetData) -> int:
-    return 0 if planet.chara == "Asteroid" else PLANET_SIZE_DEFAULT
+def _size_code(planet: Planet) -> int:
+    return 0 if planet.chara == Characteristic.ASTEROID else PLANET_SIZE_DEFAULT
 
 
-def _atmosphere_code(planet: PlanetData) -> int:
-    if planet.chara not in CHARA_TO_ATMOSPHERE_CODES:
-        return ATMOSPHERE_CODE_DEFAULT
-    return CHARA_TO_ATMOSPHERE_CODES[planet.chara]
+def _atmosphere_code(planet: Planet) -> int:
+    return CHARA_TO_ATMOSPHERE_CODES.get(planet.chara, ATMOSPHERE_CODE_DEFAULT)
 
 
-def _hydrographic_code(planet: PlanetData) -> int:
-    if planet.chara not in CHARA_TO_HYDROGRAPHICS_CODES:
-        return HYDROGRAPHIC_CODE_DEFAULT
-    return CHARA_TO_HYDROGRAPHICS_CODES[planet.chara]
+def _hydrographic_code(planet: Planet) -> int:
+    return CHARA_TO_HYDROGRAPHICS_CODES.get(
+        planet.chara, HYDROGRAPHIC_CODE_DEFAULT
+    )
 
 
-def _population_code(planet: PlanetData) -> int:
+def _population_code(planet: Planet) -> int:
     # Gotta be a better way to do this
     mag: int = 0
     lastmag: int = 0
@@ -232,23 +220,29 @@ def _population_code(planet: PlanetData) -> int:
     return lastmag
 
 
-def _government_code(planet: PlanetData) -> int:
+def _government_code(planet: Planet) -> int:
     if planet.population == 0:
         return 0
-    if common := set(GOV_TAGS_TO_CODES) & planet.tags:
-        return round(sum(GOV_TAGS_TO_CODES[x] for x in common) / len(common))
+    if _tag_mask(planet) & GOV_TAGS_MASK:
+        codes: list[int] = [
+            GOV_TAGS_TO_CODES[t] for t in _tags(planet) if t in GOV_TAGS_TO_CODES
+        ]
+        return round(sum(codes) / len(codes))
     return GOVERNMENT_CODE_DEFAULT
 
 
-def _law_level_code(planet: PlanetData) -> int:
+def _law_level_code(planet: Planet) -> int:
     if planet.population == 0:
         return 0
-    if common := set(LAW_TAGS_TO_CODES) & planet.tags:
-        return round(sum(LAW_TAGS_TO_CODES[x] for x in common) / len(common))
+    if _tag_mask(planet) & LAW_TAGS_MASK:
+        codes: list[int] = [
+            LAW_TAGS_TO_CODES[t] for t in _tags(planet) if t in LAW_TAGS_TO_CODES
+        ]
+        return round(sum(codes) / len(codes))
     return LAW_CODE_DEFAULT
 
 
-def _upp(planet: PlanetData) -> str:
+def _upp(planet: Planet) -> str:
     return (
         f"{_starport_code(planet)}"
         f"{_ehex(_size_code(planet))}"
@@ -261,7 +255,7 @@ def _upp(planet: PlanetData) -> str:
     )
 
 
-def _notes(planet: PlanetData) -> str:
+def _notes(planet: Planet) -> str:
     result: list[str] = [_trade_class_code(planet.trade_class)]
     if planet.chara in CHARA_TO_TRADE_CODES:
         result.append(CHARA_TO_TRADE_CODES[planet.chara])
@@ -278,20 +272,21 @@ def _notes(planet: PlanetData) -> str:
     return " ".join(result)
 
 
-def _base(planet: PlanetData) -> str:
+def _base(planet: Planet) -> str:
     return " "
 
 
-def _zone(planet: PlanetData) -> str:
+def _zone(planet: Planet) -> str:
     # sourcery skip: assign-if-exp, reintroduce-else
-    if planet.tags & RED_ZONE_TAGS:
+    mask: int = _tag_mask(planet)
+    if mask & RED_ZONE_MASK:
         return "R"
-    if planet.tags & AMBER_ZONE_TAGS:
+    if mask & AMBER_ZONE_MASK:
         return "A"
     return " "
 
 
-def _pbg(planet: PlanetData) -> str:
+def _pbg(planet: Planet) -> str:
     # Population Multiplier
     popcode: int = _population_code(planet)
     popmul: int = round(planet.population / (10**popcode))
@@ -302,47 +297,21 @@ def _pbg(planet: PlanetData) -> str:
     return f"{_ehex(popmul)}{_ehex(bases)}{_ehex(ggs)}"
 
 
-def write_genie(out, planets: list[PlanetData]) -> None:
+def write_genie(out, planets: Iterable[Planet]) -> None:
     out.write(GENIE_HEADER)
     for p in planets:
         out.write(
-            f"{_name(p):14s}{p.loc} {_upp(p)}  {_base(p)}"
+            f"{_name(p):14s}{p.hexcode} {_upp(p)}  {_base(p)}"
             f" {_notes(p):15s} {_zone(p)}  {_pbg(p)} --\r\n"
         )
 
 
-def read_csv(reader) -> list[PlanetData]:
-    result: list[PlanetData] = []
-    for row in reader:
-        data = PlanetData(
-            row["Planet"],
-            row["Hex"],
-            row["Trade Class"],
-            row["Chara."],
-            int(row["Population"]),
-            row["Tech. Age"],
-            {row["World Tag 1"], row["World Tag 2"]},
-        )
-
-        if data.name[0] != "-" and data.loc[0] != "-":
-            result.append(data)
-    return result
-
-
-def read_json(jsondata) -> list[PlanetData]:
-    result: list[PlanetData] = []
-    for p in jsondata["planets"]:
-        data = PlanetData(
-            p["name"],
-            p["hex"],
-            p["trade_class"],
-            p["characteristic"],
-            int(p["population"]),
-            p["technology_age"],
-            set(p["world_tags"]),
-        )
-        result.append(data)
-    return result
+def str_to_sector(text: str) -> tuple[int, int]:
+    sx, _, sy = text.partition(".")
+    try:
+        return int(sx), int(sy)
+    except ValueError:
+        raise ValueError(f"bad sector: {text!r} (expected e.g. 0.0 or 1.-2)")
 
 
 def main() -> None:
@@ -352,33 +321,47 @@ def main() -> None:
     )
     parser.add_argument(
         "inputfile",
-        help="file containing `nomadsec.py` data",
-        type=argparse.FileType(mode="r", encoding="UTF-8"),
+        help="file containing `nomadsec.py` data, which may be compressed",
+        type=CompressedFileType(mode="r", encoding="UTF-8"),
     )
     parser.add_argument(
         "outputfile",
         help="file to contain _Traveller_ GEnie data",
-        type=argparse.FileType(mode="w", encoding="cp1252"),
+        type=CompressedFileType(mode="w", encoding="cp1252"),
     )
     parser.add_argument(
         "-j",
         "--json",
-        help="read as JSON data",
+        help="read as JSON data (default: detect the format)",
         action="store_true",
     )
+    parser.add_argument(
+        "--sector",
+        help="write the 32x40 sector across.down (e.g. 1.0) of a larger map"
+        " (default: the only one in the input)",
+    )
     args = parser.parse_args()
 
-    planets: list[PlanetData]
+    planets: list[Planet]
 
     with args.inputfile as infile:
-        if args.json:
-            jsondata = json.load(infile)
-            planets = read_json(jsondata)
-        else:
-            dialect = csv.Sniffer().sniff(infile.read(1024))
-            infile.seek(0)
-            reader = csv.DictReader(infile, dialect=dialect)
-            planets = read_csv(reader)
+        fmt: SectorFormat | None = SectorFormat.JSON if args.json else None
+        try:
+            planets = list(read_planets(infile, fmt))
+        except ValueError as e:
+            parser.error(f"{infile.name}: {e}")
+
+    # GEnie hex codes only go up to 3240, so write one sector at a time
+    sectors: set[tuple[int, int]] = {p.star.sector for p in planets}
+    if args.sector:
+        try:
+            chosen: tuple[int, int] = str_to_sector(args.sector)
+        except ValueError as e:
+            parser.error(str(e))
+        planets = [p for p in planets if p.star.sector == chosen]
+    elif len(sectors) > 1:
+        names: str = ", ".join(f"{sx}.{sy}" for sx, sy in sorted(sectors))
+        parser.error(f"input covers sectors {names}; choose one with --sector")
 
     with args.outputfile as outfile:
         write_genie(outfile, planets)
@@ -0,0 +1,253 @@
+import argparse
+import io
+import os
+import sys
+from collections import deque
+from collections.abc import Callable
+from typing import IO, Any, NamedTuple
+
+# The thread pool (concurrent.futures) is only imported by the first
+# `BlockCompressor`, so opening an uncompressed file costs nothing extra
+
+##################### COMPRESSED FILES ###############################
+
+
+class Codec(NamedTuple):
+    name: str
+    suffix: str
+    magic: bytes
+    # uncompressed bytes per block handed to a worker thread
+    block_size: int
+    level: int
+    # the module that provides it, when not in the standard library
+    package: str | None = None
+
+
+CODECS: tuple[Codec, ...] = (
+    Codec("gzip", ".gz", b"\x1f\x8b", 1 << 20, 6),
+    Codec("bzip2", ".bz2", b"BZh", 900_000, 9),
+    Codec("xz", ".xz", b"\xfd7zXZ\x00", 4 << 20, 6),
+    Codec("zstd", ".zst", b"\x28\xb5\x2f\xfd", 1 << 20, 3, "zstandard"),
+)
+
+# Each worker thread may have this many blocks queued or in hand before
+# the writer waits for the oldest one
+BLOCKS_PER_THREAD: int = 2
+
+
+def codec_of(path: str) -> Codec | None:
+    """Return the codec for the suffix of `path`, if it has one."""
+    for codec in CODECS:
+        if path.endswith(codec.suffix):
+            return codec
+    return None
+
+
+def sniff_codec(head: bytes) -> Codec | None:
+    """Return the codec whose magic number `head` starts with, if any."""
+    for codec in CODECS:
+        if head.startswith(codec.magic):
+            return codec
+    return None
+
+
+def _compressor(codec: Codec) -> Callable[[bytes], bytes]:
+    # Every block is compressed on its own into a complete gzip member,
+    # bzip2 stream, xz stream or zstd frame; each format reads a run of
+    # them back as one file.  zlib, bz2, lzma and zstandard all release
+    # the GIL while they work, so the blocks compress in parallel.
+    if codec.name == "gzip":
+        import zlib
+
+        def gzip_block(block: bytes) -> bytes:
+            # wbits 31 writes a gzip header and trailer around the deflate data
+            c = zlib.compressobj(codec.level, zlib.DEFLATED, 31)
+            return c.compress(block) + c.flush()
+
+        return gzip_block
+    if codec.name == "bzip2":
+        import bz2
+
+        return lambda block: bz2.compress(block, codec.level)
+    if codec.name == "xz":
+        import lzma
+
+        return lambda block: lzma.compress(block, preset=codec.level)
+    import zstandard  # type: ignore
+
+    return zstandard.ZstdCompressor(level=codec.level).compress
+
+
+def _decompressor(codec: Codec, source: str | IO[bytes]) -> IO[bytes]:
+    if codec.name == "gzip":
+        import gzip
+
+        return gzip.open(source, "rb")
+    if codec.name == "bzip2":
+        import bz2
+
+        return bz2.open(source, "rb")
+    if codec.name == "xz":
+        import lzma
+
+        return lzma.open(source, "rb")
+    import zstandard  # type: ignore
+
+    raw: IO[bytes] = open(source, "rb") if isinstance(source, str) else source
+    return zstandard.ZstdDecompressor().stream_reader(
+        raw, read_across_frames=True, closefd=isinstance(source, str)
+    )
+
+
+def _check_available(codec: Codec) -> None:
+    if codec.package:
+        import importlib.util
+
+        if importlib.util.find_spec(codec.package) is None:
+            raise ValueError(
+                f"{codec.name} needs {codec.package} (pip install {codec.package})"
+            )
+
+
+class BlockCompressor(io.BufferedIOBase):
+    """
+    A writable binary file that cuts what is written to it into blocks
+    and compresses them in a pool of worker threads, writing the results
+    to `raw` in order.  The caller only waits when every thread is
+    `BLOCKS_PER_THREAD` blocks behind, which bounds the memory used.
+    """
+
+    def __init__(
+        self,
+        raw: IO[bytes],
+        codec: Codec,
+        threads: int | None = None,
+        closefd: bool = True,
+    ) -> None:
+        self.raw: IO[bytes] = raw
+        self.codec: Codec = codec
+        self.threads: int = threads or os.cpu_count() or 1
+        assert self.threads >= 1
+        self._closefd: bool = closefd
+        self._compress: Callable[[bytes], bytes] = _compressor(codec)
+        from concurrent.futures import ThreadPoolExecutor
+
+        self._pool = ThreadPoolExecutor(
+            self.threads, thread_name_prefix=f"{codec.name}-block"
+        )
+        self._pending: deque = deque()
+        self._buffer = bytearray()
+        self._blocks: int = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        if self.closed:
+            raise ValueError("write to closed file")
+        self._buffer += data
+        size: int = self.codec.block_size
+        if len(self._buffer) >= size:
+            view = memoryview(self._buffer)
+            end: int = len(self._buffer) - len(self._buffer) % size
+            for start in range(0, end, size):
+                self._submit(bytes(view[start : start + size]))
+            view.release()
+            del self._buffer[:end]
+        return len(data)
+
+    def _submit(self, block: bytes) -> None:
+        self._pending.append(self._pool.submit(self._compress, block))
+        self._blocks += 1
+        self._drain(self.threads * BLOCKS_PER_THREAD)
+
+    def _drain(self, limit: int) -> None:
+        # write out finished blocks in order, waiting only while more than
+        # `limit` are outstanding
+        pending: deque = self._pending
+        while pending and (len(pending) > limit or pending[0].done()):
+            self.raw.write(pending.popleft().result())
+
+    def flush(self) -> None:
+        # a partial block stays buffered: compressing it now would only
+        # make the output bigger
+        if not self.closed:
+            self._drain(len(self._pending))
+            self.raw.flush()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            # an empty input still gets one (empty) block, so the output
+            # is a valid compressed file
+            if self._buffer or not self._blocks:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            self._drain(0)
+            self.raw.flush()
+        finally:
+            self._pool.shutdown(cancel_futures=True)
+            try:
+                super().close()
+            finally:
+                if self._closefd:
+                    self.raw.close()
+
+
+def open_compressed(
+    path: str,
+    mode: str = "r",
+    encoding: str | None = None,
+    errors: str | None = None,
+    threads: int | None = None,
+) -> IO:
+    """
+    Open `path` for reading or writing (`mode` "r", "w", "rb" or "wb").
+    Files written are compressed by their suffix (see CODECS), in
+    blocks on `threads` worker threads; files read are decompressed by
+    their magic number, whatever their name.  "-" is standard input or
+    output.
+    """
+    assert mode in ("r", "w", "rb", "wb")
+    binary: IO[bytes]
+    if mode[0] == "w":
+        codec: Codec | None = None if path == "-" else codec_of(path)
+        if codec is None:
+            if path == "-":
+                return sys.stdout.buffer if "b" in mode else sys.stdout
+            return open(path, mode, encoding=encoding, errors=errors)
+        _check_available(codec)
+        binary = BlockCompressor(open(path, "wb"), codec, threads)
+    else:
+        if path == "-":
+            source: str | IO[bytes] = sys.stdin.buffer
+            head: bytes = sys.stdin.buffer.peek(8)[:8]
+        else:
+            source = path
+            with open(path, "rb") as f:
+                head = f.read(8)
+        codec = sniff_codec(head)
+        if codec is None:
+            if path == "-":
+                return sys.stdin.buffer if "b" in mode else sys.stdin
+            return open(path, mode, encoding=encoding, errors=errors)
+        _check_available(codec)
+        binary = _decompressor(codec, source)
+    if "b" in mode:
+        return binary
+    return io.TextIOWrapper(binary, encoding=encoding, errors=errors)
+
+
+class CompressedFileType(argparse.FileType):
+    """
+    An `argparse.FileType` that opens files with `open_compressed()`, so
+    output named *.gz, *.bz2, *.xz or *.zst is compressed as it is
+    written and compressed input is read transparently.
+    """
+
+    def __call__(self, string: str) -> IO:
+        try:
+            return open_compressed(string, self._mode, self._encoding, self._errors)
+        except (OSError, ValueError) as e:
+            raise argparse.ArgumentTypeError(f"can't open '{string}': {e}")
@@ -0,0 +1,345 @@
+import itertools
+import random
+import re
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass, replace
+from typing import Any, NamedTuple
+
+from nomadgen import (
+    DEFAULT_DENSITY,
+    NameSet,
+    Planet,
+    SectorBounds,
+    StarHex,
+    sector,
+)
+from nomadodds import world_joint_odds, world_tags_odds
+from nomadread import (
+    str_to_any_tech_age,
+    str_to_characteristic,
+    str_to_trade_class,
+    str_to_world_tag,
+)
+from nomadtables import (
+    Characteristic,
+    NomadDice,
+    Settlement,
+    TechAge,
+    TradeClass,
+    WorldTag,
+    chara_str,
+    tech_age_str,
+    trade_class_str,
+    world_tag_str,
+)
+
+###################### CONSTRAINTS ###############################
+
+# Field names a constraint can test, each with the function that parses
+# its value (None for fields that take no value)
+FIELDS: dict[str, Callable[[str], Any] | None] = {
+    "trade_class": str_to_trade_class,
+    "chara": str_to_characteristic,
+    "tech_age": str_to_any_tech_age,
+    "tag": str_to_world_tag,
+    "populated": None,
+}
+
+FIELD_ALIASES: dict[str, str] = {
+    "trade": "trade_class",
+    "tc": "trade_class",
+    "characteristic": "chara",
+    "tech": "tech_age",
+    "world_tag": "tag",
+}
+
+# Fields rolled on the world tag tables, which are independent of the rest
+TAG_FIELDS: set[str] = {"tag"}
+
+CONSTRAINT_PATTERN: re.Pattern = re.compile(
+    r"^\s*(\w+)\s*(?:=\s*([^<>=]*[^<>=\s])\s*)?(>=|<=|==|>|<)\s*(\d+)\s*$"
+)
+
+
+class ConstraintError(ValueError):
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class Constraint:
+    """
+    Require between `low` and `high` (inclusive; None for no limit)
+    worlds in the sector whose `field` is `value`.
+    """
+
+    field: str
+    value: Any = None
+    low: int = 0
+    high: int | None = None
+
+    def matches(self, world) -> bool:
+        if self.field == "tag":
+            return self.value in (world.world_tag_1, world.world_tag_2)
+        if self.field == "populated":
+            return world.population > 0
+        return getattr(world, self.field) == self.value
+
+    def allows(self, count: int) -> bool:
+        return self.low <= count and (self.high is None or count <= self.high)
+
+    def __str__(self) -> str:
+        value: str = ""
+        if isinstance(self.value, TradeClass):
+            value = f"={trade_class_str(self.value)}"
+        elif isinstance(self.value, Characteristic):
+            value = f"={chara_str(self.value)}"
+        elif isinstance(self.value, TechAge):
+            value = f"={tech_age_str(self.value)}"
+        elif isinstance(self.value, WorldTag):
+            value = f"={world_tag_str(self.value)}"
+        elif self.value is not None:
+            value = f"={self.value}"
+        if self.high is None:
+            return f"{self.field}{value}>={self.low}"
+        if self.low == self.high:
+            return f"{self.field}{value}=={self.low}"
+        if self.low == 0:
+            return f"{self.field}{value}<={self.high}"
+        return f"{self.field}{value}>={self.low},<={self.high}"
+
+
+def parse_constraint(text: str) -> Constraint:
+    """
+    Parse a constraint like "trade_class=Rich>=2", "tag=Quarantined==0"
+    or "populated<10".
+    """
+    m = CONSTRAINT_PATTERN.match(text)
+    if not m:
+        raise ValueError(f"bad constraint: {text!r}")
+    name, value, op, count = m.groups()
+    field: str = FIELD_ALIASES.get(name.lower(), name.lower())
+    if field not in FIELDS:
+        raise ValueError(f"unknown field in constraint: {name!r}")
+    parse: Callable[[str], Any] | None = FIELDS[field]
+    if (parse is None) != (value is None):
+        raise ValueError(
+            f"{field} {'takes no' if parse is None else 'needs a'} value: {text!r}"
+        )
+    n: int = int(count)
+    if op == "<" and n == 0:
+        raise ValueError(f"impossible constraint: {text!r}")
+    low, high = {
+        ">=": (n, None),
+        ">": (n + 1, None),
+        "<=": (0, n),
+        "<": (0, n - 1),
+        "==": (n, n),
+    }[op]
+    return Constraint(field, parse(value) if parse else None, low, high)
+
+
+####################### SAMPLING ################################
+
+
+class WorldRow(NamedTuple):
+    trade_class: TradeClass
+    chara: Characteristic
+    population: int
+    tech_age: TechAge
+
+
+class TagRow(NamedTuple):
+    world_tag_1: WorldTag
+    world_tag_2: WorldTag
+
+
+_JOINT_ODDS: dict[tuple[Settlement | None, TechAge | None], dict] = {}
+_TAG_ODDS: dict[tuple[WorldTag, WorldTag], Any] = {}
+
+
+def _joint_odds(settlement: Settlement | None, avg_age: TechAge | None) -> dict:
+    key: tuple[Settlement | None, TechAge | None] = (settlement, avg_age)
+    if key not in _JOINT_ODDS:
+        _JOINT_ODDS[key] = world_joint_odds(settlement, avg_age)
+    return _JOINT_ODDS[key]
+
+
+def _tag_odds() -> dict:
+    if not _TAG_ODDS:
+        _TAG_ODDS.update(world_tags_odds())
+    return _TAG_ODDS
+
+
+class _Restricted:
+    """
+    Draw rows from an exact joint distribution, restricted to rows with
+    a given pattern of matches against some constraints.
+    """
+
+    def __init__(self, odds: dict, row: type, constraints: list[Constraint]) -> None:
+        groups: dict[tuple[bool, ...], tuple[list, list[float]]] = {}
+        for key, p in odds.items():
+            r = row(*key)
+            rows, weights = groups.setdefault(
+                tuple(c.matches(r) for c in constraints), ([], [])
+            )
+            rows.append(r)
+            weights.append(float(p))
+        self.groups: dict[tuple[bool, ...], tuple[list, list[float]]] = {
+            status: (rows, list(itertools.accumulate(weights)))
+            for status, (rows, weights) in groups.items()
+        }
+
+    def possible(self, status: tuple[bool, ...]) -> bool:
+        return status in self.groups
+
+    def draw(self, status: tuple[bool, ...], rng) -> Any:
+        rows, cumulative = self.groups[status]
+        return rng.choices(rows, cum_weights=cumulative)[0]
+
+
+class ConditionedWorlds:
+    """
+    Reroll worlds from the exact odds of the tables, restricted to worlds
+    that match (or fail to match) each of `constraints` as asked.
+    """
+
+    def __init__(
+        self,
+        constraints: Sequence[Constraint],
+        settlement: Settlement | None = None,
+        avg_age: TechAge | None = None,
+    ) -> None:
+        self.constraints: list[Constraint] = list(constraints)
+        self.tag_index: list[int] = [
+            i for i, c in enumerate(self.constraints) if c.field in TAG_FIELDS
+        ]
+        self.world_index: list[int] = [
+            i for i, c in enumerate(self.constraints) if c.field not in TAG_FIELDS
+        ]
+        self.worlds: _Restricted = _Restricted(
+            _joint_odds(settlement, avg_age),
+            WorldRow,
+            [self.constraints[i] for i in self.world_index],
+        )
+        self.tags: _Restricted = _Restricted(
+            _tag_odds(),
+            TagRow,
+            [self.constraints[i] for i in self.tag_index],
+        )
+
+    def status(self, planet: Planet) -> tuple[bool, ...]:
+        return tuple(c.matches(planet) for c in self.constraints)
+
+    def _split(
+        self, status: tuple[bool, ...]
+    ) -> tuple[tuple[bool, ...], tuple[bool, ...]]:
+        return (
+            tuple(status[i] for i in self.world_index),
+            tuple(status[i] for i in self.tag_index),
+        )
+
+    def possible(self, status: tuple[bool, ...]) -> bool:
+        world, tags = self._split(status)
+        return self.worlds.possible(world) and self.tags.possible(tags)
+
+    def reroll(self, planet: Planet, status: tuple[bool, ...], rng=random) -> Planet:
+        world, tags = self._split(status)
+        w: WorldRow = self.worlds.draw(world, rng)
+        t: TagRow = self.tags.draw(tags, rng)
+        return replace(planet, **w._asdict(), **t._asdict())
+
+
+def _retarget(
+    worlds: ConditionedWorlds,
+    counts: list[int],
+    status: tuple[bool, ...],
+    index: int,
+    want: bool,
+) -> tuple[bool, ...] | None:
+    # the pattern of matches closest to `status` that has `want` at `index`,
+    # changes no other constraint's count past its limits, and is possible
+    constraints: list[Constraint] = worlds.constraints
+    spare: list[int] = [
+        k
+        for k, c in enumerate(constraints)
+        if k != index and c.allows(counts[k] + (-1 if status[k] else 1))
+    ]
+    for n in range(len(spare) + 1):
+        for toggles in itertools.combinations(spare, n):
+            new: list[bool] = list(status)
+            new[index] = want
+            for k in toggles:
+                new[k] = not new[k]
+            if worlds.possible(tuple(new)):
+                return tuple(new)
+    return None
+
+
+def satisfy(
+    planets: Iterable[Planet],
+    constraints: Sequence[Constraint],
+    settlement: Settlement | None = None,
+    avg_age: TechAge | None = None,
+    rng=random,
+) -> list[Planet]:
+    """
+    Return `planets` with just enough of them rerolled to meet every
+    constraint.  Each rerolled world is drawn from the tables' exact
+    odds, restricted so it meets the constraint being fixed without
+    breaking any other; so it takes one pass over the constraints, and
+    at most one reroll per world per constraint.  Raise `ConstraintError`
+    if there are not enough worlds that can be changed.
+    """
+    result: list[Planet] = list(planets)
+    if not constraints:
+        return result
+    worlds: ConditionedWorlds = ConditionedWorlds(constraints, settlement, avg_age)
+    status: list[tuple[bool, ...]] = [worlds.status(p) for p in result]
+    counts: list[int] = [sum(col) for col in zip(*status)] or [0] * len(constraints)
+    for i, c in enumerate(constraints):
+        if c.low > len(result):
+            raise ConstraintError(f"cannot satisfy {c}: only {len(result)} worlds")
+        want: bool = counts[i] < c.low
+        order: list[int] = [j for j, s in enumerate(status) if s[i] != want]
+        rng.shuffle(order)
+        for j in order:
+            if c.allows(counts[i]):
+                break
+            new: tuple[bool, ...] | None = _retarget(
+                worlds, counts, status[j], i, want
+            )
+            if new is None:
+                continue
+            result[j] = worlds.reroll(result[j], new, rng)
+            for k, (old, now) in enumerate(zip(status[j], new)):
+                counts[k] += now - old
+            status[j] = new
+        if not c.allows(counts[i]):
+            raise ConstraintError(
+                f"cannot satisfy {c}: {counts[i]} of {len(result)} worlds match"
+            )
+    return result
+
+
+def constrained_sector(
+    nameset: NameSet,
+    constraints: Sequence[Constraint],
+    avg_age: TechAge | None = None,
+    settlement: Settlement | None = None,
+    density: int = DEFAULT_DENSITY,
+    bounds: SectorBounds | None = None,
+    roll: NomadDice | None = None,
+) -> tuple[list[Planet], list[StarHex]]:
+    """
+    Like `sector()`, but the planets also meet every constraint.
+    """
+    planets, stars = sector(
+        nameset,
+        avg_age=avg_age,
+        settlement=settlement,
+        density=density,
+        bounds=bounds,
+        **({"roll": roll} if roll else {}),
+    )
+    return satisfy(planets, constraints, settlement, avg_age), stars
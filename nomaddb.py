@@ -0,0 +1,637 @@
+#!/usr/bin/env python3
+
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+import argparse
+import itertools
+import sqlite3
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from nomadcompress import CompressedFileType, codec_of
+from nomadgen import (
+    Planet,
+    Sector,
+    SectorBounds,
+    StarHex,
+    hex_distance,
+    location_of,
+)
+from nomadout import (
+    write_as_json,
+    write_as_json_lines,
+    write_as_short_text,
+    write_as_text,
+    write_as_xsv,
+)
+from nomadread import (
+    read_sector,
+    str_to_any_tech_age,
+    str_to_characteristic,
+    str_to_coords,
+    str_to_population,
+    str_to_trade_class,
+    str_to_world_tag,
+)
+from nomadtables import Characteristic, TechAge, TradeClass, WorldTag
+
+###################### SCHEMA ###############################
+
+# Enums are stored by member name, except tech ages, which are stored by
+# value so they compare in order.  Planets repeat their star's (x, y) so
+# hex queries need no join.
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS maps (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stars (
+    id INTEGER PRIMARY KEY,
+    map INTEGER NOT NULL REFERENCES maps (id) ON DELETE CASCADE,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (map, x, y)
+);
+CREATE TABLE IF NOT EXISTS planets (
+    id INTEGER PRIMARY KEY,
+    map INTEGER NOT NULL REFERENCES maps (id) ON DELETE CASCADE,
+    star INTEGER NOT NULL REFERENCES stars (id) ON DELETE CASCADE,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    trade_class TEXT NOT NULL,
+    chara TEXT NOT NULL,
+    population INTEGER NOT NULL,
+    tech_age INTEGER NOT NULL,
+    tag_1 TEXT,
+    tag_2 TEXT
+);
+CREATE INDEX IF NOT EXISTS stars_name ON stars (name);
+CREATE INDEX IF NOT EXISTS planets_map ON planets (map, x, y);
+CREATE INDEX IF NOT EXISTS planets_star ON planets (star);
+CREATE INDEX IF NOT EXISTS planets_hex ON planets (x, y);
+CREATE INDEX IF NOT EXISTS planets_name ON planets (name);
+CREATE INDEX IF NOT EXISTS planets_trade_class ON planets (trade_class, tech_age);
+CREATE INDEX IF NOT EXISTS planets_tech_age ON planets (tech_age);
+CREATE INDEX IF NOT EXISTS planets_tag_1 ON planets (tag_1);
+CREATE INDEX IF NOT EXISTS planets_tag_2 ON planets (tag_2);
+"""
+
+PLANET_COLUMNS: str = (
+    "planets.name, trade_class, chara, population, tech_age, tag_1, tag_2"
+)
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    Open a sector database, creating it if need be, with
+    `hex_distance(x1, y1, x2, y2)` available to SQL.
+    """
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(SCHEMA)
+    conn.create_function("hex_distance", 4, hex_distance, deterministic=True)
+    return conn
+
+
+###################### IMPORT/EXPORT ###############################
+
+
+class MapExistsError(ValueError):
+    pass
+
+
+def _planet_row(map_id: int, star_id: int, p: Planet) -> tuple:
+    return (
+        map_id,
+        star_id,
+        p.star.x,
+        p.star.y,
+        p.name,
+        p.trade_class.name,
+        p.chara.name,
+        p.population,
+        p.tech_age.value,
+        p.world_tag_1.name if p.world_tag_1 else None,
+        p.world_tag_2.name if p.world_tag_2 else None,
+    )
+
+
+def _row_planet(star: StarHex, row: tuple) -> Planet:
+    name, tc, chara, pop, age, tag1, tag2 = row
+    return Planet(
+        name=name,
+        star=star,
+        trade_class=TradeClass[tc],
+        chara=Characteristic[chara],
+        population=pop,
+        tech_age=TechAge(age),
+        world_tag_1=WorldTag[tag1] if tag1 else None,
+        world_tag_2=WorldTag[tag2] if tag2 else None,
+    )
+
+
+def store_sector(
+    conn: sqlite3.Connection, name: str, sec: Sector, replace: bool = False
+) -> int:
+    """
+    Write a whole sector as the map `name` in one transaction, and return
+    its id.  Raise `MapExistsError` if there is already a map of that
+    name, unless `replace`.
+    """
+    b: SectorBounds = sec.bounds
+    with conn:
+        if replace:
+            conn.execute("DELETE FROM maps WHERE name = ?", (name,))
+        try:
+            cursor = conn.execute(
+                "INSERT INTO maps (name, x, y, width, height)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (name, b.x, b.y, b.width, b.height),
+            )
+        except sqlite3.IntegrityError:
+            raise MapExistsError(f"map {name!r} already exists") from None
+        map_id: int = cursor.lastrowid or 0
+        conn.executemany(
+            "INSERT INTO stars (map, x, y, name) VALUES (?, ?, ?, ?)",
+            ((map_id, s.x, s.y, s.name) for s in sec.stars),
+        )
+        star_ids: dict[tuple[int, int], int] = {
+            (x, y): i
+            for i, x, y in conn.execute(
+                "SELECT id, x, y FROM stars WHERE map = ?", (map_id,)
+            )
+        }
+        conn.executemany(
+            "INSERT INTO planets (map, star, x, y, name, trade_class, chara,"
+            " population, tech_age, tag_1, tag_2)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                _planet_row(map_id, star_ids[p.star.x, p.star.y], p)
+                for p in sec.planets
+            ),
+        )
+    return map_id
+
+
+def load_sector(conn: sqlite3.Connection, name: str) -> Sector:
+    """
+    Read the map `name` back as a `Sector`, with planets in the order
+    they were stored.
+    """
+    row = conn.execute(
+        "SELECT id, x, y, width, height FROM maps WHERE name = ?", (name,)
+    ).fetchone()
+    if row is None:
+        raise ValueError(f"no map named {name!r}")
+    map_id, x, y, width, height = row
+    stars: dict[int, StarHex] = {
+        i: StarHex(x=sx, y=sy, name=sname)
+        for i, sx, sy, sname in conn.execute(
+            "SELECT id, x, y, name FROM stars WHERE map = ? ORDER BY x, y",
+            (map_id,),
+        )
+    }
+    planets: list[Planet] = [
+        _row_planet(stars[r[0]], r[1:])
+        for r in conn.execute(
+            f"SELECT star, {PLANET_COLUMNS} FROM planets"
+            " WHERE map = ? ORDER BY id",
+            (map_id,),
+        )
+    ]
+    bounds = SectorBounds(height=height, width=width, x=x, y=y)
+    return Sector(bounds, stars.values(), planets)
+
+
+def map_summaries(conn: sqlite3.Connection) -> list[tuple]:
+    """
+    Return (name, bounds, stars, planets, population) for every map.
+    """
+    return [
+        (name, SectorBounds(height=h, width=w, x=x, y=y), stars, planets, pop)
+        for name, x, y, w, h, stars, planets, pop in conn.execute(
+            "SELECT name, x, y, width, height,"
+            " (SELECT count(*) FROM stars WHERE map = maps.id),"
+            " (SELECT count(*) FROM planets WHERE map = maps.id),"
+            " (SELECT total(population) FROM planets WHERE map = maps.id)"
+            " FROM maps ORDER BY name"
+        )
+    ]
+
+
+######################### QUERIES ###############################
+
+
+@dataclass
+class PlanetQuery:
+    """
+    Which planets `find_planets()` returns: those meeting every condition
+    that is set.  `name` is a GLOB pattern, a planet must have every tag
+    in `tags`, and `near` (x, y) with `within` limits the distance.
+    """
+
+    maps: list[str] = field(default_factory=list)
+    name: str | None = None
+    trade_classes: list[TradeClass] = field(default_factory=list)
+    charas: list[Characteristic] = field(default_factory=list)
+    tags: list[WorldTag] = field(default_factory=list)
+    min_tech_age: TechAge | None = None
+    max_tech_age: TechAge | None = None
+    min_population: int | None = None
+    max_population: int | None = None
+    near: tuple[int, int] | None = None
+    within: int = 0
+    limit: int | None = None
+
+
+def _placeholders(values: list) -> str:
+    return ", ".join("?" * len(values))
+
+
+def find_planets(
+    conn: sqlite3.Connection, q: PlanetQuery
+) -> list[tuple[str, Planet, int | None]]:
+    """
+    Return (map name, planet, distance from `q.near`, if set) for every
+    planet matching `q`, by map and then by distance and location.
+    """
+    where: list[str] = []
+    params: list = []
+    if q.maps:
+        where.append(f"maps.name IN ({_placeholders(q.maps)})")
+        params += q.maps
+    if q.name:
+        where.append("planets.name GLOB ?")
+        params.append(q.name)
+    if q.trade_classes:
+        where.append(f"trade_class IN ({_placeholders(q.trade_classes)})")
+        params += [tc.name for tc in q.trade_classes]
+    if q.charas:
+        where.append(f"chara IN ({_placeholders(q.charas)})")
+        params += [c.name for c in q.charas]
+    for tag in q.tags:
+        where.append("(tag_1 = ? OR tag_2 = ?)")
+        params += [tag.name, tag.name]
+    if q.min_tech_age is not None:
+        where.append("tech_age >= ?")
+        params.append(q.min_tech_age.value)
+    if q.max_tech_age is not None:
+        where.append("tech_age <= ?")
+        params.append(q.max_tech_age.value)
+    if q.min_population is not None:
+        where.append("population >= ?")
+        params.append(q.min_population)
+    if q.max_population is not None:
+        where.append("population <= ?")
+        params.append(q.max_population)
+
+    distance: str = "NULL"
+    select_params: list = []
+    if q.near is not None:
+        nx, ny = q.near
+        distance = "hex_distance(planets.x, planets.y, ?, ?)"
+        select_params = [nx, ny]
+        # no hex within `within` is more than that many columns or rows away,
+        # so the box can use the index and only its hexes need the distance
+        where.append("planets.x BETWEEN ? AND ? AND planets.y BETWEEN ? AND ?")
+        params += [nx - q.within, nx + q.within, ny - q.within, ny + q.within]
+        where.append(f"{distance} <= ?")
+        params += [nx, ny, q.within]
+
+    sql: str = (
+        f"SELECT maps.name, {distance}, planets.star, stars.x, stars.y,"
+        f" stars.name, {PLANET_COLUMNS}"
+        " FROM planets JOIN maps ON maps.id = planets.map"
+        " JOIN stars ON stars.id = planets.star"
+        + (f" WHERE {' AND '.join(where)}" if where else "")
+        + " ORDER BY maps.name, 2, planets.x, planets.y, planets.id"
+        + (" LIMIT ?" if q.limit is not None else "")
+    )
+    if q.limit is not None:
+        params.append(q.limit)
+
+    stars: dict[int, StarHex] = {}
+    result: list[tuple[str, Planet, int | None]] = []
+    for row in conn.execute(sql, select_params + params):
+        map_name, dist, star_id, sx, sy, sname = row[:6]
+        if star_id not in stars:
+            stars[star_id] = StarHex(x=sx, y=sy, name=sname)
+        result.append((map_name, _row_planet(stars[star_id], row[6:]), dist))
+    return result
+
+
+def find_location(
+    conn: sqlite3.Connection, text: str, maps: list[str] | None = None
+) -> tuple[str | None, int, int]:
+    """
+    Return (map name, x, y) for a hex location (which is in every map, so
+    the map is None) or for the name of a planet or star, which must be
+    in only one place among `maps` (or all maps).
+    """
+    try:
+        x, y = str_to_coords(text)
+    except ValueError:
+        pass
+    else:
+        return None, x, y
+    found: list[tuple[str, int, int]] = [
+        row
+        for row in conn.execute(
+            "SELECT maps.name, planets.x, planets.y FROM planets"
+            " JOIN maps ON maps.id = planets.map WHERE planets.name = ?"
+            " UNION SELECT maps.name, stars.x, stars.y FROM stars"
+            " JOIN maps ON maps.id = stars.map WHERE stars.name = ?",
+            (text, text),
+        )
+        if not maps or row[0] in maps
+    ]
+    if not found:
+        raise ValueError(f"no hex, planet or star called {text!r}")
+    if len(found) > 1:
+        where: str = ", ".join(f"{m} {location_of(x, y)}" for m, x, y in found)
+        raise ValueError(f"{text!r} is in more than one place: {where}")
+    return found[0]
+
+
+######################### MAIN #########################################
+
+
+def write_planets(outfile, args: argparse.Namespace, planets: list[Planet]) -> None:
+    if args.jsonl:
+        write_as_json_lines(outfile, planets)
+    elif args.separator:
+        write_as_xsv(outfile, planets, args.separator)
+    elif args.abbreviate:
+        write_as_short_text(outfile, planets)
+    else:
+        write_as_text(outfile, planets)
+
+
+def map_name_of(path: str) -> str:
+    """The map name for a file: its name without directory or suffixes."""
+    codec = codec_of(path)
+    if codec is not None:
+        path = path.removesuffix(codec.suffix)
+    return Path(path).stem
+
+
+def do_import(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    if args.map and len(args.files) > 1:
+        parser.error("--map only names a single imported file")
+    conn = connect(args.database)
+    for infile in args.files:
+        if not args.map and infile.name == "<stdin>":
+            parser.error("name the map read from standard input with --map")
+        name: str = args.map or map_name_of(infile.name)
+        try:
+            with infile:
+                sec: Sector = read_sector(infile)
+        except ValueError as e:
+            parser.error(f"{infile.name}: {e}")
+        except KeyError as e:
+            parser.error(f"{infile.name}: missing field {e}")
+        if not sec.planets:
+            parser.error(f"{infile.name}: no planets to import")
+        try:
+            store_sector(conn, name, sec, args.replace)
+        except MapExistsError as e:
+            sys.exit(f"{parser.prog}: error: {e} (use --replace)")
+    # keep the query planner's statistics current for the new rows
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def do_export(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    conn = connect(args.database)
+    try:
+        sec: Sector = load_sector(conn, args.map)
+    except ValueError as e:
+        parser.error(str(e))
+    with args.output as outfile:
+        if args.json:
+            write_as_json(outfile, sec.bounds, sec)
+        else:
+            write_planets(outfile, args, sec.planets)
+
+
+def do_list(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    conn = connect(args.database)
+    summaries: list[tuple] = map_summaries(conn)
+    length: int = max([len(s[0]) for s in summaries] + [3])
+    with args.output as outfile:
+        outfile.write(
+            f"|{'Map':{length}s}|      X|      Y|  Width| Height"
+            "|  Stars|Planets|        Population\n"
+        )
+        outfile.write(
+            f"|{'-'*length}|------:|------:|------:|------:"
+            "|------:|------:|-----------------:\n"
+        )
+        for name, b, stars, planets, pop in summaries:
+            outfile.write(
+                f"|{name:{length}s}|{b.x:7d}|{b.y:7d}|{b.width:7d}|{b.height:7d}"
+                f"|{stars:7d}|{planets:7d}|{int(pop):18_d}\n"
+            )
+
+
+def do_query(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    conn = connect(args.database)
+    if (args.near is None) != (args.within is None):
+        parser.error("--near and --within go together")
+    try:
+        q = PlanetQuery(
+            maps=args.map,
+            name=args.name,
+            trade_classes=[str_to_trade_class(v) for v in args.trade_class],
+            charas=[str_to_characteristic(v) for v in args.chara],
+            tags=[t for t in map(str_to_world_tag, args.tag) if t],
+            min_tech_age=(
+                str_to_any_tech_age(args.min_tech) if args.min_tech else None
+            ),
+            max_tech_age=(
+                str_to_any_tech_age(args.max_tech) if args.max_tech else None
+            ),
+            min_population=(
+                str_to_population(args.min_population)
+                if args.min_population
+                else None
+            ),
+            max_population=(
+                str_to_population(args.max_population)
+                if args.max_population
+                else None
+            ),
+            within=args.within or 0,
+            limit=args.limit,
+        )
+        if args.near:
+            near_map, x, y = find_location(conn, args.near, args.map)
+            q.near = (x, y)
+            if near_map is not None:
+                q.maps = [near_map]
+    except ValueError as e:
+        parser.error(str(e))
+
+    results: list[tuple[str, Planet, int | None]] = find_planets(conn, q)
+    with args.output as outfile:
+        if args.jsonl or args.separator:
+            # one table for every map, as the formats can be read back
+            write_planets(outfile, args, [p for _, p, _ in results])
+            return
+        for i, (name, group) in enumerate(
+            itertools.groupby(results, key=lambda r: r[0])
+        ):
+            outfile.write(f"{chr(10) if i else ''}### {name}\n\n")
+            write_planets(outfile, args, [p for _, p, _ in group])
+
+
+def main() -> None:
+    # Parse arguments
+    parser = argparse.ArgumentParser(
+        description="Store `nomadsec.py` maps in an SQLite database and query them"
+    )
+    parser.add_argument(
+        "database",
+        help="SQLite database file (created if need be)",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument(
+        "-o",
+        "--output",
+        help="output file",
+        default="-",
+        type=argparse.FileType(mode="w", encoding="UTF-8"),
+    )
+    output.add_argument(
+        "-a",
+        "--abbreviate",
+        help="abbreviate common strings in default format",
+        action="store_true",
+    )
+    output.add_argument(
+        "--jsonl",
+        help="write output as JSON Lines, one planet per line",
+        action="store_true",
+    )
+    output.add_argument(
+        "--separator",
+        help="write with the given character as a separator",
+    )
+    output.add_argument(
+        "--csv",
+        help="write as comma-separated values",
+        action="store_const",
+        dest="separator",
+        const=",",
+    )
+    output.add_argument(
+        "--tsv",
+        help="write as tab-separated values",
+        action="store_const",
+        dest="separator",
+        const="\t",
+    )
+
+    p = commands.add_parser(
+        "import", help="add maps from `nomadsec.py` output in any format"
+    )
+    p.add_argument(
+        "files",
+        help="files to import, each as a map named after the file; compressed"
+        " files are read as they are",
+        nargs="+",
+        type=CompressedFileType(mode="r", encoding="UTF-8"),
+    )
+    p.add_argument("-m", "--map", help="name of the map (for a single file)")
+    p.add_argument(
+        "--replace",
+        help="replace maps that already exist",
+        action="store_true",
+    )
+    p.set_defaults(run=do_import)
+
+    p = commands.add_parser(
+        "export", help="write a map as `nomadsec.py` would", parents=[output]
+    )
+    p.add_argument("map", help="name of the map")
+    p.add_argument(
+        "-j",
+        "--json",
+        help="write output as JSON",
+        action="store_true",
+    )
+    p.set_defaults(run=do_export)
+
+    p = commands.add_parser("list", help="list the stored maps")
+    p.add_argument(
+        "-o",
+        "--output",
+        help="output file",
+        default="-",
+        type=argparse.FileType(mode="w", encoding="UTF-8"),
+    )
+    p.set_defaults(run=do_list)
+
+    p = commands.add_parser(
+        "query", help="find planets in any map", parents=[output]
+    )
+    p.add_argument(
+        "-m",
+        "--map",
+        help="only search this map (may be repeated)",
+        action="append",
+        default=[],
+    )
+    p.add_argument("-n", "--name", help="planet names matching a GLOB pattern")
+    p.add_argument(
+        "--trade-class",
+        help="trade class, by name or abbreviation (may be repeated)",
+        action="append",
+        default=[],
+    )
+    p.add_argument(
+        "--chara",
+        help="characteristic, by name or abbreviation (may be repeated)",
+        action="append",
+        default=[],
+    )
+    p.add_argument(
+        "--tag",
+        help="world tag the planet must have (may be repeated)",
+        action="append",
+        default=[],
+    )
+    p.add_argument("--min-tech", help="lowest technology age, e.g. ei")
+    p.add_argument("--max-tech", help="highest technology age")
+    p.add_argument("--min-population", help="smallest population, e.g. 10M")
+    p.add_argument("--max-population", help="largest population")
+    p.add_argument(
+        "--near",
+        help="hex location, or name of a planet or star, to search around",
+    )
+    p.add_argument(
+        "--within",
+        help="greatest distance in parsecs from --near",
+        type=int,
+    )
+    p.add_argument("--limit", help="most planets to return", type=int)
+    p.set_defaults(run=do_query)
+
+    args = parser.parse_args()
+    args.run(parser, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import math
+import random
+
+# No `typing` here: this module is imported on its own by the dice test
+# harness, and `NomadDice` (in `nomadtables`) is all callers need to type.
+
+####################### DICE #################################
+
+
+def nomad_dice(nkeep: int = 2, nadv: int = 0, nsides: int = 6, low: int = 1) -> int:
+    """
+    Roll `nkeep` + abs(`nadv`) `nsides`-sided dice;
+    if nadv is negative, keep the `nkeep`
+    lowest, else keep the `nkeep` highest.
+    """
+
+    def one_die():
+        return random.randint(low, nsides + low - 1)
+
+    if nkeep == 1 and nadv == 0:
+        return one_die()
+
+    ntotal: int = nkeep + abs(nadv)
+    rolls: list[int] = [one_die() for _ in range(ntotal)]
+    rolls.sort()
+    return sum(rolls[:nkeep]) if nadv < 0 else sum(rolls[-nkeep:])
+
+
+##################### BATCH DICE #############################
+
+# Largest number of distinct outcomes (nsides ** ndice) that `roll_many`
+# will tabulate; beyond this it sorts each roll instead.
+MAXIMUM_OUTCOME_TABLE: int = 1 << 16
+
+_OUTCOME_TABLES: dict[tuple[int, int, int, int], list[int]] = {}
+
+
+def _kept_sum(rolls: list[int], nkeep: int, nadv: int) -> int:
+    rolls.sort()
+    return sum(rolls[:nkeep]) if nadv < 0 else sum(rolls[len(rolls) - nkeep :])
+
+
+def _outcome_table(nkeep: int, nadv: int, nsides: int, low: int) -> list[int]:
+    """
+    Return the result of every possible roll, indexed by the roll read
+    as an `nsides`-ary number with one digit per die.
+    """
+    key: tuple[int, int, int, int] = (nkeep, nadv, nsides, low)
+    if key not in _OUTCOME_TABLES:
+        ntotal: int = nkeep + abs(nadv)
+        table: list[int] = []
+        for index in range(nsides**ntotal):
+            rolls: list[int] = []
+            for _ in range(ntotal):
+                index, face = divmod(index, nsides)
+                rolls.append(face + low)
+            table.append(_kept_sum(rolls, nkeep, nadv))
+        _OUTCOME_TABLES[key] = table
+    return _OUTCOME_TABLES[key]
+
+
+def roll_many(
+    count: int,
+    nkeep: int = 2,
+    nadv: int = 0,
+    nsides: int = 6,
+    low: int = 1,
+    rng: random.Random | None = None,
+) -> list[int]:
+    """
+    Make `count` rolls with the same distribution as
+    `nomad_dice(nkeep, nadv, nsides, low)`, much faster than a loop.
+    """
+    r = rng or random
+    ntotal: int = nkeep + abs(nadv)
+    noutcomes: int = nsides**ntotal
+    if noutcomes <= MAXIMUM_OUTCOME_TABLE:
+        # Every combination of faces is equally likely, so one uniform
+        # draw over all of them is one roll of all the dice.
+        table: list[int] = _outcome_table(nkeep, nadv, nsides, low)
+        return list(map(table.__getitem__, r.choices(range(noutcomes), k=count)))
+    faces: range = range(low, nsides + low)
+    columns: list[list[int]] = [r.choices(faces, k=count) for _ in range(ntotal)]
+    return [_kept_sum(list(rolls), nkeep, nadv) for rolls in zip(*columns)]
+
+
+def dice_distribution(
+    nkeep: int = 2, nadv: int = 0, nsides: int = 6, low: int = 1
+) -> dict:
+    """
+    Return the exact probability (as a `Fraction`) of every result of
+    `nomad_dice(nkeep, nadv, nsides, low)`, in ascending order.
+    """
+    from fractions import Fraction
+
+    table: list[int] = _outcome_table(nkeep, nadv, nsides, low)
+    counts: dict[int, int] = {}
+    for result in table:
+        counts[result] = counts.get(result, 0) + 1
+    return {k: Fraction(counts[k], len(table)) for k in sorted(counts)}
+
+
+def skip_sample(
+    count: int, chance: float, rng: random.Random | None = None
+) -> list[int]:
+    """
+    Return, in order, the indexes in range(`count`) picked if each were
+    picked independently with probability `chance`.  The gaps between
+    picks are drawn from the geometric distribution, so the cost is
+    proportional to the number picked rather than to `count`.
+    """
+    r = rng or random
+    if chance >= 1:
+        return list(range(count))
+    if chance <= 0:
+        return []
+    log_miss: float = math.log1p(-chance)
+    picked: list[int] = []
+    i: int = -1
+    while True:
+        # P(gap == k) = (1 - chance) ** k * chance
+        i += 1 + int(math.log1p(-r.random()) / log_miss)
+        if i >= count:
+            return picked
+        picked.append(i)
+
+
+class BatchDice:
+    """
+    A `NomadDice` that rolls ahead `size` results at a time for each
+    kind of roll and hands them out one by one.
+    """
+
+    def __init__(self, size: int = 4096, rng: random.Random | None = None) -> None:
+        self.size: int = size
+        self.rng: random.Random | None = rng
+        self.pools: dict[tuple[int, int, int, int], list[int]] = {}
+
+    def __call__(
+        self, nkeep: int = 2, nadv: int = 0, nsides: int = 6, low: int = 1
+    ) -> int:
+        key: tuple[int, int, int, int] = (nkeep, nadv, nsides, low)
+        pool: list[int] | None = self.pools.get(key)
+        if not pool:
+            pool = self.pools[key] = roll_many(self.size, *key, rng=self.rng)
+        return pool.pop()
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+import argparse
+import random
+import sys
+from array import array
+from dataclasses import replace
+from operator import add
+
+from nomaddice import roll_many, skip_sample
+from nomadgen import Planet, Sector
+from nomadtables import (
+    POPULATION,
+    WORLD_TAG_TABLE_1,
+    TechAge,
+    WorldTag,
+    world_tag,
+)
+
+###################### RULE TABLES ###############################
+
+# A turn is one standard year.  Every turn each world rolls 2D, plus the
+# modifiers for its world tags, for its population growth
+GROWTH_TABLE: dict[int, float] = {
+    2: -0.10,
+    3: -0.04,
+    4: -0.02,
+    5: -0.005,
+    6: +0.005,
+    7: +0.01,
+    8: +0.015,
+    9: +0.02,
+    10: +0.025,
+    11: +0.03,
+    12: +0.04,
+}
+
+# Growth slows as a world nears this many times the largest population
+# its trade class can start with
+CAPACITY_FACTOR: int = 4
+
+# Each turn this share of worlds rolls 2D, plus tag modifiers, for a
+# shift in tech age
+TECH_DRIFT_CHANCE: float = 0.05
+TECH_DRIFT_TABLE: dict[int, int] = {
+    2: -1,
+    3: -1,
+    4: +0,
+    5: +0,
+    6: +0,
+    7: +0,
+    8: +0,
+    9: +0,
+    10: +0,
+    11: +1,
+    12: +1,
+}
+
+# Each turn this share of peaceful worlds falls into a crisis, rolled on
+# 2D.  The crisis replaces the world tag from the same table, and ends
+# on a roll of CRISIS_END or more on 2D, bringing the old tag back
+CRISIS_CHANCE: float = 1 / 216
+CRISIS_TABLE: dict[int, WorldTag] = {
+    2: WorldTag.WARLORDS,
+    3: WorldTag.HOLY_WAR,
+    4: WorldTag.DECLINING_POPULATION,
+    5: WorldTag.CIVIL_WAR,
+    6: WorldTag.IMPENDING_DOOM,
+    7: WorldTag.CIVIL_WAR,
+    8: WorldTag.DECLINING_POPULATION,
+    9: WorldTag.IMPENDING_DOOM,
+    10: WorldTag.COLD_WAR,
+    11: WorldTag.BATTLEGROUND,
+    12: WorldTag.QUARANTINED,
+}
+CRISIS_TAGS: frozenset[WorldTag] = frozenset(CRISIS_TABLE.values())
+CRISIS_END: int = 10
+
+TAG_GROWTH_MODIFIERS: dict[WorldTag, int] = {
+    WorldTag.BATTLEGROUND: -2,
+    WorldTag.CIVIL_WAR: -3,
+    WorldTag.COLD_WAR: -1,
+    WorldTag.DECLINING_POPULATION: -4,
+    WorldTag.HOLY_WAR: -2,
+    WorldTag.IMPENDING_DOOM: -1,
+    WorldTag.QUARANTINED: -1,
+    WorldTag.TERRAFORMING: +1,
+    WorldTag.UTOPIA: +1,
+    WorldTag.WARLORDS: -2,
+    WorldTag.ZOMBIES: -2,
+}
+
+TAG_TECH_MODIFIERS: dict[WorldTag, int] = {
+    WorldTag.BATTLEGROUND: -1,
+    WorldTag.CIVIL_WAR: -2,
+    WorldTag.FERAL_WORLD: -1,
+    WorldTag.FORBIDDEN_TECH: -1,
+    WorldTag.TRADE_HUB: +1,
+    WorldTag.UNUSUAL_TECH: +1,
+    WorldTag.WARLORDS: -2,
+}
+
+# Modifiers are stored shifted up by this much, so they fit in unsigned
+# bytes and index the flattened tables below directly
+MODIFIER_OFFSET: int = 16
+
+
+def _flattened(table: dict[int, float] | dict[int, int]) -> list:
+    # the result for every 2D roll plus shifted modifier, clamped to 2..12
+    return [
+        table[min(12, max(2, total - MODIFIER_OFFSET))]
+        for total in range(12 + 2 * MODIFIER_OFFSET + 1)
+    ]
+
+
+_GROWTH: list[float] = _flattened(GROWTH_TABLE)
+_TECH_DRIFT: list[int] = _flattened(TECH_DRIFT_TABLE)
+
+# Tags are stored as their `WorldTag` value, or 0 for no tag
+NO_TAG: int = 0
+_TABLE_1_TAGS: frozenset[WorldTag] = frozenset(
+    tag for row in WORLD_TAG_TABLE_1 for tag in row
+)
+
+
+def _tag_code(tag: WorldTag | None) -> int:
+    return tag.value if tag else NO_TAG
+
+
+def _tag_of(code: int) -> WorldTag | None:
+    return WorldTag(code) if code != NO_TAG else None
+
+
+def _slot_of(tag: WorldTag) -> int:
+    return 1 if tag in _TABLE_1_TAGS else 2
+
+
+def significant(pop: float, digits: int = 3) -> int:
+    """
+    Return `pop` rounded to `digits` significant figures, so evolved
+    populations still abbreviate to a few characters.
+    """
+    n: int = round(pop)
+    return round(n, digits - len(str(n))) if n else 0
+
+
+def _capacity(p: Planet) -> int:
+    spec = POPULATION[p.trade_class]
+    return max(0, spec.ndice * 6 + spec.modifier) * spec.multiplier
+
+
+def _dice(rng: random.Random | None):
+    # a `NomadDice` drawing from `rng`, for the table lookups
+    def roll(nkeep: int = 2, nadv: int = 0, nsides: int = 6, low: int = 1) -> int:
+        return roll_many(1, nkeep, nadv, nsides, low, rng)[0]
+
+    return roll
+
+
+####################### SECTOR STATE ###############################
+
+
+class SectorState:
+    """
+    The parts of every planet that change over time, one array entry per
+    planet of `sec`, so each turn updates them all in a few passes.
+    """
+
+    def __init__(self, sec: Sector) -> None:
+        self.sector: Sector = sec
+        self.planets: list[Planet] = list(sec.planets)
+        self.turn: int = 0
+        self.population: array = array("d", (p.population for p in self.planets))
+        self.capacity: array = array(
+            "d",
+            (
+                max(1, _capacity(p) * CAPACITY_FACTOR, p.population)
+                for p in self.planets
+            ),
+        )
+        self.tech: array = array("b", (p.tech_age.value for p in self.planets))
+        self.tag_1: array = array("B", (_tag_code(p.world_tag_1) for p in self.planets))
+        self.tag_2: array = array("B", (_tag_code(p.world_tag_2) for p in self.planets))
+        self.growth_modifier: array = array("B", bytes(len(self.planets)))
+        self.tech_modifier: array = array("B", bytes(len(self.planets)))
+        # planet index -> (tag slot, tag code to restore when it ends)
+        self.crises: dict[int, tuple[int, int]] = {}
+        for i, p in enumerate(self.planets):
+            for slot, tag in ((1, p.world_tag_1), (2, p.world_tag_2)):
+                if tag in CRISIS_TAGS:
+                    # a crisis from before the first turn has no old tag
+                    self.crises[i] = (slot, NO_TAG)
+            self._update_modifiers(i)
+
+    def __len__(self) -> int:
+        return len(self.planets)
+
+    def _update_modifiers(self, i: int) -> None:
+        growth: int = MODIFIER_OFFSET
+        tech: int = MODIFIER_OFFSET
+        for code in (self.tag_1[i], self.tag_2[i]):
+            if code != NO_TAG:
+                tag = WorldTag(code)
+                growth += TAG_GROWTH_MODIFIERS.get(tag, 0)
+                tech += TAG_TECH_MODIFIERS.get(tag, 0)
+        self.growth_modifier[i] = growth
+        self.tech_modifier[i] = tech
+
+    def _set_tag(self, i: int, slot: int, code: int) -> None:
+        (self.tag_1 if slot == 1 else self.tag_2)[i] = code
+        self._update_modifiers(i)
+
+    def advance(self, rng: random.Random | None = None) -> None:
+        """
+        Play one turn: end and start crises, drift tech ages, then grow
+        every population.
+        """
+        count: int = len(self)
+        pop: array = self.population
+
+        # Crises ending
+        ending: list[int] = list(self.crises)
+        for i, roll in zip(ending, roll_many(len(ending), rng=rng)):
+            if roll >= CRISIS_END:
+                slot, code = self.crises.pop(i)
+                if code == NO_TAG:
+                    tag: WorldTag = world_tag(slot, _dice(rng))
+                    code = _tag_code(tag)
+                    if tag in CRISIS_TAGS:
+                        self.crises[i] = (slot, NO_TAG)
+                self._set_tag(i, slot, code)
+
+        # Crises starting
+        starting: list[int] = [
+            i
+            for i in skip_sample(count, CRISIS_CHANCE, rng)
+            if pop[i] > 0 and i not in self.crises
+        ]
+        for i, roll in zip(starting, roll_many(len(starting), rng=rng)):
+            tag = CRISIS_TABLE[roll]
+            slot = _slot_of(tag)
+            self.crises[i] = (slot, (self.tag_1 if slot == 1 else self.tag_2)[i])
+            self._set_tag(i, slot, tag.value)
+
+        # Tech drift
+        drifting: list[int] = [
+            i for i in skip_sample(count, TECH_DRIFT_CHANCE, rng) if pop[i] > 0
+        ]
+        tech: array = self.tech
+        for i, roll in zip(drifting, roll_many(len(drifting), rng=rng)):
+            offset: int = _TECH_DRIFT[roll + self.tech_modifier[i]]
+            age: int = tech[i]
+            if offset:
+                # Cosmic worlds can fall but never rise past Late Galactic
+                tech[i] = max(
+                    TechAge.EARLY_PRIMITIVE.value,
+                    min(max(age, TechAge.LATE_GALACTIC.value), age + offset),
+                )
+
+        # Population growth, for every world at once
+        rates: list[float] = list(
+            map(
+                _GROWTH.__getitem__,
+                map(add, roll_many(count, rng=rng), self.growth_modifier),
+            )
+        )
+        grown: list[float] = [
+            p + p * (rate - rate * p / c if rate > 0 else rate)
+            for p, rate, c in zip(pop, rates, self.capacity)
+        ]
+        # a world with less than one person left is empty for good
+        self.population = array("d", [q if q >= 1 else 0.0 for q in grown])
+        self.turn += 1
+
+    def snapshot(self) -> Sector:
+        """
+        Return the sector as it stands, with populations rounded to three
+        significant figures.
+        """
+        planets: list[Planet] = []
+        for p, pop, age, tag_1, tag_2 in zip(
+            self.planets, self.population, self.tech, self.tag_1, self.tag_2
+        ):
+            n: int = significant(pop)
+            planets.append(
+                replace(
+                    p,
+                    population=n,
+                    tech_age=TechAge(age) if n else TechAge.NO_TECHNOLOGY,
+                    world_tag_1=_tag_of(tag_1),
+                    world_tag_2=_tag_of(tag_2),
+                )
+            )
+        return Sector(self.sector.bounds, self.sector.stars, planets)
+
+
+def evolve(
+    state: SectorState, turns: int, every: int, rng: random.Random | None = None
+):
+    """
+    Advance `state` by `turns` turns, yielding (turn, sector) every
+    `every` turns and after the last one.
+    """
+    assert turns >= 0
+    assert every >= 1
+    for turn in range(1, turns + 1):
+        state.advance(rng)
+        if turn % every == 0 or turn == turns:
+            yield state.turn, state.snapshot()
+
+
+######################### MAIN #########################################
+
+
+def main() -> None:
+    # Parse arguments
+    parser = argparse.ArgumentParser(
+        description="Advance the worlds of `nomadsec.py` output through time"
+    )
+    parser.add_argument(
+        "inputfile",
+        help="file containing `nomadsec.py` data in any text format, compressed"
+        " or not",
+    )
+    parser.add_argument(
+        "-T",
+        "--turns",
+        help="number of turns, in years (default 100)",
+        default=100,
+        type=int,
+    )
+    parser.add_argument(
+        "-e",
+        "--every",
+        help="write a snapshot every EVERY turns (default: only the last turn)",
+        type=int,
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="output file; with --every it must contain {turn}, which is"
+        " replaced by the turn number, and *.gz, *.bz2, *.xz and *.zst are"
+        " compressed as they are written (default: standard output)",
+        default="-",
+    )
+    parser.add_argument(
+        "--seed",
+        help="seed for the random number generator",
+        type=int,
+    )
+    parser.add_argument(
+        "-a",
+        "--abbreviate",
+        help="abbreviate common strings in default format",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-j",
+        "--json",
+        help="write output as JSON",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--jsonl",
+        help="write output as JSON Lines, one planet per line",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--separator",
+        help="write with the given character as a separator",
+    )
+    parser.add_argument(
+        "--csv",
+        help="write as comma-separated values",
+        action="store_const",
+        dest="separator",
+        const=",",
+    )
+    parser.add_argument(
+        "--tsv",
+        help="write as tab-separated values",
+        action="store_const",
+        dest="separator",
+        const="\t",
+    )
+    args = parser.parse_args()
+
+    if args.turns < 0:
+        parser.error("--turns must be at least 0")
+    if args.every is not None and args.every < 1:
+        parser.error("--every must be at least 1")
+    every: int = args.every or max(args.turns, 1)
+    if args.every and args.turns > args.every and "{turn}" not in args.output:
+        parser.error("--every needs an --output containing {turn}")
+
+    from nomadcompress import open_compressed
+    from nomadout import (
+        write_as_json,
+        write_as_json_lines,
+        write_as_short_text,
+        write_as_text,
+        write_as_xsv,
+    )
+    from nomadread import read_sector
+
+    try:
+        with open_compressed(args.inputfile, encoding="UTF-8") as f:
+            sec: Sector = read_sector(f)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    state = SectorState(sec)
+    snapshots = evolve(state, args.turns, every, random.Random(args.seed))
+    if args.turns == 0:
+        snapshots = iter([(0, state.snapshot())])
+    for turn, snap in snapshots:
+        path: str = args.output.replace("{turn}", str(turn))
+        try:
+            outfile = open_compressed(path, "w", encoding="UTF-8")
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        try:
+            if args.json:
+                write_as_json(outfile, snap.bounds, snap)
+            elif args.jsonl:
+                write_as_json_lines(outfile, snap)
+            elif args.separator:
+                write_as_xsv(outfile, snap, args.separator)
+            elif args.abbreviate:
+                write_as_short_text(outfile, snap)
+            else:
+                write_as_text(outfile, snap)
+        finally:
+            if outfile is not sys.stdout:
+                outfile.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+import argparse
+import hashlib
+import io
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from nomadnames import MAX_ATTEMPTS
+
+##################### EXCLUDE STORES ###############################
+
+EXCLUDE_SUFFIX: str = ".nexclude"
+
+# A store is this header (magic, number of names, bits in the Bloom
+# filter, hashes per name), then the Bloom filter, then the offset of
+# each name and of the end, then the names as UTF-8, sorted by bytes
+EXCLUDE_MAGIC: bytes = b"NOMADEX1"
+EXCLUDE_HEADER: struct.Struct = struct.Struct("<8sqqq")
+OFFSET: struct.Struct = struct.Struct("<q")
+
+# About 1% of names not in a store get past its Bloom filter
+BLOOM_BITS_PER_NAME: int = 10
+BLOOM_HASHES: int = 7
+
+
+class ExcludeError(ValueError):
+    pass
+
+
+def _bloom_hashes(key: bytes, bits: int, hashes: int) -> Iterator[int]:
+    # two hashes from one digest, combined as Kirsch and Mitzenmacher do
+    digest: bytes = hashlib.blake2b(key, digest_size=16).digest()
+    h1: int = int.from_bytes(digest[:8], "little")
+    h2: int = int.from_bytes(digest[8:], "little") | 1
+    for i in range(hashes):
+        yield (h1 + i * h2) % bits
+
+
+def build_store(names: Iterable[str]) -> bytes:
+    """
+    Return the bytes of a store holding `names`, each stripped of
+    surrounding whitespace; blank names and repeats are dropped.
+    """
+    keys: list[bytes] = sorted(
+        {name.strip().encode("UTF-8") for name in names} - {b""}
+    )
+    bits: int = max(64, -(-len(keys) * BLOOM_BITS_PER_NAME // 64) * 64)
+    bloom = bytearray(bits // 8)
+    for key in keys:
+        for bit in _bloom_hashes(key, bits, BLOOM_HASHES):
+            bloom[bit >> 3] |= 1 << (bit & 7)
+    offsets = bytearray(OFFSET.size * (len(keys) + 1))
+    at: int = 0
+    for i, key in enumerate(keys):
+        OFFSET.pack_into(offsets, OFFSET.size * i, at)
+        at += len(key)
+    OFFSET.pack_into(offsets, OFFSET.size * len(keys), at)
+    return b"".join(
+        [
+            EXCLUDE_HEADER.pack(EXCLUDE_MAGIC, len(keys), bits, BLOOM_HASHES),
+            bloom,
+            offsets,
+        ]
+        + keys
+    )
+
+
+class ExcludeStore:
+    """
+    A sorted, memory-mapped table of names not to use.  Looking a name
+    up checks the Bloom filter first, so most names that are not in the
+    store touch only a few pages of it; the rest are found by binary
+    search.
+    """
+
+    def __init__(self, data: bytes | mmap.mmap) -> None:
+        if len(data) < EXCLUDE_HEADER.size:
+            raise ExcludeError("not an exclude store: too short")
+        magic, count, bits, hashes = EXCLUDE_HEADER.unpack_from(data)
+        if magic != EXCLUDE_MAGIC:
+            raise ExcludeError("not an exclude store")
+        self._data: bytes | mmap.mmap = data
+        self.count: int = count
+        self.bits: int = bits
+        self.hashes: int = hashes
+        self._bloom: int = EXCLUDE_HEADER.size
+        self._offsets: int = self._bloom + bits // 8
+        self._names: int = self._offsets + OFFSET.size * (count + 1)
+        if len(data) < self._names:
+            raise ExcludeError("exclude store is truncated")
+        self._view: memoryview = memoryview(data)
+        self.offsets: memoryview | array = self._view[
+            self._offsets : self._names
+        ].cast("q")
+        if sys.byteorder != "little":
+            self.offsets = array("q", self.offsets)
+            self.offsets.byteswap()
+        if len(data) < self._names + self.offsets[count]:
+            raise ExcludeError("exclude store is truncated")
+
+    def close(self) -> None:
+        if isinstance(self.offsets, memoryview):
+            self.offsets.release()
+        self._view.release()
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    def __enter__(self) -> "ExcludeStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _key(self, i: int) -> bytes:
+        return self._data[
+            self._names + self.offsets[i] : self._names + self.offsets[i + 1]
+        ]
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self.count):
+            yield self._key(i).decode("UTF-8")
+
+    def __contains__(self, name: object) -> bool:
+        if not isinstance(name, str):
+            return False
+        key: bytes = name.strip().encode("UTF-8")
+        data = self._data
+        for bit in _bloom_hashes(key, self.bits, self.hashes):
+            if not data[self._bloom + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid: int = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < self.count and self._key(lo) == key
+
+
+def is_store(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(EXCLUDE_MAGIC)) == EXCLUDE_MAGIC
+
+
+def open_store(path: str) -> ExcludeStore:
+    """Open a store file, memory-mapped."""
+    with open(path, "rb") as f:
+        if f.read(len(EXCLUDE_MAGIC)) != EXCLUDE_MAGIC:
+            raise ExcludeError(f"{path}: not an exclude store")
+        return ExcludeStore(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def add_names(path: str, names: Iterable[str]) -> int:
+    """
+    Add `names` to the store at `path`, creating it if need be, and
+    return how many were new.  The store is rewritten to a new file
+    that then replaces it, so runs already reading it are unaffected.
+    """
+    old: list[str] = []
+    if os.path.exists(path):
+        with open_store(path) as store:
+            new: set[str] = {n.strip() for n in names if n.strip() not in store}
+            old = list(store)
+    else:
+        new = {n.strip() for n in names}
+    new.discard("")
+    if not new and os.path.exists(path):
+        return 0
+    data: bytes = build_store(old + list(new))
+    temp: str = path + ".tmp"
+    with open(temp, "wb") as f:
+        f.write(data)
+    os.replace(temp, path)
+    return len(new)
+
+
+class ExcludedNameSet:
+    """
+    A `NameSet` that passes on names from `nameset` only if they are not
+    in `store`.  If no such name turns up in MAX_ATTEMPTS tries,
+    `make_name()` raises `ExcludeError`.
+    """
+
+    def __init__(self, nameset: Any, store: ExcludeStore) -> None:
+        self.nameset = nameset
+        self.store: ExcludeStore = store
+
+    def add_to_history(self, name_s) -> None:
+        self.nameset.add_to_history(name_s)
+
+    def make_name(self) -> str:
+        for _ in range(MAX_ATTEMPTS):
+            name: str = self.nameset.make_name()
+            if name not in self.store:
+                return name
+        raise ExcludeError(
+            f"out of names: every one in {MAX_ATTEMPTS} tries is excluded"
+        )
+
+
+###################### READING NAMES ###############################
+
+
+def is_sector_output(firstline: str) -> bool:
+    """
+    Whether `firstline` starts a file `nomadsec.py` wrote.  A name in a
+    list can look like the start of one, so the header must be exact.
+    """
+    import csv
+    import json
+
+    from nomadread import (
+        SHORT_TEXT_COLUMNS,
+        TEXT_COLUMNS,
+        XSV_COLUMNS,
+        SectorFormat,
+        detect_format,
+    )
+
+    try:
+        fmt, sep = detect_format(firstline)
+    except ValueError:
+        return False
+    line: str = firstline.lstrip("\ufeff").strip()
+    if fmt == SectorFormat.JSON:
+        return line == "{"
+    if fmt == SectorFormat.JSON_LINES:
+        obj: Any = json.loads(line)
+        return isinstance(obj, dict) and "name" in obj and "hex" in obj
+    if fmt == SectorFormat.XSV:
+        return tuple(next(csv.reader([line], delimiter=sep or ","))) == XSV_COLUMNS
+    header: tuple[str, ...] = tuple(c.strip() for c in line.strip("|").split("|"))
+    return header in (TEXT_COLUMNS, SHORT_TEXT_COLUMNS)
+
+
+def read_names(infile) -> Iterator[str]:
+    """
+    Read the star and planet names from any text format `nomadsec.py`
+    writes, or the names in a plain list, one to a line.
+    """
+    text: str = infile.read().lstrip("\ufeff")
+    if not is_sector_output(text.lstrip().partition("\n")[0]):
+        for line in text.splitlines():
+            yield line.strip()
+        return
+
+    from nomadread import read_sector
+
+    sector = read_sector(io.StringIO(text))
+    for star in sector.stars:
+        yield star.name
+    for planet in sector.planets:
+        yield planet.name
+
+
+######################### MAIN #########################################
+
+
+def main() -> None:
+    # Parse arguments
+    from nomadcompress import CompressedFileType
+
+    parser = argparse.ArgumentParser(
+        description="Keep a store of names for `nomadsec.py -x` not to use"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    add_cmd = sub.add_parser(
+        "add",
+        help="add the names from `nomadsec.py` outputs or name lists,"
+        " creating the store if need be",
+    )
+    add_cmd.add_argument("store", help=f"store file, usually *{EXCLUDE_SUFFIX}")
+    add_cmd.add_argument(
+        "inputfile",
+        help="`nomadsec.py` output in any text format, or a name list,"
+        " compressed or not (default: standard input)",
+        nargs="*",
+        type=CompressedFileType(mode="r", encoding="UTF-8"),
+        default=[sys.stdin],
+    )
+    check_cmd = sub.add_parser("check", help="print which names are in the store")
+    check_cmd.add_argument("store", help="store file")
+    check_cmd.add_argument("name", help="name to look up", nargs="+")
+    list_cmd = sub.add_parser("list", help="print every name in the store")
+    list_cmd.add_argument("store", help="store file")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "add":
+            names: list[str] = []
+            for infile in args.inputfile:
+                with infile:
+                    names.extend(read_names(infile))
+            added: int = add_names(args.store, names)
+            with open_store(args.store) as store:
+                print(
+                    f"{args.store}: {added} names added, {len(store)} in all",
+                    file=sys.stderr,
+                )
+        elif args.command == "check":
+            with open_store(args.store) as store:
+                for name in args.name:
+                    if name in store:
+                        print(name)
+        else:
+            with open_store(args.store) as store:
+                for name in store:
+                    print(name)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+import argparse
+import bisect
+import csv
+import json
+import mmap
+import os
+import re
+import struct
+from array import array
+from collections.abc import Iterable, Iterator
+
+from nomadcompress import CompressedFileType, sniff_codec
+from nomadgen import (
+    DEFAULT_SECTOR_HEIGHT,
+    DEFAULT_SECTOR_WIDTH,
+    Planet,
+    Sector,
+    SectorBounds,
+    pack_coords,
+)
+from nomadout import (
+    write_as_json,
+    write_as_json_lines,
+    write_as_short_text,
+    write_as_text,
+    write_as_xsv,
+)
+from nomadread import (
+    TEXT_HEX_COL,
+    TEXT_NAME_COL,
+    XSV_HEX_COL,
+    XSV_NAME_COL,
+    PlanetBuilder,
+    SectorFormat,
+    detect_format,
+    read_json_lines,
+    read_text,
+    read_xsv,
+    str_to_coords,
+)
+
+###################### INDEX FILES ###############################
+
+INDEX_SUFFIX: str = ".hexidx"
+
+# An index file is this header (magic, length of the metadata), the JSON
+# metadata, padding to 8 bytes, then three arrays of native 64-bit ints:
+# the packed hex of every planet row in order, and each row's byte offset
+# and length in the indexed file
+INDEX_MAGIC: bytes = b"NOMADHX1"
+INDEX_HEADER: struct.Struct = struct.Struct("<8sI")
+
+
+def _aligned(n: int) -> int:
+    return (n + 7) & ~7
+
+
+# Each scanner takes (offset, end, text) for every line of a file, and
+# yields ((x, y), offset, end) for every planet row
+Lines = Iterable[tuple[int, int, str]]
+
+
+def _scan_xsv(lines: Lines, sep: str) -> Iterator[tuple]:
+    header: list[str] | None = None
+    for offset, end, line in lines:
+        if not line.strip():
+            continue
+        row: list[str] = next(csv.reader([line], delimiter=sep))
+        if header is None:
+            header = row
+            name_col: int = header.index(XSV_NAME_COL)
+            hex_col: int = header.index(XSV_HEX_COL)
+            continue
+        if row[name_col][:1] == "-" or row[hex_col][:1] == "-":
+            continue
+        yield str_to_coords(row[hex_col]), offset, end
+
+
+def _scan_text(lines: Lines) -> Iterator[tuple]:
+    for offset, end, line in lines:
+        cels: list[str] = re.split(r"\s*\|\s*", line.rstrip())
+        if len(cels) <= TEXT_HEX_COL:
+            continue
+        if cels[TEXT_NAME_COL][:1] == "-" or cels[TEXT_NAME_COL] == "Planet":
+            continue
+        yield str_to_coords(cels[TEXT_HEX_COL]), offset, end
+
+
+def _coords_of(obj: dict) -> tuple[int, int]:
+    if "x" in obj and "y" in obj:
+        return obj["x"], obj["y"]
+    return str_to_coords(obj["hex"])
+
+
+def _scan_json_lines(lines: Lines) -> Iterator[tuple]:
+    for offset, end, line in lines:
+        if line.strip():
+            yield _coords_of(json.loads(line)), offset, end
+
+
+def _scan_json(lines: Lines) -> Iterator[tuple]:
+    # the planets of a `write_as_json()` document are one object per
+    # indented block, so each can be cut out and parsed on its own
+    in_planets: bool = False
+    start: int | None = None
+    indent: str = ""
+    block: list[str] = []
+    for offset, end, line in lines:
+        stripped: str = line.strip()
+        if not in_planets:
+            in_planets = stripped == '"planets": ['
+        elif start is None:
+            if stripped == "{":
+                start, indent, block = offset, line[: line.index("{")], [line]
+            elif stripped.startswith("]"):
+                return
+        else:
+            block.append(line)
+            if line.startswith(indent + "}"):
+                text: str = "".join(block).rstrip().rstrip(",")
+                yield _coords_of(json.loads(text)), start, end
+                start = None
+
+
+def _numbered_lines(f) -> Iterator[tuple[int, int, str]]:
+    offset: int = 0
+    for raw in f:
+        yield offset, offset + len(raw), raw.decode("UTF-8").lstrip("\ufeff")
+        offset += len(raw)
+
+
+def _check_uncompressed(f, path: str) -> None:
+    # rows are found by their offsets in the file, which compression hides
+    codec = sniff_codec(f.read(8))
+    f.seek(0)
+    if codec is not None:
+        raise ValueError(
+            f"{path} is {codec.name}-compressed; only uncompressed files can be"
+            " indexed (decompress it first)"
+        )
+
+
+def build_index(path: str, index_path: str) -> None:
+    """
+    Write a sidecar index of every planet row in the `nomadsec.py` output
+    file `path`.  Only this reads the whole file.
+    """
+    with open(path, "rb") as f:
+        _check_uncompressed(f, path)
+        first: bytes = f.readline()
+        fmt, sep = detect_format(first.decode("UTF-8"))
+        st = os.fstat(f.fileno())
+        f.seek(0)
+        lines: Lines = _numbered_lines(f)
+        if fmt == SectorFormat.XSV:
+            found: Iterator[tuple] = _scan_xsv(lines, sep or ",")
+        elif fmt == SectorFormat.JSON_LINES:
+            found = _scan_json_lines(lines)
+        elif fmt == SectorFormat.JSON:
+            found = _scan_json(lines)
+        else:
+            found = _scan_text(lines)
+        rows: list[tuple[int, int, int]] = sorted(
+            (pack_coords(x, y), offset, end - offset)
+            for (x, y), offset, end in found
+        )
+
+    meta: bytes = json.dumps(
+        {
+            "format": fmt.name,
+            "separator": sep,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "count": len(rows),
+            "header": len(first) if fmt == SectorFormat.XSV else 0,
+        }
+    ).encode("UTF-8")
+    with open(index_path, "wb") as out:
+        out.write(INDEX_HEADER.pack(INDEX_MAGIC, len(meta)))
+        out.write(meta)
+        out.write(b"\0" * (_aligned(INDEX_HEADER.size + len(meta)) - out.tell()))
+        for column in zip(*rows) if rows else ((), (), ()):
+            array("Q", column).tofile(out)
+
+
+class HexIndex:
+    """
+    Where each planet's row is in a `nomadsec.py` output file, sorted by
+    hex so the rows of any rectangle of hexes take one binary search per
+    column.  The index file is memory-mapped, so opening it reads only
+    the pages a lookup touches.
+    """
+
+    def __init__(self, index_path: str) -> None:
+        with open(index_path, "rb") as f:
+            self._map: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, length = INDEX_HEADER.unpack_from(self._map)
+        if magic != INDEX_MAGIC:
+            self._map.close()
+            raise ValueError(f"not a hex index: {index_path!r}")
+        start: int = INDEX_HEADER.size
+        self.meta: dict = json.loads(self._map[start : start + length])
+        self.format: SectorFormat = SectorFormat[self.meta["format"]]
+        self.separator: str | None = self.meta["separator"]
+        n: int = self.meta["count"]
+        base: int = _aligned(start + length)
+        view = memoryview(self._map)
+        self.keys = view[base : base + 8 * n].cast("Q")
+        self.offsets = view[base + 8 * n : base + 16 * n].cast("Q")
+        self.lengths = view[base + 16 * n : base + 24 * n].cast("Q")
+
+    def close(self) -> None:
+        for v in (self.keys, self.offsets, self.lengths):
+            v.release()
+        self._map.close()
+
+    def __enter__(self) -> "HexIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def matches(self, path: str) -> bool:
+        """Whether `path` is unchanged since it was indexed."""
+        st = os.stat(path)
+        return (
+            st.st_size == self.meta["size"]
+            and st.st_mtime_ns == self.meta["mtime_ns"]
+        )
+
+    def rows_in(self, bounds: SectorBounds) -> list[tuple[int, int]]:
+        """
+        Return (offset, length) of every row in `bounds`, in file order.
+        """
+        rows: list[tuple[int, int]] = []
+        y_end: int = bounds.y + bounds.height
+        for x in bounds.x_range():
+            lo: int = bisect.bisect_left(self.keys, pack_coords(x, bounds.y))
+            hi: int = bisect.bisect_left(self.keys, pack_coords(x, y_end), lo)
+            rows.extend((self.offsets[i], self.lengths[i]) for i in range(lo, hi))
+        rows.sort()
+        return rows
+
+
+def open_index(
+    path: str, index_path: str | None = None, rebuild: bool = False
+) -> HexIndex:
+    """
+    Open the sidecar index of `path` (by default `path` + ".hexidx"),
+    building it first if it is missing or `path` has changed since.
+    """
+    index_path = index_path or path + INDEX_SUFFIX
+    if not rebuild and os.path.exists(index_path):
+        index = HexIndex(index_path)
+        if index.matches(path):
+            return index
+        index.close()
+    build_index(path, index_path)
+    return HexIndex(index_path)
+
+
+###################### EXTRACTION ###############################
+
+
+def _read_rows(f, rows: list[tuple[int, int]]) -> Iterator[str]:
+    # rows next to each other in the file are read together
+    i: int = 0
+    while i < len(rows):
+        start, length = rows[i]
+        j: int = i + 1
+        while j < len(rows) and rows[j][0] == start + length:
+            length += rows[j][1]
+            j += 1
+        f.seek(start)
+        block: bytes = f.read(length)
+        pos: int = 0
+        for _, n in rows[i:j]:
+            yield block[pos : pos + n].decode("UTF-8").lstrip("\ufeff")
+            pos += n
+        i = j
+
+
+def extract(path: str, bounds: SectorBounds, index: HexIndex) -> Sector:
+    """
+    Read only the planets in `bounds` from the `nomadsec.py` output file
+    `path`, using its index.
+    """
+    builder = PlanetBuilder()
+    planets: Iterable[Planet]
+    with open(path, "rb") as f:
+        _check_uncompressed(f, path)
+        chunks: list[str] = list(_read_rows(f, index.rows_in(bounds)))
+        f.seek(0)
+        header: str = f.read(index.meta["header"]).decode("UTF-8").lstrip("\ufeff")
+    if index.format == SectorFormat.JSON:
+        planets = [
+            builder.planet_from_json(json.loads(c.rstrip().rstrip(",")))
+            for c in chunks
+        ]
+    elif index.format == SectorFormat.JSON_LINES:
+        planets = list(read_json_lines(chunks, builder))
+    elif index.format == SectorFormat.XSV:
+        planets = list(read_xsv([header] + chunks, builder, index.separator or ","))
+    else:
+        planets = list(read_text(chunks, builder))
+    return Sector(bounds, sorted(builder.stars.values()), planets)
+
+
+######################### MAIN #########################################
+
+
+def main() -> None:
+    # Parse arguments
+    parser = argparse.ArgumentParser(
+        description="Extract a region of hexes from `nomadsec.py` output"
+        " without reading all of it"
+    )
+    parser.add_argument(
+        "inputfile",
+        help="file containing `nomadsec.py` data in any format",
+    )
+    parser.add_argument(
+        "-W",
+        "--width",
+        help="number of hexes/parsecs across",
+        default=DEFAULT_SECTOR_WIDTH,
+        type=int,
+    )
+    parser.add_argument(
+        "-H",
+        "--height",
+        help="number of hexes/parsecs down",
+        default=DEFAULT_SECTOR_HEIGHT,
+        type=int,
+    )
+    parser.add_argument(
+        "-X",
+        "--start-width",
+        help="first index across",
+        default=1,
+        type=int,
+    )
+    parser.add_argument(
+        "-Y",
+        "--start-height",
+        help="first index down",
+        default=1,
+        type=int,
+    )
+    parser.add_argument(
+        "-i",
+        "--index",
+        help=f"sidecar index file (default: INPUTFILE{INDEX_SUFFIX})",
+    )
+    parser.add_argument(
+        "--rebuild",
+        help="rebuild the index even if it is up to date",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="output file; *.gz, *.bz2, *.xz and *.zst are compressed as they"
+        " are written",
+        default="-",
+        type=CompressedFileType(mode="w", encoding="UTF-8"),
+    )
+    parser.add_argument(
+        "-a",
+        "--abbreviate",
+        help="abbreviate common strings in default format",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-j",
+        "--json",
+        help="write output as JSON",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--jsonl",
+        help="write output as JSON Lines, one planet per line",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--separator",
+        help="write with the given character as a separator",
+    )
+    parser.add_argument(
+        "--csv",
+        help="write as comma-separated values",
+        action="store_const",
+        dest="separator",
+        const=",",
+    )
+    parser.add_argument(
+        "--tsv",
+        help="write as tab-separated values",
+        action="store_const",
+        dest="separator",
+        const="\t",
+    )
+    args = parser.parse_args()
+
+    bounds = SectorBounds(
+        height=args.height,
+        width=args.width,
+        x=args.start_width,
+        y=args.start_height,
+    )
+    try:
+        with open_index(args.inputfile, args.index, args.rebuild) as index:
+            sec: Sector = extract(args.inputfile, bounds, index)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    with args.output as outfile:
+        if args.json:
+            write_as_json(outfile, bounds, sec)
+        elif args.jsonl:
+            write_as_json_lines(outfile, sec)
+        elif args.separator:
+            write_as_xsv(outfile, sec, args.separator)
+        elif args.abbreviate:
+            write_as_short_text(outfile, sec)
+        else:
+            write_as_text(outfile, sec)
+
+
+if __name__ == "__main__":
+    main()
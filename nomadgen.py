@@ -0,0 +1,713 @@
+import bisect
+import itertools
+import random
+import sys
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Protocol, Tuple
+
+from nomaddice import BatchDice, nomad_dice, skip_sample
+from nomadoptions import (
+    DEFAULT_DENSITY,
+    DEFAULT_SECTOR_HEIGHT,
+    DEFAULT_SECTOR_WIDTH,
+    DEFAULT_SUFFIX_SCHEME,
+    MAXIMUM_DENSITY,
+    MINIMUM_DENSITY,
+)
+from nomadtables import (
+    Characteristic,
+    NomadDice,
+    SETTLEMENT_TYPES,
+    Settlement,
+    TECHNOLOGY_AGES,
+    TRADE_CLASS_TYPES,
+    TechAge,
+    TradeClass,
+    WorldTag,
+    characteristic,
+    population,
+    tech_age,
+    trade_class,
+    world_tag,
+    worlds_per_system,
+)
+
+###################### CONSTANTS ###############################
+
+# Coordinates are expressed as (number across, number down) starting at 1,
+# and may grow past any one Traveller sector (see `hexcode_of()`).  The
+# default size, density, noise scale and suffix scheme are command-line
+# defaults, so they are in `nomadoptions.py`.
+DEFAULT_SECTOR_X: int = 1
+DEFAULT_SECTOR_Y: int = 1
+
+# Size of a Traveller sector; hex codes count from 0101 within each one
+TRAVELLER_SECTOR_WIDTH: int = 32
+TRAVELLER_SECTOR_HEIGHT: int = 40
+
+# Bits per coordinate in a packed key, and the offset that keeps negative
+# coordinates in order
+KEY_BITS: int = 32
+KEY_OFFSET: int = 1 << (KEY_BITS - 1)
+
+# Pairs for spelling out Roman numerals, largest first
+ROMAN_NUMERALS: list[tuple[int, str]] = [
+    (1000, "M"),
+    (900, "CM"),
+    (500, "D"),
+    (400, "CD"),
+    (100, "C"),
+    (90, "XC"),
+    (50, "L"),
+    (40, "XL"),
+    (10, "X"),
+    (9, "IX"),
+    (5, "V"),
+    (4, "IV"),
+    (1, "I"),
+]
+
+##################### PROTOCOLS ##############################
+
+
+class NameSet(Protocol):
+    def make_name(self) -> str:
+        return ""   # keep type checkers happy
+
+    def add_to_history(self, name_s) -> None: ...
+
+
+class Mask(Protocol):
+    """
+    Per-hex density, settlement level and tech age, any of which may be
+    left to the defaults given for the whole map (see `nomadmask.py`).
+    """
+
+    def densities(self, bounds: "SectorBounds", default: int) -> list[bytes]:
+        """The density of every hex, a `bytes` for each column of `bounds`."""
+        return []   # keep type checkers happy
+
+    def settlement_at(
+        self, x: int, y: int, default: Settlement | None
+    ) -> Settlement | None: ...
+
+    def tech_age_at(
+        self, x: int, y: int, default: TechAge | None
+    ) -> TechAge | None: ...
+
+
+class SerialNameSet:
+    """
+    A `NameSet` that just numbers its names, for when the names
+    don't matter and namemaker would only slow things down.
+    """
+
+    def __init__(self, prefix: str = "Star") -> None:
+        self.prefix: str = prefix
+        self.count: int = 0
+
+    def make_name(self) -> str:
+        self.count += 1
+        return f"{self.prefix} {self.count}"
+
+    def add_to_history(self, name_s) -> None:
+        pass
+
+
+def roman_numeral(n: int) -> str:
+    assert n > 0
+    result: list[str] = []
+    for value, numeral in ROMAN_NUMERALS:
+        count, n = divmod(n, value)
+        result.append(numeral * count)
+    return "".join(result)
+
+
+# Ways to name the secondary worlds of a system after its star, by the
+# world's position (2 for the first secondary, the main world being 1)
+SUFFIX_SCHEMES: dict[str, Callable[[int], str]] = {
+    "roman": roman_numeral,
+    "letter": lambda n: chr(ord("a") + n - 1) if n <= 26 else str(n),
+    "number": str,
+}
+
+##################### COORDINATES ###########################
+
+
+def pack_coords(x: int, y: int) -> int:
+    """
+    Pack global coordinates into one int that sorts like (x, y).
+    """
+    assert -KEY_OFFSET <= x < KEY_OFFSET and -KEY_OFFSET <= y < KEY_OFFSET
+    return ((x + KEY_OFFSET) << KEY_BITS) | (y + KEY_OFFSET)
+
+
+def unpack_coords(key: int) -> tuple[int, int]:
+    return (key >> KEY_BITS) - KEY_OFFSET, (key & ((1 << KEY_BITS) - 1)) - KEY_OFFSET
+
+
+def sector_of(x: int, y: int) -> tuple[int, int]:
+    """Return which Traveller sector (across, down) holds a hex, from (0, 0)."""
+    return (x - 1) // TRAVELLER_SECTOR_WIDTH, (y - 1) // TRAVELLER_SECTOR_HEIGHT
+
+
+def hexcode_of(x: int, y: int) -> str:
+    """Return the four-digit hex code of a hex within its Traveller sector."""
+    return (
+        f"{(x - 1) % TRAVELLER_SECTOR_WIDTH + 1:02d}"
+        f"{(y - 1) % TRAVELLER_SECTOR_HEIGHT + 1:02d}"
+    )
+
+
+def location_of(x: int, y: int) -> str:
+    """
+    Return a hex's code, prefixed with its sector as "sx.sy:" unless it
+    is in the first sector, so every hex on any map has its own location.
+    """
+    sx, sy = sector_of(x, y)
+    code: str = hexcode_of(x, y)
+    return code if sx == 0 and sy == 0 else f"{sx}.{sy}:{code}"
+
+
+def hex_distance(x1: int, y1: int, x2: int, y2: int) -> int:
+    """
+    Return the distance in parsecs between two hexes, given as global
+    coordinates on the Traveller layout (even columns half a hex lower).
+    """
+    # to axial coordinates, where a step in any direction changes q, r or
+    # q + r by one
+    q1, r1 = x1, y1 - (x1 + (x1 & 1)) // 2
+    q2, r2 = x2, y2 - (x2 + (x2 & 1)) // 2
+    dq, dr = q2 - q1, r2 - r1
+    return (abs(dq) + abs(dr) + abs(dq + dr)) // 2
+
+
+####################### SECTORS ###############################
+
+
+@dataclass(frozen=True, order=True, kw_only=True, slots=True)
+class StarHex:
+    # (x, y) packed by `pack_coords()`, so stars compare and hash on an int
+    key: int = field(init=False, repr=False)
+    x: int = field(compare=False)
+    y: int = field(compare=False)
+    name: str
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "key", pack_coords(self.x, self.y))
+
+    @property
+    def sector(self) -> tuple[int, int]:
+        return sector_of(self.x, self.y)
+
+    @property
+    def hexcode(self) -> str:
+        return hexcode_of(self.x, self.y)
+
+    @property
+    def location(self) -> str:
+        return location_of(self.x, self.y)
+
+    def repr(self) -> str:
+        return f"StarHex({self.hexcode}, {repr(self.name)})"
+
+
+@dataclass(frozen=True, order=True, repr=True, kw_only=True, slots=True)
+class Planet():
+    name: str
+    star: StarHex
+    trade_class: TradeClass
+    chara: Characteristic
+    population: int
+    tech_age: TechAge
+    world_tag_1: WorldTag | None
+    world_tag_2: WorldTag | None
+
+    @property
+    def hexcode(self) -> str:
+        return self.star.hexcode if self.star else "????"
+
+    @property
+    def location(self) -> str:
+        return self.star.location if self.star else "????"
+
+
+@dataclass(order=True, repr=True)
+class StarSystem:
+    star: StarHex
+    planets: list[Planet] = field(default_factory=list)
+
+    def add_planet(self, p: Planet) -> None:
+        self.planets.append(p)
+
+
+@dataclass(repr=True)
+class SectorBounds:
+    height: int = DEFAULT_SECTOR_HEIGHT
+    width: int = DEFAULT_SECTOR_WIDTH
+    x: int = DEFAULT_SECTOR_X
+    y: int = DEFAULT_SECTOR_Y
+
+
+    def x_range(self) -> Iterable[int]:
+        return range(self.x, self.width + self.x)
+
+
+    def y_range(self) -> Iterable[int]:
+        return range(self.y, self.height + self.y)
+
+
+class Sector:
+    """
+    The stars, planets and star systems of one map, indexed by location,
+    name, trade class and tech age as they are added, with running
+    totals.  Iterating over a sector yields its planets in the order they
+    were added, so it can go anywhere a list of planets can.
+    """
+
+    def __init__(
+        self,
+        bounds: SectorBounds | None = None,
+        stars: Iterable[StarHex] | None = None,
+        planets: Iterable[Planet] | None = None,
+    ) -> None:
+        self.bounds: SectorBounds = bounds if bounds else SectorBounds()
+        self.stars: list[StarHex] = []
+        self.planets: list[Planet] = []
+        # systems in order of their stars
+        self.systems: list[StarSystem] = []
+        self.by_star: dict[StarHex, StarSystem] = {}
+        self.by_location: dict[str, StarSystem] = {}
+        self.by_name: dict[str, list[Planet]] = {}
+        self.by_trade_class: dict[TradeClass, list[Planet]] = {}
+        self.by_tech_age: dict[TechAge, list[Planet]] = {}
+        self.population: int = 0
+        self.populated: int = 0
+        # longest planet or star name, and longest location
+        self.name_length: int = 0
+        self.location_length: int = 0
+        for s in stars or ():
+            self.add_star(s)
+        for p in planets or ():
+            self.add_planet(p)
+
+    def __iter__(self) -> Iterator[Planet]:
+        return iter(self.planets)
+
+    def __len__(self) -> int:
+        return len(self.planets)
+
+    def add_star(self, star: StarHex) -> StarSystem:
+        system: StarSystem | None = self.by_star.get(star)
+        if system is None:
+            system = StarSystem(star)
+            self.by_star[star] = system
+            self.by_location[star.location] = system
+            self.location_length = max(self.location_length, len(star.location))
+            self.stars.append(star)
+            # stars usually arrive in order, so this is almost always an append
+            if not self.systems or self.systems[-1].star < star:
+                self.systems.append(system)
+            else:
+                bisect.insort(self.systems, system)
+            self.name_length = max(self.name_length, len(star.name))
+        return system
+
+    def add_planet(self, p: Planet) -> None:
+        self.add_star(p.star).add_planet(p)
+        self.planets.append(p)
+        self.by_name.setdefault(p.name, []).append(p)
+        self.by_trade_class.setdefault(p.trade_class, []).append(p)
+        self.by_tech_age.setdefault(p.tech_age, []).append(p)
+        if p.population > 0:
+            self.population += p.population
+            self.populated += 1
+        self.name_length = max(self.name_length, len(p.name))
+
+    def system_at(self, location: str) -> StarSystem | None:
+        return self.by_location.get(location)
+
+    def named(self, name: str) -> list[Planet]:
+        return self.by_name.get(name, [])
+
+    def with_trade_class(self, tc: TradeClass) -> list[Planet]:
+        return self.by_trade_class.get(tc, [])
+
+    def with_tech_age(self, age: TechAge) -> list[Planet]:
+        return self.by_tech_age.get(age, [])
+
+    def trade_class_counts(self) -> dict[TradeClass, int]:
+        return {tc: len(ps) for tc, ps in self.by_trade_class.items()}
+
+    def tech_age_counts(self) -> dict[TechAge, int]:
+        return {age: len(ps) for age, ps in self.by_tech_age.items()}
+
+
+def collect_star_systems(
+    planets: Iterable[Planet], stars: Iterable[StarHex] | None = None
+) -> list[StarSystem]:
+    if isinstance(planets, Sector) and stars is None:
+        return planets.systems
+    return Sector(stars=stars, planets=planets).systems
+
+
+def _uniform_source(roll: NomadDice) -> Any:
+    # the source of uniform draws behind dice known to be fair, or None
+    roll = getattr(roll, "__wrapped__", roll)
+    if roll is nomad_dice:
+        return random
+    if isinstance(roll, BatchDice):
+        return roll.rng or random
+    return None
+
+
+def make_stars(
+    nameset: NameSet,
+    density: int = DEFAULT_DENSITY,
+    bounds: SectorBounds | None = None,
+    roll: NomadDice = nomad_dice,
+    mask: Mask | None = None,
+) -> list[StarHex]:
+    """
+    Place a star in each hex of `bounds` with probability `density` in 6,
+    or with the hex's own density (0 to 6) from `mask`.
+    With the default dice or a `BatchDice`, only the hexes that get a star
+    are visited (see `skip_sample()`); any other dice are still rolled
+    once per hex, so they see the same rolls as always.
+    """
+
+    b: SectorBounds = bounds if bounds else SectorBounds()
+
+    # Check args
+    assert MINIMUM_DENSITY <= density <= MAXIMUM_DENSITY
+    assert b.height > 0
+    assert b.width > 0
+    assert b.x > 0
+    assert b.y > 0
+    assert roll
+
+    if mask is not None:
+        return _masked_stars(nameset, b, mask.densities(b, density), roll)
+
+    rng = _uniform_source(roll)
+    if rng is None:
+        return [
+            StarHex(x=x, y=y, name=nameset.make_name())
+            for x, y in itertools.product(b.x_range(), b.y_range())
+            if roll(1, 0, MAXIMUM_DENSITY, MINIMUM_DENSITY) <= density
+        ]
+
+    # hexes numbered down each column in turn, as above
+    chance: float = (density - MINIMUM_DENSITY + 1) / (
+        MAXIMUM_DENSITY - MINIMUM_DENSITY + 1
+    )
+    return [
+        StarHex(
+            x=b.x + i // b.height, y=b.y + i % b.height, name=nameset.make_name()
+        )
+        for i in skip_sample(b.width * b.height, chance, rng)
+    ]
+
+
+def _masked_stars(
+    nameset: NameSet, b: SectorBounds, columns: list[bytes], roll: NomadDice
+) -> list[StarHex]:
+    rng = _uniform_source(roll)
+    if rng is None:
+        return [
+            StarHex(x=b.x + i, y=b.y + j, name=nameset.make_name())
+            for i, column in enumerate(columns)
+            for j, density in enumerate(column)
+            if roll(1, 0, MAXIMUM_DENSITY, MINIMUM_DENSITY) <= density
+        ]
+
+    # sample at the highest density, then keep each hex found with the
+    # odds of its own density against that, so every hex still gets a
+    # star with probability (its density) in 6
+    top: int = max(max(c, default=0) for c in columns)
+    if top <= 0:
+        return []
+    chance: float = top / MAXIMUM_DENSITY
+    stars: list[StarHex] = []
+    for i in skip_sample(b.width * b.height, chance, rng):
+        density: int = columns[i // b.height][i % b.height]
+        if density == top or rng.random() * top < density:
+            stars.append(
+                StarHex(
+                    x=b.x + i // b.height,
+                    y=b.y + i % b.height,
+                    name=nameset.make_name(),
+                )
+            )
+    return stars
+
+
+def _hex_settings(
+    star: StarHex,
+    settlement: Settlement | None,
+    avg_age: TechAge | None,
+    mask: Mask | None,
+) -> tuple[Settlement | None, TechAge | None]:
+    if mask is None:
+        return settlement, avg_age
+    return (
+        mask.settlement_at(star.x, star.y, settlement),
+        mask.tech_age_at(star.x, star.y, avg_age),
+    )
+
+
+def make_planet(
+    star: StarHex,
+    name: str,
+    settlement: Settlement | None = None,
+    avg_age: TechAge | None = None,
+    tcin: TradeClass | None = None,
+    roll: NomadDice = nomad_dice,
+) -> Planet:
+    assert star
+    assert name
+    assert not settlement or settlement in SETTLEMENT_TYPES
+    assert not avg_age or avg_age in TECHNOLOGY_AGES
+    assert not tcin or tcin in TRADE_CLASS_TYPES
+    assert roll
+
+    tc: TradeClass = tcin or trade_class(settlement, roll)
+    cha: Characteristic = characteristic(tc, roll)
+    pop: int = population(tc, settlement, roll)
+    ta: TechAge = tech_age(pop, avg_age, roll)
+
+    return Planet(
+        star=star,
+        name=name,
+        trade_class=tc,
+        chara=cha,
+        population=pop,
+        tech_age=ta,
+        world_tag_1=world_tag(1, roll),
+        world_tag_2=world_tag(2, roll),
+    )
+
+
+def sector(
+    nameset: NameSet,
+    avg_age: TechAge | None = None,
+    settlement: Settlement | None = None,
+    density: int = DEFAULT_DENSITY,
+    bounds: SectorBounds | None = None,
+    roll: NomadDice = nomad_dice,
+    profiler: "Profiler | None" = None,
+    mask: Mask | None = None,
+) -> Tuple[list[Planet], list[StarHex]]:
+
+    # generate a map of stars
+    with _stage(profiler, "stars"):
+        stars: list[StarHex] = make_stars(
+            profiler.timed_nameset(nameset) if profiler else nameset,
+            density=density,
+            bounds=bounds,
+            roll=roll,
+            mask=mask,
+        )
+
+    # generate (one) planet for each star
+    with _stage(profiler, "planets"):
+        if mask is None:
+            planets: list[Planet] = [
+                make_planet(s, s.name, settlement, avg_age, None, roll)
+                for s in stars
+            ]
+        else:
+            planets = [
+                make_planet(
+                    s, s.name, *_hex_settings(s, settlement, avg_age, mask), None, roll
+                )
+                for s in stars
+            ]
+
+    return planets, stars
+
+
+def make_system(
+    star: StarHex,
+    settlement: Settlement | None = None,
+    avg_age: TechAge | None = None,
+    suffix: Callable[[int], str] = roman_numeral,
+    roll: NomadDice = nomad_dice,
+) -> StarSystem:
+    """
+    Roll the number of worlds around `star`, then each world.  The main
+    world takes the star's name and the rest add a `suffix` to it, so
+    the name set is only asked once per star.
+    """
+    system: StarSystem = StarSystem(star)
+    for n in range(1, worlds_per_system(roll) + 1):
+        name: str = star.name if n == 1 else f"{star.name} {suffix(n)}"
+        system.add_planet(make_planet(star, name, settlement, avg_age, None, roll))
+    return system
+
+
+def star_systems(
+    nameset: NameSet,
+    avg_age: TechAge | None = None,
+    settlement: Settlement | None = None,
+    density: int = DEFAULT_DENSITY,
+    bounds: SectorBounds | None = None,
+    suffix: str = DEFAULT_SUFFIX_SCHEME,
+    roll: NomadDice | None = None,
+    profiler: "Profiler | None" = None,
+    mask: Mask | None = None,
+) -> Iterator[StarSystem]:
+    """
+    Like `sector()`, but with a whole system of worlds for each star,
+    yielded one system at a time so they can be written out as they are
+    made.  Unless given other dice, all rolls come from one `BatchDice`.
+    """
+    dice: NomadDice = roll if roll else BatchDice()
+    with _stage(profiler, "stars"):
+        stars: list[StarHex] = make_stars(
+            profiler.timed_nameset(nameset) if profiler else nameset,
+            density=density,
+            bounds=bounds,
+            roll=dice,
+            mask=mask,
+        )
+    suffix_fn: Callable[[int], str] = SUFFIX_SCHEMES[suffix]
+    for s in stars:
+        yield make_system(
+            s, *_hex_settings(s, settlement, avg_age, mask), suffix_fn, dice
+        )
+
+
+####################### PROFILING ####################################
+
+
+@dataclass(slots=True)
+class StageStats:
+    calls: int = 0
+    seconds: float = 0.0
+    # time spent in stages nested inside this one
+    child_seconds: float = 0.0
+
+    @property
+    def self_seconds(self) -> float:
+        return self.seconds - self.child_seconds
+
+
+class Profiler:
+    """
+    Collect wall time and call counts per pipeline stage, plus dice
+    calls by (nkeep, nadv).  Stages may nest; each stage's self time
+    excludes the stages inside it.  Only outermost stages are kept
+    as individual trace events, so per-name timing stays cheap.
+    """
+
+    def __init__(self) -> None:
+        self.origin: float = time.perf_counter()
+        self.stages: dict[str, StageStats] = {}
+        self.dice_calls: Counter[tuple[int, int]] = Counter()
+        self.events: list[dict[str, Any]] = []
+        self._stack: list[StageStats] = []
+
+    def add(self, name: str, start: float, end: float) -> None:
+        stats: StageStats = self.stages.setdefault(name, StageStats())
+        stats.calls += 1
+        stats.seconds += end - start
+        if self._stack:
+            self._stack[-1].child_seconds += end - start
+        else:
+            self.events.append(
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": (start - self.origin) * 1e6,
+                    "dur": (end - start) * 1e6,
+                    "pid": 0,
+                    "tid": 0,
+                }
+            )
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        stats: StageStats = self.stages.setdefault(name, StageStats())
+        self._stack.append(stats)
+        start: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            end: float = time.perf_counter()
+            self._stack.pop()
+            self.add(name, start, end)
+
+    def counting_dice(self, roll: NomadDice = nomad_dice) -> NomadDice:
+        counts: Counter[tuple[int, int]] = self.dice_calls
+
+        def counted(
+            nkeep: int = 2, nadv: int = 0, nsides: int = 6, low: int = 1
+        ) -> int:
+            counts[(nkeep, nadv)] += 1
+            return roll(nkeep, nadv, nsides, low)
+
+        # so `make_stars()` can still see which dice these are
+        counted.__wrapped__ = roll  # type: ignore[attr-defined]
+        return counted
+
+    def timed_nameset(self, nameset: NameSet, name: str = "names") -> NameSet:
+        return TimedNameSet(self, nameset, name)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "traceEvents": self.events,
+            "displayTimeUnit": "ms",
+            "stages": {
+                name: {
+                    "calls": st.calls,
+                    "seconds": st.seconds,
+                    "self_seconds": st.self_seconds,
+                }
+                for name, st in self.stages.items()
+            },
+            "dice": [
+                {"nkeep": nkeep, "nadv": nadv, "calls": n}
+                for (nkeep, nadv), n in sorted(self.dice_calls.items())
+            ],
+        }
+
+    def report(self, out=sys.stderr) -> None:
+        width: int = max((len(n) for n in self.stages), default=5)
+        out.write(
+            f"{'stage':{width}s} {'calls':>8s} {'total s':>10s} {'self s':>10s}\n"
+        )
+        for name, st in self.stages.items():
+            out.write(
+                f"{name:{width}s} {st.calls:8d} {st.seconds:10.6f}"
+                f" {st.self_seconds:10.6f}\n"
+            )
+        for (nkeep, nadv), n in sorted(self.dice_calls.items()):
+            out.write(f"dice {nkeep}D{nadv:+d}: {n} calls\n")
+
+
+class TimedNameSet:
+    """
+    Wrap a `NameSet` so the time spent making names is counted as its
+    own stage rather than as part of whatever stage asked for them.
+    """
+
+    def __init__(self, profiler: Profiler, nameset: NameSet, name: str) -> None:
+        self.profiler: Profiler = profiler
+        self.nameset: NameSet = nameset
+        self.name: str = name
+
+    def make_name(self) -> str:
+        with self.profiler.stage(self.name):
+            return self.nameset.make_name()
+
+    def add_to_history(self, name_s) -> None:
+        self.nameset.add_to_history(name_s)
+
+
+def _stage(profiler: Profiler | None, name: str) -> AbstractContextManager:
+    return profiler.stage(name) if profiler else nullcontext()
@@ -0,0 +1,607 @@
+#!/usr/bin/env python3
+
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+import argparse
+import hashlib
+import html
+import json
+import math
+import os
+import struct
+import sys
+import zlib
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from nomadgen import Sector, SectorBounds, hexcode_of
+from nomadtables import Characteristic
+
+###################### CONSTANTS ###############################
+
+# At level 0, the most detailed, hex columns are this many pixels apart
+# and rows this many; a hex is 4/3 of a column across.  (Rows are a
+# pixel taller than a regular hexagon's, so every tile is a whole number
+# of pixels at every level.)
+COLUMN_WIDTH: int = 48
+ROW_HEIGHT: int = 56
+
+# A tile at level 0 is one subsector; each level up doubles the hexes in
+# a tile each way and halves their size, so every tile is the same size
+TILE_COLUMNS: int = 8
+TILE_ROWS: int = 10
+TILE_WIDTH: int = TILE_COLUMNS * COLUMN_WIDTH
+TILE_HEIGHT: int = TILE_ROWS * ROW_HEIGHT
+
+# Levels stop when the whole map fits in 2x2 tiles, or at this many
+MAX_LEVELS: int = 16
+
+# Changed whenever the drawing changes, so every tile is drawn again
+RENDER_VERSION: int = 1
+
+# Under a tile directory, the hash of what each tile shows
+TILE_INDEX: str = "tiles.json"
+
+FORMATS: tuple[str, ...] = ("svg", "png")
+
+BACKGROUND: str = "#0b1021"
+GRID: str = "#34406a"
+LABEL: str = "#d8e0f8"
+CODE: str = "#7a88b0"
+STAR: str = "#ffffff"
+
+CHARACTERISTIC_COLOURS: dict[Characteristic, str] = {
+    Characteristic.ASTEROID: "#8c8c8c",
+    Characteristic.CORROSIVE: "#b5d932",
+    Characteristic.DESERT: "#d9a55b",
+    Characteristic.ICEBALL: "#d6f0ff",
+    Characteristic.INERT: "#a08c78",
+    Characteristic.MARGINAL: "#7fae6b",
+    Characteristic.OCEAN: "#2f7fd8",
+    Characteristic.PRIME: "#3cc46b",
+    Characteristic.PRIMORDIAL: "#9b59b6",
+    Characteristic.ROCKBALL: "#b07050",
+    Characteristic.TAINTED: "#c0c050",
+}
+
+######################## MAP DATA ###############################
+
+
+@dataclass(frozen=True, slots=True, order=True)
+class MapHex:
+    """
+    What the map shows of one star: its name, and the characteristic
+    and population of the most populous of its worlds.
+    """
+
+    x: int
+    y: int
+    name: str
+    chara: Characteristic | None
+    population: int
+    worlds: int
+
+
+def map_hexes(sec: Sector) -> list[MapHex]:
+    """Return a `MapHex` for each star in `sec`, in (x, y) order."""
+    result: list[MapHex] = []
+    for system in sec.systems:
+        star = system.star
+        if not system.planets:
+            result.append(MapHex(star.x, star.y, star.name, None, 0, 0))
+            continue
+        main = max(system.planets, key=lambda p: p.population)
+        result.append(
+            MapHex(
+                star.x,
+                star.y,
+                star.name,
+                main.chara,
+                main.population,
+                len(system.planets),
+            )
+        )
+    return sorted(result)
+
+
+####################### GEOMETRY ###############################
+
+
+@dataclass(frozen=True, slots=True)
+class View:
+    """
+    A rectangle of the map at one level of detail, in pixels from the
+    top left corner of hex (1, 1) at that level.
+    """
+
+    level: int
+    left: float
+    top: float
+    width: int
+    height: int
+
+    @property
+    def scale(self) -> float:
+        return 0.5**self.level
+
+    def centre(self, x: int, y: int) -> tuple[float, float]:
+        """Return the centre of hex (x, y) in pixels from the view's corner."""
+        s: float = self.scale
+        cx: float = ((x - 1) * COLUMN_WIDTH + COLUMN_WIDTH * 2 / 3) * s
+        cy: float = ((y - 1) * ROW_HEIGHT + ROW_HEIGHT / 2) * s
+        if x % 2 == 0:
+            cy += ROW_HEIGHT / 2 * s
+        return cx - self.left, cy - self.top
+
+    def hex_ranges(self) -> tuple[range, range]:
+        """Return the columns and rows of every hex that can show in the view."""
+        s: float = self.scale
+        first: int = math.floor(self.left / s / COLUMN_WIDTH)
+        last: int = math.floor((self.left + self.width) / s / COLUMN_WIDTH)
+        top: int = math.floor(self.top / s / ROW_HEIGHT)
+        bottom: int = math.floor((self.top + self.height) / s / ROW_HEIGHT)
+        return range(first, last + 2), range(top, bottom + 2)
+
+
+def map_view(bounds: SectorBounds, level: int = 0) -> View:
+    """Return the view of the whole of `bounds` at `level`."""
+    s: float = 0.5**level
+    return View(
+        level,
+        (bounds.x - 1) * COLUMN_WIDTH * s,
+        (bounds.y - 1) * ROW_HEIGHT * s,
+        math.ceil((bounds.width * COLUMN_WIDTH + COLUMN_WIDTH / 3) * s),
+        math.ceil((bounds.height * ROW_HEIGHT + ROW_HEIGHT / 2) * s),
+    )
+
+
+def tile_view(level: int, tx: int, ty: int) -> View:
+    return View(level, tx * TILE_WIDTH, ty * TILE_HEIGHT, TILE_WIDTH, TILE_HEIGHT)
+
+
+def tiles_of(bounds: SectorBounds, level: int) -> tuple[range, range]:
+    """Return the tile columns and rows that cover `bounds` at `level`."""
+    whole: View = map_view(bounds, level)
+    return (
+        range(
+            math.floor(whole.left / TILE_WIDTH),
+            math.ceil((whole.left + whole.width) / TILE_WIDTH),
+        ),
+        range(
+            math.floor(whole.top / TILE_HEIGHT),
+            math.ceil((whole.top + whole.height) / TILE_HEIGHT),
+        ),
+    )
+
+
+def level_count(bounds: SectorBounds) -> int:
+    """Return how many levels it takes to fit the map in 2x2 tiles."""
+    for level in range(MAX_LEVELS):
+        across, down = tiles_of(bounds, level)
+        if len(across) <= 2 and len(down) <= 2:
+            return level + 1
+    return MAX_LEVELS
+
+
+######################## DRAWING ###############################
+
+# What to draw, in pixels from the corner of the view:
+#   ("hex", cx, cy, s), an outline at scale s
+#   ("disc", cx, cy, r, colour)
+#   ("ring", cx, cy, r, colour)
+#   ("text", x, y, size, colour, text), centred on x
+Shape = tuple
+
+
+def draw(hexes: Iterable[MapHex], bounds: SectorBounds, view: View) -> list[Shape]:
+    """
+    Lay out the grid and the stars of `hexes` that show in `view`.  The
+    detail thins out with each level: hex codes and names only show at
+    level 0, and the grid is left out once hexes are a few pixels across.
+    """
+    s: float = view.scale
+    shapes: list[Shape] = []
+    xs, ys = view.hex_ranges()
+    if view.level <= 3:
+        for x in range(max(xs.start, bounds.x), min(xs.stop, bounds.x + bounds.width)):
+            for y in range(
+                max(ys.start, bounds.y), min(ys.stop, bounds.y + bounds.height)
+            ):
+                cx, cy = view.centre(x, y)
+                shapes.append(("hex", cx, cy, s))
+                if view.level == 0:
+                    shapes.append(("text", cx, cy - 15, 8, CODE, hexcode_of(x, y)))
+    for h in hexes:
+        if h.x not in xs or h.y not in ys:
+            continue
+        cx, cy = view.centre(h.x, h.y)
+        if h.chara is None:
+            shapes.append(("disc", cx, cy, 1.5 * s, STAR))
+        elif h.population > 0:
+            r: float = (2 + 0.6 * math.log10(h.population)) * s
+            shapes.append(("disc", cx, cy, r, CHARACTERISTIC_COLOURS[h.chara]))
+        else:
+            shapes.append(("ring", cx, cy, 3 * s, CHARACTERISTIC_COLOURS[h.chara]))
+        if view.level == 0:
+            others: int = min(h.worlds - 1, 5)
+            for i in range(others):
+                dx: float = 5 * i - 2.5 * (others - 1)
+                shapes.append(("disc", cx + dx, cy + 10, 1, LABEL))
+            shapes.append(("text", cx, cy + 22, 9, LABEL, h.name))
+    return shapes
+
+
+def _hex_points(cx: float, cy: float, s: float) -> list[tuple[float, float]]:
+    r: float = COLUMN_WIDTH * 2 / 3 * s
+    h: float = ROW_HEIGHT / 2 * s
+    return [
+        (cx - r, cy),
+        (cx - r / 2, cy - h),
+        (cx + r / 2, cy - h),
+        (cx + r, cy),
+        (cx + r / 2, cy + h),
+        (cx - r / 2, cy + h),
+    ]
+
+
+def to_svg(shapes: list[Shape], view: View) -> bytes:
+    grid: list[str] = []
+    marks: list[str] = []
+    texts: list[str] = []
+    for shape in shapes:
+        kind: str = shape[0]
+        if kind == "hex":
+            points = _hex_points(*shape[1:])
+            grid.append("M" + "L".join(f"{x:.1f} {y:.1f}" for x, y in points) + "Z")
+        elif kind == "disc":
+            _, cx, cy, r, colour = shape
+            marks.append(
+                f'<circle cx="{cx:.1f}" cy="{cy:.1f}" r="{r:.2f}" fill="{colour}"/>'
+            )
+        elif kind == "ring":
+            _, cx, cy, r, colour = shape
+            marks.append(
+                f'<circle cx="{cx:.1f}" cy="{cy:.1f}" r="{r:.2f}" fill="none"'
+                f' stroke="{colour}"/>'
+            )
+        else:
+            _, x, y, size, colour, text = shape
+            texts.append(
+                f'<text x="{x:.1f}" y="{y:.1f}" font-size="{size}" fill="{colour}">'
+                f"{html.escape(text)}</text>"
+            )
+    lines: list[str] = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{view.width}"'
+        f' height="{view.height}" viewBox="0 0 {view.width} {view.height}">',
+        f'<rect width="100%" height="100%" fill="{BACKGROUND}"/>',
+    ]
+    if grid:
+        lines.append(f'<path d="{"".join(grid)}" fill="none" stroke="{GRID}"/>')
+    lines += marks
+    if texts:
+        lines.append('<g font-family="sans-serif" text-anchor="middle">')
+        lines += texts
+        lines.append("</g>")
+    lines.append("</svg>")
+    return ("\n".join(lines) + "\n").encode("UTF-8")
+
+
+class Canvas:
+    """
+    A pure-Python RGB raster with just what the map needs: lines, discs,
+    rings and a PNG encoder.  There is no font, so text is left out.
+    """
+
+    def __init__(self, width: int, height: int, background: str) -> None:
+        self.width: int = width
+        self.height: int = height
+        self.pixels = bytearray(_rgb(background) * (width * height))
+
+    def span(self, y: int, x0: int, x1: int, rgb: bytes) -> None:
+        x0, x1 = max(x0, 0), min(x1, self.width - 1)
+        if 0 <= y < self.height and x0 <= x1:
+            i: int = (y * self.width + x0) * 3
+            self.pixels[i : i + (x1 - x0 + 1) * 3] = rgb * (x1 - x0 + 1)
+
+    def line(self, x0: int, y0: int, x1: int, y1: int, rgb: bytes) -> None:
+        if y0 > y1:
+            x0, y0, x1, y1 = x1, y1, x0, y0
+        if y0 == y1:
+            self.span(y0, min(x0, x1), max(x0, x1), rgb)
+            return
+        # one run of pixels per row, each half a row either side of it
+        step: float = (x1 - x0) / (y1 - y0)
+        low, high = min(x0, x1), max(x0, x1)
+        for y in range(max(y0, 0), min(y1, self.height - 1) + 1):
+            mid: float = x0 + (y - y0) * step
+            a: int = max(low, round(mid - abs(step) / 2))
+            b: int = min(high, round(mid + abs(step) / 2))
+            if a == b and 0 <= a < self.width:
+                i: int = (y * self.width + a) * 3
+                self.pixels[i : i + 3] = rgb
+            else:
+                self.span(y, a, b, rgb)
+
+    def disc(self, cx: float, cy: float, r: float, rgb: bytes) -> None:
+        if r < 1:
+            self.span(round(cy), round(cx), round(cx), rgb)
+            return
+        for y in range(math.ceil(cy - r), math.floor(cy + r) + 1):
+            half: float = math.sqrt(max(0.0, r * r - (y - cy) ** 2))
+            self.span(y, math.ceil(cx - half), math.floor(cx + half), rgb)
+
+    def ring(self, cx: float, cy: float, r: float, rgb: bytes) -> None:
+        steps: int = max(8, math.ceil(2 * math.pi * r * 2))
+        for i in range(steps):
+            a: float = 2 * math.pi * i / steps
+            x, y = round(cx + r * math.cos(a)), round(cy + r * math.sin(a))
+            self.span(y, x, x, rgb)
+
+    def png(self) -> bytes:
+        stride: int = self.width * 3
+        raw: bytes = b"".join(
+            b"\0" + self.pixels[i : i + stride]
+            for i in range(0, len(self.pixels), stride)
+        )
+        # 8-bit RGB, no interlacing
+        header: bytes = struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0)
+        return b"".join(
+            [
+                b"\x89PNG\r\n\x1a\n",
+                _chunk(b"IHDR", header),
+                _chunk(b"IDAT", zlib.compress(raw, 6)),
+                _chunk(b"IEND", b""),
+            ]
+        )
+
+
+def _rgb(colour: str) -> bytes:
+    return bytes.fromhex(colour.lstrip("#"))
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + kind
+        + data
+        + struct.pack(">I", zlib.crc32(kind + data))
+    )
+
+
+def to_png(shapes: list[Shape], view: View) -> bytes:
+    canvas = Canvas(view.width, view.height, BACKGROUND)
+    grid: bytes = _rgb(GRID)
+    # neighbouring hexes share edges; draw each once
+    edges: set[tuple[tuple[int, int], tuple[int, int]]] = set()
+    for shape in shapes:
+        kind: str = shape[0]
+        if kind == "hex":
+            points = [(round(x), round(y)) for x, y in _hex_points(*shape[1:])]
+            for edge in zip(points, points[1:] + points[:1]):
+                edge = min(edge, edge[::-1])
+                if edge not in edges:
+                    edges.add(edge)
+                    canvas.line(*edge[0], *edge[1], grid)
+        elif kind == "disc":
+            canvas.disc(shape[1], shape[2], shape[3], _rgb(shape[4]))
+        elif kind == "ring":
+            canvas.ring(shape[1], shape[2], shape[3], _rgb(shape[4]))
+    return canvas.png()
+
+
+def render(hexes: list[MapHex], bounds: SectorBounds, view: View, fmt: str) -> bytes:
+    """Draw `view` of the map as an SVG or PNG file."""
+    assert fmt in FORMATS
+    shapes: list[Shape] = draw(hexes, bounds, view)
+    return to_svg(shapes, view) if fmt == "svg" else to_png(shapes, view)
+
+
+######################### TILES ################################
+
+
+def tile_hash(hexes: list[MapHex], bounds: SectorBounds, view: View, fmt: str) -> str:
+    """
+    Return a hash of everything that goes into drawing `view`, so a tile
+    is only drawn again when something in it changes.
+    """
+    xs, ys = view.hex_ranges()
+    grid: tuple[int, int, int, int] = (
+        max(xs.start, bounds.x),
+        min(xs.stop, bounds.x + bounds.width),
+        max(ys.start, bounds.y),
+        min(ys.stop, bounds.y + bounds.height),
+    )
+    payload: str = repr((RENDER_VERSION, fmt, view, grid, hexes))
+    return hashlib.blake2b(payload.encode("UTF-8"), digest_size=16).hexdigest()
+
+
+def _tile_hexes(
+    hexes: list[MapHex], level: int
+) -> dict[tuple[int, int], list[MapHex]]:
+    # a hex can show in the tiles either side of its own
+    columns: int = TILE_COLUMNS << level
+    rows: int = TILE_ROWS << level
+    result: dict[tuple[int, int], list[MapHex]] = {}
+    for h in hexes:
+        for tx in {(h.x - 2) // columns, (h.x - 1) // columns, h.x // columns}:
+            for ty in {(h.y - 2) // rows, (h.y - 1) // rows, h.y // rows}:
+                xs, ys = tile_view(level, tx, ty).hex_ranges()
+                if h.x in xs and h.y in ys:
+                    result.setdefault((tx, ty), []).append(h)
+    return result
+
+
+def render_tiles(
+    hexes: list[MapHex],
+    bounds: SectorBounds,
+    directory: str,
+    fmt: str = "svg",
+    jobs: int = 1,
+) -> tuple[int, int]:
+    """
+    Write the tile pyramid of the map to `directory` as Z/X/Y.svg (or
+    .png), from Z 0, the whole map in at most 2x2 tiles, down to one
+    subsector per tile.  Tiles whose hexes have not changed since the
+    last run are left alone.  Return how many tiles were drawn, and how
+    many were kept.
+    """
+    assert fmt in FORMATS
+    index_path: str = os.path.join(directory, TILE_INDEX)
+    old: dict[str, str] = {}
+    old_fmt: str = fmt
+    try:
+        with open(index_path, encoding="UTF-8") as f:
+            index: dict = json.load(f)
+        old, old_fmt = index["tiles"], index["format"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    levels: int = level_count(bounds)
+    tiles: dict[str, str] = {}
+    work: list[tuple[str, list[MapHex], View]] = []
+    for level in range(levels):
+        z: int = levels - 1 - level
+        by_tile = _tile_hexes(hexes, level)
+        across, down = tiles_of(bounds, level)
+        for tx in across:
+            for ty in down:
+                view: View = tile_view(level, tx, ty)
+                these: list[MapHex] = by_tile.get((tx, ty), [])
+                key: str = f"{z}/{tx}/{ty}"
+                tiles[key] = tile_hash(these, bounds, view, fmt)
+                path: str = os.path.join(directory, f"{key}.{fmt}")
+                if (
+                    old_fmt != fmt
+                    or old.get(key) != tiles[key]
+                    or not os.path.exists(path)
+                ):
+                    work.append((key, these, view))
+
+    n: int = len(work)
+    args = ([w[1] for w in work], [bounds] * n, [w[2] for w in work], [fmt] * n)
+    if jobs <= 1:
+        images: Iterable[bytes] = map(render, *args)
+        _write_tiles(directory, fmt, work, images)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            images = pool.map(render, *args, chunksize=max(1, n // (jobs * 4)))
+            _write_tiles(directory, fmt, work, images)
+
+    for key in old.keys() if old_fmt != fmt else old.keys() - tiles.keys():
+        path = os.path.join(directory, f"{key}.{old_fmt}")
+        try:
+            os.remove(path)
+            # and its Z/X and Z directories, once they are empty
+            os.rmdir(os.path.dirname(path))
+            os.rmdir(os.path.dirname(os.path.dirname(path)))
+        except OSError:
+            pass
+    index = {
+        "format": fmt,
+        "levels": levels,
+        "tile_width": TILE_WIDTH,
+        "tile_height": TILE_HEIGHT,
+        "tiles": tiles,
+    }
+    with open(index_path + ".tmp", "w", encoding="UTF-8") as f:
+        json.dump(index, f, indent=1)
+    os.replace(index_path + ".tmp", index_path)
+    return n, len(tiles) - n
+
+
+def _write_tiles(
+    directory: str,
+    fmt: str,
+    work: list[tuple[str, list[MapHex], View]],
+    images: Iterable[bytes],
+) -> None:
+    for (key, _, _), image in zip(work, images):
+        path: str = os.path.join(directory, f"{key}.{fmt}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(image)
+
+
+######################### MAIN #########################################
+
+
+def main() -> None:
+    # Parse arguments
+    parser = argparse.ArgumentParser(
+        description="Draw `nomadsec.py` output as a hex map, or as a pyramid"
+        " of map tiles"
+    )
+    parser.add_argument(
+        "inputfile",
+        help="file containing `nomadsec.py` data in any text format, compressed"
+        " or not",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="image file to write (default: INPUTFILE with suffix .svg or .png)",
+    )
+    parser.add_argument(
+        "-t",
+        "--tiles",
+        help="write a pyramid of tiles under this directory instead",
+        metavar="DIRECTORY",
+    )
+    parser.add_argument(
+        "--png",
+        help="draw PNG, without text, instead of SVG (implied by -o *.png)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-l",
+        "--level",
+        help="level of detail for one image: 0 is the most, and each level"
+        " halves the scale (default 0)",
+        default=0,
+        type=int,
+    )
+    parser.add_argument(
+        "-J",
+        "--jobs",
+        help="number of worker processes for tiles (default: one per CPU)",
+        default=os.cpu_count() or 1,
+        type=int,
+    )
+    args = parser.parse_args()
+
+    if args.level < 0:
+        parser.error("--level must be at least 0")
+    fmt: str = "png" if args.png or (args.output or "").endswith(".png") else "svg"
+
+    from nomadcompress import open_compressed
+    from nomadread import read_sector
+
+    try:
+        with open_compressed(args.inputfile, encoding="UTF-8") as f:
+            sec: Sector = read_sector(f)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    hexes: list[MapHex] = map_hexes(sec)
+
+    if args.tiles:
+        drawn, kept = render_tiles(hexes, sec.bounds, args.tiles, fmt, args.jobs)
+        print(
+            f"{args.tiles}: {drawn} tiles drawn, {kept} unchanged,"
+            f" {level_count(sec.bounds)} levels",
+            file=sys.stderr,
+        )
+        return
+
+    output: str = args.output or os.path.splitext(args.inputfile)[0] + "." + fmt
+    view: View = map_view(sec.bounds, args.level)
+    with open(output, "wb") as f:
+        f.write(render(hexes, sec.bounds, view, fmt))
+    print(f"{output}: {view.width}x{view.height} pixels", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+import argparse
+import math
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Iterable, Iterator
+
+from nomadgen import Mask, SectorBounds
+from nomadoptions import MAXIMUM_DENSITY, NOISE_SCALE
+from nomadtables import (
+    SETTLEMENT_TYPE_NAMES,
+    TECHNOLOGY_AGES_ABBREVS,
+    Settlement,
+    TechAge,
+)
+
+####################### MASK FILES ###############################
+
+MASK_SUFFIX: str = ".hexmask"
+
+# A mask file is this header (magic, x and y of its first cell, width and
+# height of a cell in hexes, number of columns and rows of cells), then
+# one byte per cell for each of LAYERS in turn, a column at a time
+MASK_MAGIC: bytes = b"NOMADMK1"
+MASK_HEADER: struct.Struct = struct.Struct("<8s6i")
+
+LAYERS: tuple[str, ...] = ("density", "settlement", "tech")
+DENSITY, SETTLEMENT, TECH = range(len(LAYERS))
+
+# A cell left to the defaults for the whole map
+UNSET: int = 0xFF
+UNSET_CELL: str = "."
+
+SETTLEMENTS: dict[int, Settlement] = {s.value: s for s in Settlement}
+TECH_AGES: dict[int, TechAge] = {a.value: a for a in TechAge}
+
+# How each layer's cells are written in a text grid
+CELL_NAMES: list[dict[int, str]] = [
+    {d: str(d) for d in range(MAXIMUM_DENSITY + 1)},
+    {s.value: name for name, s in SETTLEMENT_TYPE_NAMES.items()},
+    {a.value: abbrev for abbrev, a in TECHNOLOGY_AGES_ABBREVS.items()},
+]
+CELL_VALUES: list[dict[str, int]] = [
+    {name: value for value, name in names.items()} for names in CELL_NAMES
+]
+
+
+class MaskError(ValueError):
+    pass
+
+
+class HexMask:
+    """
+    A `Mask` read from a mask file, or compiled from a text grid.  Each
+    cell covers a rectangle of hexes; hexes outside the grid, and cells
+    left unset, get the defaults for the whole map.  Files are
+    memory-mapped, so only the cells a map touches are read.
+    """
+
+    def __init__(self, data: bytes | mmap.mmap) -> None:
+        if len(data) < MASK_HEADER.size:
+            raise MaskError("not a hex mask: too short")
+        magic, x, y, cell_w, cell_h, columns, rows = MASK_HEADER.unpack_from(data)
+        n: int = columns * rows
+        if magic != MASK_MAGIC:
+            raise MaskError("not a hex mask")
+        if len(data) < MASK_HEADER.size + len(LAYERS) * n:
+            raise MaskError("hex mask is truncated")
+        self._data: bytes | mmap.mmap = data
+        self.x: int = x
+        self.y: int = y
+        self.cell_width: int = cell_w
+        self.cell_height: int = cell_h
+        self.columns: int = columns
+        self.rows: int = rows
+        view = memoryview(data)
+        self.layers: list[memoryview] = [
+            view[MASK_HEADER.size + k * n : MASK_HEADER.size + (k + 1) * n]
+            for k in range(len(LAYERS))
+        ]
+
+    def close(self) -> None:
+        for layer in self.layers:
+            layer.release()
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    def __enter__(self) -> "HexMask":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def cell(self, layer: int, column: int, row: int) -> int:
+        return self.layers[layer][column * self.rows + row]
+
+    def _value_at(self, layer: int, x: int, y: int) -> int:
+        column: int = (x - self.x) // self.cell_width
+        row: int = (y - self.y) // self.cell_height
+        if 0 <= column < self.columns and 0 <= row < self.rows:
+            return self.cell(layer, column, row)
+        return UNSET
+
+    def densities(self, bounds: SectorBounds, default: int) -> list[bytes]:
+        """
+        The density of every hex in `bounds`, a `bytes` for each column.
+        Columns in the same column of cells share one `bytes`.
+        """
+        assert 0 <= default <= MAXIMUM_DENSITY
+        fill: bytes = bytes(default if i == UNSET else i for i in range(256))
+        outside: bytes = bytes([default]) * bounds.height
+        # the row of cells of each hex down a column, or `rows` outside
+        cells: list[int] = []
+        for y in bounds.y_range():
+            row: int = (y - self.y) // self.cell_height
+            cells.append(row if 0 <= row < self.rows else self.rows)
+        by_column: dict[int, bytes] = {}
+        result: list[bytes] = []
+        for x in bounds.x_range():
+            column: int = (x - self.x) // self.cell_width
+            if not 0 <= column < self.columns:
+                result.append(outside)
+                continue
+            if column not in by_column:
+                start: int = column * self.rows
+                values: bytes = bytes(self.layers[DENSITY][start : start + self.rows])
+                down: bytes = bytes(map((values + bytes([UNSET])).__getitem__, cells))
+                by_column[column] = down.translate(fill)
+            result.append(by_column[column])
+        return result
+
+    def settlement_at(
+        self, x: int, y: int, default: Settlement | None
+    ) -> Settlement | None:
+        value: int = self._value_at(SETTLEMENT, x, y)
+        return default if value == UNSET else SETTLEMENTS[value]
+
+    def tech_age_at(
+        self, x: int, y: int, default: TechAge | None
+    ) -> TechAge | None:
+        value: int = self._value_at(TECH, x, y)
+        return default if value == UNSET else TECH_AGES[value]
+
+
+def compile_grid(lines: Iterable[str]) -> bytes:
+    """
+    Compile a text grid into the contents of a mask file.  A grid is
+    "origin X Y" (default 1 1) and "cell WIDTH HEIGHT" (default 1 1, the
+    hexes each cell covers), then any of the layers: a line naming the
+    layer, then its rows of cells separated by spaces.  Densities are 0
+    to 6, settlements and tech ages are written as for `nomadsec.py`,
+    and "." leaves a cell to the defaults.  Comments start with "#".
+    """
+    settings: dict[str, tuple[int, int]] = {"origin": (1, 1), "cell": (1, 1)}
+    grids: dict[int, list[list[int]]] = {}
+    current: list[list[int]] | None = None
+    layer: int = 0
+    for n, line in enumerate(lines, 1):
+        words: list[str] = line.split("#", 1)[0].lower().split()
+        if not words:
+            continue
+        if words[0] in settings:
+            try:
+                a, b = (int(w) for w in words[1:])
+            except ValueError:
+                raise MaskError(f"line {n}: {words[0]} takes two numbers")
+            if words[0] == "cell" and (a <= 0 or b <= 0):
+                raise MaskError(f"line {n}: cells must be at least one hex")
+            settings[words[0]] = (a, b)
+        elif len(words) == 1 and words[0] in LAYERS:
+            layer = LAYERS.index(words[0])
+            if layer in grids:
+                raise MaskError(f"line {n}: {words[0]} layer given twice")
+            current = grids[layer] = []
+        elif current is None:
+            raise MaskError(f"line {n}: cells before the first layer name")
+        else:
+            try:
+                current.append(
+                    [
+                        UNSET if w == UNSET_CELL else CELL_VALUES[layer][w]
+                        for w in words
+                    ]
+                )
+            except KeyError as e:
+                raise MaskError(f"line {n}: bad {LAYERS[layer]}: {e.args[0]!r}")
+            if len(current[-1]) != len(current[0]):
+                raise MaskError(f"line {n}: rows must all be the same length")
+    if not grids:
+        raise MaskError("no layers in grid")
+    rows: int = len(next(iter(grids.values())))
+    columns: int = len(next(iter(grids.values()))[0]) if rows else 0
+    for k, grid in grids.items():
+        if len(grid) != rows or (grid and len(grid[0]) != columns):
+            raise MaskError(
+                f"{LAYERS[k]} layer is not {columns} cells across by {rows} down"
+            )
+    data = bytearray(
+        MASK_HEADER.pack(
+            MASK_MAGIC, *settings["origin"], *settings["cell"], columns, rows
+        )
+    )
+    for k in range(len(LAYERS)):
+        grid = grids.get(k, [])
+        if not grid:
+            data += bytes([UNSET]) * (columns * rows)
+            continue
+        for column in range(columns):
+            data += bytes(grid[row][column] for row in range(rows))
+    return bytes(data)
+
+
+def grid_lines(mask: HexMask) -> Iterator[str]:
+    """Write `mask` back out as a text grid."""
+    yield f"origin {mask.x} {mask.y}"
+    yield f"cell {mask.cell_width} {mask.cell_height}"
+    for k, name in enumerate(LAYERS):
+        if all(v == UNSET for v in mask.layers[k]):
+            continue
+        names: dict[int, str] = CELL_NAMES[k]
+        width: int = max(len(names.get(v, UNSET_CELL)) for v in mask.layers[k])
+        yield name
+        for row in range(mask.rows):
+            yield " ".join(
+                names.get(mask.cell(k, column, row), UNSET_CELL).ljust(width)
+                for column in range(mask.columns)
+            ).rstrip()
+
+
+def open_mask(path: str) -> HexMask:
+    """
+    Open a mask file, memory-mapped; or compile a text grid if `path`
+    is not a mask file.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MASK_MAGIC)) == MASK_MAGIC:
+            return HexMask(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    with open(path, encoding="UTF-8") as f:
+        return HexMask(compile_grid(f))
+
+
+######################### NOISE ########################################
+
+# Each octave of noise after the coarsest (every NOISE_SCALE hexes)
+# halves the spacing of the lattice and the weight
+NOISE_OCTAVES: int = 3
+
+# A noise field is quantized to this many levels per hex
+FIELD_LEVELS: int = 256
+
+# How far each layer can drift from its default, and the values it can
+# take; with no default tech age, the field spans every age
+NOISE_LIMITS: dict[int, tuple[int, int, int]] = {
+    SETTLEMENT: (Settlement.CORE.value, Settlement.UNEXPLORED.value, 2),
+    TECH: (TechAge.EARLY_PRIMITIVE.value, TechAge.LATE_GALACTIC.value, 3),
+}
+
+_MASK64: int = (1 << 64) - 1
+
+
+def _lattice_value(seed: int, layer: int, octave: int, i: int, j: int) -> float:
+    # a uniform value in [0, 1) for each lattice point (splitmix64 finalizer)
+    h: int = (
+        seed * 0x9E3779B97F4A7C15
+        + (layer * 16 + octave) * 0xD1B54A32D192ED03
+        + i * 0xBF58476D1CE4E5B9
+        + j * 0x94D049BB133111EB
+    ) & _MASK64
+    h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return ((h ^ (h >> 31)) >> 11) / (1 << 53)
+
+
+def _smooth(t: float) -> float:
+    return t * t * (3 - 2 * t)
+
+
+def noise_field(
+    bounds: SectorBounds,
+    seed: int,
+    layer: int,
+    scale: int = NOISE_SCALE,
+    octaves: int = NOISE_OCTAVES,
+) -> list[bytes]:
+    """
+    Return smooth value noise over `bounds`, quantized to FIELD_LEVELS
+    levels, as a `bytes` for each column.  The lattice is fixed to hex
+    coordinates, so the field for any two regions with the same `seed`
+    agrees where they meet.
+    """
+    assert scale > 0
+    assert octaves > 0
+    # per octave: its weight, and for each hex down a column, the lattice
+    # row above it (counted from the first) and how far it is below it
+    downs: list[tuple[float, float, int, int, list[int], list[float]]] = []
+    for octave in range(octaves):
+        spacing: float = scale / 2**octave
+        ys: list[float] = [y / spacing for y in bounds.y_range()]
+        first: int = math.floor(ys[0])
+        rows: list[int] = [math.floor(g) - first for g in ys]
+        downs.append(
+            (
+                0.5**octave,
+                spacing,
+                first,
+                rows[-1] + 2,
+                rows,
+                [_smooth(g - math.floor(g)) for g in ys],
+            )
+        )
+    norm: float = FIELD_LEVELS / sum(weight for weight, *_ in downs)
+    lattice: dict[tuple[int, int], list[float]] = {}
+    result: list[bytes] = []
+    for x in bounds.x_range():
+        column: list[float] = [0.0] * bounds.height
+        for octave, (weight, spacing, first, n, rows, vs) in enumerate(downs):
+            g: float = x / spacing
+            i: int = math.floor(g)
+            u: float = _smooth(g - i)
+            for key in ((octave, i), (octave, i + 1)):
+                if key not in lattice:
+                    lattice[key] = [
+                        _lattice_value(seed, layer, octave, key[1], first + j)
+                        for j in range(n)
+                    ]
+            left, right = lattice[(octave, i)], lattice[(octave, i + 1)]
+            across: list[float] = [
+                weight * (a + (b - a) * u) for a, b in zip(left, right)
+            ]
+            column = [
+                c + across[r] + (across[r + 1] - across[r]) * v
+                for c, r, v in zip(column, rows, vs)
+            ]
+        result.append(bytes(min(FIELD_LEVELS - 1, int(c * norm)) for c in column))
+        # columns of the lattice left behind are not needed again
+        for octave, (_, spacing, *_) in enumerate(downs):
+            lattice.pop((octave, math.floor(x / spacing) - 1), None)
+    return result
+
+
+class NoiseMask:
+    """
+    A `Mask` whose settlement level and average tech age drift smoothly
+    across `bounds`, around the defaults for the map or those of `base`.
+    Both fields are made in bulk when the mask is; each lookup is then a
+    byte from the field and one from a table.
+    """
+
+    def __init__(
+        self,
+        bounds: SectorBounds,
+        seed: int,
+        scale: int = NOISE_SCALE,
+        base: Mask | None = None,
+    ) -> None:
+        self.bounds: SectorBounds = bounds
+        self.base: Mask | None = base
+        self.fields: dict[int, list[bytes]] = {
+            layer: noise_field(bounds, seed, layer, scale) for layer in NOISE_LIMITS
+        }
+        self._tables: dict[tuple[int, int | None], bytes] = {}
+
+    def _level(self, layer: int, x: int, y: int, centre: int | None) -> int | None:
+        i: int = x - self.bounds.x
+        j: int = y - self.bounds.y
+        if not (0 <= i < self.bounds.width and 0 <= j < self.bounds.height):
+            return None
+        key: tuple[int, int | None] = (layer, centre)
+        if key not in self._tables:
+            low, high, spread = NOISE_LIMITS[layer]
+            mid: float = (low + high) / 2 if centre is None else centre
+            if centre is None:
+                spread = (high - low + 1) // 2
+            # level f of the field sits (f + 0.5) / n of the way from
+            # mid - spread to mid + spread
+            n: int = FIELD_LEVELS
+            self._tables[key] = bytes(
+                min(high, max(low, round(mid + (2 * f + 1 - n) / n * spread)))
+                for f in range(n)
+            )
+        return self._tables[key][self.fields[layer][i][j]]
+
+    def densities(self, bounds: SectorBounds, default: int) -> list[bytes]:
+        if self.base is not None:
+            return self.base.densities(bounds, default)
+        return [bytes([default]) * bounds.height] * bounds.width
+
+    def settlement_at(
+        self, x: int, y: int, default: Settlement | None
+    ) -> Settlement | None:
+        if self.base is not None:
+            default = self.base.settlement_at(x, y, default)
+        if default is None:
+            return None
+        value: int | None = self._level(SETTLEMENT, x, y, default.value)
+        return default if value is None else SETTLEMENTS[value]
+
+    def tech_age_at(
+        self, x: int, y: int, default: TechAge | None
+    ) -> TechAge | None:
+        if self.base is not None:
+            default = self.base.tech_age_at(x, y, default)
+        value: int | None = self._level(TECH, x, y, default.value if default else None)
+        return default if value is None else TECH_AGES[value]
+
+
+######################### MAIN #########################################
+
+
+def main() -> None:
+    # Parse arguments
+    parser = argparse.ArgumentParser(
+        description="Compile a text grid of per-hex density, settlement level"
+        " and tech age into a mask file for `nomadsec.py --mask`"
+    )
+    parser.add_argument(
+        "inputfile",
+        help="text grid (or, with --print, a mask file)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help=f"mask file to write (default: INPUTFILE with suffix {MASK_SUFFIX})",
+    )
+    parser.add_argument(
+        "-p",
+        "--print",
+        help="print the mask as a text grid instead",
+        action="store_true",
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.print:
+            with open_mask(args.inputfile) as mask:
+                for line in grid_lines(mask):
+                    print(line)
+            return
+        with open(args.inputfile, encoding="UTF-8") as f:
+            data: bytes = compile_grid(f)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    output: str = args.output or os.path.splitext(args.inputfile)[0] + MASK_SUFFIX
+    with open(output, "wb") as f:
+        f.write(data)
+    mask = HexMask(data)
+    print(
+        f"{output}: {mask.columns}x{mask.rows} cells of"
+        f" {mask.cell_width}x{mask.cell_height} hexes",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
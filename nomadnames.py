@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+import argparse
+import os
+import random
+import struct
+import sys
+from array import array
+from collections import Counter
+from collections.abc import Iterable
+from typing import Any
+
+###################### NAME MODELS ###############################
+
+MODEL_SUFFIX: str = ".nmodel"
+
+# Letters of context, as namemaker's default
+DEFAULT_ORDER: int = 3
+
+# As namemaker: make this many candidates for each name and keep the one
+# closest to the average length, giving up on a candidate after this many
+# tries at a name that is neither a training name nor already used
+NAME_CANDIDATES: int = 2
+MAX_ATTEMPTS: int = 1000
+
+# A model file is this header (magic, order, byte lengths of the alphabet
+# and of the training names, number of states and of draws, and the size
+# and modification time of the corpus it was compiled from), then the
+# alphabet and the training names (one per line) in UTF-8, padding to 4
+# bytes, then arrays of native ints: where each state's draws start (one
+# more than the states), and each draw's symbol and next state
+MODEL_MAGIC: bytes = b"NOMADNM1"
+MODEL_HEADER: struct.Struct = struct.Struct("<8sIIIIIqq")
+
+# Symbol 0 ends a name; symbol k is the k-th letter of the alphabet
+END: int = 0
+
+
+def _aligned(n: int) -> int:
+    return (n + 3) & ~3
+
+
+def _strip_non_alnum(name: str) -> str:
+    start: int = 0
+    end: int = len(name)
+    while start < end and not name[start].isalnum():
+        start += 1
+    while end > start and not name[end - 1].isalnum():
+        end -= 1
+    return name[start:end]
+
+
+def read_corpus(path: str) -> list[str]:
+    """
+    Read one name per line, cleaned up as namemaker does: symbols are
+    stripped from both ends and blank names dropped.
+    """
+    try:
+        with open(path, encoding="UTF-8") as f:
+            lines: list[str] = f.read().splitlines()
+    except UnicodeDecodeError:
+        with open(path, encoding="latin-1") as f:
+            lines = f.read().splitlines()
+    return [n for n in (_strip_non_alnum(line.strip("\t")) for line in lines) if n]
+
+
+class NameModel:
+    """
+    A Markov chain over the letters of some names.  Each state is the
+    last `order` letters (fewer at the start of a name).  Its draws are
+    every letter that followed it in the corpus, as many times as it did,
+    so picking one uniformly follows the chain; a name is a walk over
+    integers that ends at symbol END.
+    """
+
+    def __init__(
+        self,
+        order: int,
+        alphabet: str,
+        names: list[str],
+        starts: array,
+        symbols: array,
+        next_states: array,
+    ) -> None:
+        self.order: int = order
+        self.alphabet: str = alphabet
+        self.names: list[str] = names
+        self.starts: array = starts
+        self.symbols: array = symbols
+        self.next_states: array = next_states
+        self.average_length: float = (
+            sum(len(n) for n in names) / len(names) if names else 0.0
+        )
+        # what the corpus was when the model was compiled, if known
+        self.source_size: int = -1
+        self.source_mtime_ns: int = -1
+
+    def to_bytes(self) -> bytes:
+        alphabet: bytes = self.alphabet.encode("UTF-8")
+        names: bytes = "\n".join(self.names).encode("UTF-8")
+        head: bytes = (
+            MODEL_HEADER.pack(
+                MODEL_MAGIC,
+                self.order,
+                len(alphabet),
+                len(names),
+                len(self.starts) - 1,
+                len(self.symbols),
+                self.source_size,
+                self.source_mtime_ns,
+            )
+            + alphabet
+            + names
+        )
+        return b"".join(
+            [
+                head.ljust(_aligned(len(head)), b"\0"),
+                self.starts.tobytes(),
+                self.symbols.tobytes(),
+                self.next_states.tobytes(),
+            ]
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "NameModel":
+        if data[: len(MODEL_MAGIC)] != MODEL_MAGIC:
+            raise ValueError("not a name model")
+        if len(data) < MODEL_HEADER.size:
+            raise ValueError("name model is truncated")
+        (_, order, alphabet_len, names_len, states, draws, size, mtime_ns) = (
+            MODEL_HEADER.unpack_from(data)
+        )
+        pos: int = MODEL_HEADER.size
+        alphabet: str = data[pos : pos + alphabet_len].decode("UTF-8")
+        pos += alphabet_len
+        names: list[str] = data[pos : pos + names_len].decode("UTF-8").split("\n")
+        pos = _aligned(pos + names_len)
+        arrays: list[array] = []
+        for typecode, n in (("I", states + 1), ("H", draws), ("I", draws)):
+            a = array(typecode)
+            a.frombytes(data[pos : pos + a.itemsize * n])
+            if len(a) != n:
+                raise ValueError("name model is truncated")
+            arrays.append(a)
+            pos += a.itemsize * n
+        model = cls(order, alphabet, names if names_len else [], *arrays)
+        model.source_size, model.source_mtime_ns = size, mtime_ns
+        return model
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> "NameModel":
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def compile_model(names: Iterable[str], order: int = DEFAULT_ORDER) -> NameModel:
+    """Collect the letter transitions of `names` into a `NameModel`."""
+    assert order > 0
+    corpus: list[str] = list(names)
+    if not corpus:
+        raise ValueError("no names to learn from")
+    counts: dict[str, Counter[str]] = {"": Counter()}
+    for name in corpus:
+        context: str = ""
+        for letter in name:
+            counts.setdefault(context, Counter())[letter] += 1
+            context = (context + letter)[-order:]
+        # "" stands for the end of the name
+        counts.setdefault(context, Counter())[""] += 1
+    alphabet: str = "".join(sorted({c for n in corpus for c in n}))
+    symbol_of: dict[str, int] = {c: k for k, c in enumerate(alphabet, 1)}
+    symbol_of[""] = END
+    # the start of a name is state 0
+    contexts: list[str] = [""] + sorted(c for c in counts if c)
+    state_of: dict[str, int] = {c: k for k, c in enumerate(contexts)}
+    starts, symbols, next_states = array("I", [0]), array("H"), array("I")
+    for context in contexts:
+        for letter, n in sorted(counts[context].items()):
+            symbols.extend([symbol_of[letter]] * n)
+            next_states.extend(
+                [state_of[(context + letter)[-order:]] if letter else 0] * n
+            )
+        starts.append(len(symbols))
+    return NameModel(order, alphabet, corpus, starts, symbols, next_states)
+
+
+def compile_file(path: str, order: int = DEFAULT_ORDER) -> NameModel:
+    """Compile the corpus `path` and save it as `path` + ".nmodel"."""
+    st = os.stat(path)
+    model: NameModel = compile_model(read_corpus(path), order)
+    model.source_size, model.source_mtime_ns = st.st_size, st.st_mtime_ns
+    model.save(path + MODEL_SUFFIX)
+    return model
+
+
+def is_model(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MODEL_MAGIC)) == MODEL_MAGIC
+
+
+def open_model(
+    path: str, order: int = DEFAULT_ORDER, rebuild: bool = False
+) -> NameModel:
+    """
+    Load a model file, or a corpus of names through its compiled model
+    (`path` + ".nmodel"), compiling it first if it is missing or older
+    than the corpus.  If the model cannot be written, it is only kept in
+    memory.
+    """
+    if is_model(path):
+        return NameModel.load(path)
+    model_path: str = path + MODEL_SUFFIX
+    if not rebuild and os.path.exists(model_path):
+        st = os.stat(path)
+        model: NameModel = NameModel.load(model_path)
+        if (
+            model.order == order
+            and model.source_size == st.st_size
+            and model.source_mtime_ns == st.st_mtime_ns
+        ):
+            return model
+    try:
+        return compile_file(path, order)
+    except OSError:
+        return compile_model(read_corpus(path), order)
+
+
+###################### NAME SETS ###############################
+
+
+class MarkovNameSet:
+    """
+    A `NameSet` that makes names from a `NameModel` the way namemaker
+    does, never repeating a training name or one already made or added
+    to its history.
+    """
+
+    def __init__(self, model: NameModel, rng: random.Random | None = None) -> None:
+        self.model: NameModel = model
+        self.rng = rng or random
+        self.real_names: set[str] = set(model.names)
+        self.history: set[str] = set()
+        # lists index faster than arrays
+        self._starts: list[int] = model.starts.tolist()
+        self._sizes: list[int] = [
+            b - a for a, b in zip(self._starts, self._starts[1:])
+        ]
+        self._symbols: list[int] = model.symbols.tolist()
+        self._next_states: list[int] = model.next_states.tolist()
+
+    def add_to_history(self, name_s) -> None:
+        if isinstance(name_s, str):
+            self.history.add(name_s)
+        else:
+            self.history.update(name_s)
+
+    def make_name(self) -> str:
+        return self.make_names(1)[0]
+
+    def make_names(self, count: int) -> list[str]:
+        """
+        Make `count` names at once, each as `make_name()` would.  Raise
+        `ValueError` if no new name turns up in MAX_ATTEMPTS tries.
+        """
+        starts, sizes = self._starts, self._sizes
+        symbols, next_states = self._symbols, self._next_states
+        letters: str = "\0" + self.model.alphabet
+        average: float = self.model.average_length
+        real_names, history = self.real_names, self.history
+        uniform = self.rng.random
+
+        def walk() -> str:
+            name: str = ""
+            state: int = 0
+            while True:
+                i: int = starts[state] + int(uniform() * sizes[state])
+                symbol: int = symbols[i]
+                if symbol == END:
+                    return name
+                name += letters[symbol]
+                state = next_states[i]
+
+        result: list[str] = []
+        for _ in range(count):
+            best: str = ""
+            for _ in range(NAME_CANDIDATES):
+                for _ in range(MAX_ATTEMPTS):
+                    name: str = walk()
+                    if name and name not in real_names and name not in history:
+                        if not best or abs(len(name) - average) < abs(
+                            len(best) - average
+                        ):
+                            best = name
+                        break
+            if not best:
+                raise ValueError(
+                    f"out of names: no new one in {MAX_ATTEMPTS} tries"
+                    " (try a longer name list)"
+                )
+            history.add(best)
+            result.append(best)
+        return result
+
+
+def open_names(
+    path: str, order: int = DEFAULT_ORDER, rng: random.Random | None = None
+) -> MarkovNameSet:
+    """A `MarkovNameSet` for a model file or corpus (see `open_model()`)."""
+    return MarkovNameSet(open_model(path, order), rng)
+
+
+###################### SIMILAR NAMES ###############################
+
+
+def edit_distance(a: str, b: str, limit: int | None = None) -> int:
+    """
+    Return the Levenshtein distance between `a` and `b`; or, if it is
+    over `limit`, `limit` + 1.  With a limit, only the cells within
+    `limit` of the diagonal are worked out.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is None:
+        limit = len(a)
+    if len(a) - len(b) > limit:
+        return limit + 1
+    over: int = limit + 1
+    previous: list[int] = [min(j, over) for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        lo: int = max(1, i - limit)
+        hi: int = min(len(b), i + limit)
+        current: list[int] = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        best: int = current[lo - 1]
+        for j in range(lo, hi + 1):
+            d: int = previous[j - 1] + (ca != b[j - 1])
+            if previous[j] < d:
+                d = previous[j] + 1
+            if current[j - 1] < d:
+                d = current[j - 1] + 1
+            current[j] = d
+            if d < best:
+                best = d
+        if best > limit:
+            return over
+        previous = current
+    return min(previous[-1], over)
+
+
+def _pieces(length: int, parts: int) -> list[tuple[int, int]]:
+    # (start, length) of `parts` pieces as even as can be, longest last
+    base, extra = divmod(length, parts)
+    result: list[tuple[int, int]] = []
+    start: int = 0
+    for i in range(parts):
+        n: int = base + (i >= parts - extra)
+        result.append((start, n))
+        start += n
+    return result
+
+
+class NameIndex:
+    """
+    Names, ignoring case, indexed to find any name within `distance`
+    edits of another.  Each name is cut into `distance` + 1 pieces, and
+    k edits can touch at most k of them, so a name within reach must
+    hold one of the pieces unchanged, shifted at most k places.  Only
+    names found that way are compared letter by letter.
+    """
+
+    def __init__(self, distance: int) -> None:
+        assert distance >= 0
+        self.distance: int = distance
+        self.names: list[str] = []
+        # (length of name, which piece, piece) -> names
+        self.pieces: dict[tuple[int, int, str], list[int]] = {}
+        # names too short to cut into pieces
+        self.short: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, name: str) -> None:
+        key: str = name.lower()
+        i: int = len(self.names)
+        self.names.append(key)
+        if len(key) <= self.distance:
+            self.short.append(i)
+            return
+        for piece, (start, n) in enumerate(_pieces(len(key), self.distance + 1)):
+            where: tuple[int, int, str] = (len(key), piece, key[start : start + n])
+            self.pieces.setdefault(where, []).append(i)
+
+    def near(self, name: str) -> str | None:
+        """Return a name within `distance` edits of `name`, if any."""
+        key: str = name.lower()
+        k: int = self.distance
+        seen: set[int] = set()
+        candidates: list[int] = list(self.short)
+        for length in range(max(k + 1, len(key) - k), len(key) + k + 1):
+            shift: int = len(key) - length
+            for piece, (start, n) in enumerate(_pieces(length, k + 1)):
+                # edits before this piece move it by at most `piece`
+                # places, and those after it must make up the rest of
+                # the difference in length
+                first: int = max(0, start - piece, start + shift - (k - piece))
+                last: int = min(
+                    len(key) - n, start + piece, start + shift + (k - piece)
+                )
+                for at in range(first, last + 1):
+                    found: list[int] | None = self.pieces.get(
+                        (length, piece, key[at : at + n])
+                    )
+                    if found:
+                        candidates.extend(found)
+        for i in candidates:
+            if i in seen:
+                continue
+            seen.add(i)
+            if edit_distance(key, self.names[i], k) <= k:
+                return self.names[i]
+        return None
+
+
+class DistinctNameSet:
+    """
+    A `NameSet` that passes on names from `nameset` only if they are at
+    least `min_distance` edits from every name it has made or been given
+    through `add_to_history()`.  If no such name turns up in MAX_ATTEMPTS
+    tries, `make_name()` raises `ValueError`.
+    """
+
+    def __init__(self, nameset: Any, min_distance: int) -> None:
+        assert min_distance > 0
+        self.nameset = nameset
+        self.min_distance: int = min_distance
+        self.index: NameIndex = NameIndex(min_distance - 1)
+
+    def add_to_history(self, name_s) -> None:
+        self.nameset.add_to_history(name_s)
+        for name in [name_s] if isinstance(name_s, str) else name_s:
+            self.index.add(name)
+
+    def make_name(self) -> str:
+        for _ in range(MAX_ATTEMPTS):
+            name: str = self.nameset.make_name()
+            if not name:
+                return name
+            if self.index.near(name) is None:
+                self.index.add(name)
+                return name
+        raise ValueError(
+            f"out of names: none {self.min_distance} edits from the rest"
+            f" in {MAX_ATTEMPTS} tries (try a smaller distance)"
+        )
+
+
+######################### MAIN #########################################
+
+
+def main() -> None:
+    # Parse arguments
+    parser = argparse.ArgumentParser(
+        description="Compile name lists into Markov models for `nomadsec.py`,"
+        " or make names from one"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    compile_cmd = sub.add_parser(
+        "compile", help="compile each name list into a model file"
+    )
+    compile_cmd.add_argument(
+        "corpus",
+        help="text file with one sample name per line",
+        nargs="+",
+    )
+    compile_cmd.add_argument(
+        "--order",
+        help=f"letters of context (default {DEFAULT_ORDER})",
+        default=DEFAULT_ORDER,
+        type=int,
+    )
+    sample_cmd = sub.add_parser("sample", help="make names from a model or list")
+    sample_cmd.add_argument(
+        "model",
+        help="model file, or name list (compiled on first use)",
+    )
+    sample_cmd.add_argument(
+        "-c",
+        "--count",
+        help="number of names (default 20)",
+        default=20,
+        type=int,
+    )
+    sample_cmd.add_argument(
+        "--seed",
+        help="seed for the random number generator",
+        type=int,
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.command == "compile":
+            if args.order <= 0:
+                parser.error("--order must be at least 1")
+            for corpus in args.corpus:
+                model: NameModel = compile_file(corpus, args.order)
+                print(
+                    f"{corpus + MODEL_SUFFIX}: {len(model.names)} names,"
+                    f" {len(model.starts) - 1} states,"
+                    f" {len(model.symbols)} draws",
+                    file=sys.stderr,
+                )
+        else:
+            rng = random.Random(args.seed) if args.seed is not None else None
+            for name in open_names(args.model, rng=rng).make_names(args.count):
+                print(name)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import math
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from fractions import Fraction
+
+from nomaddice import dice_distribution
+from nomadgen import (
+    DEFAULT_DENSITY,
+    MAXIMUM_DENSITY,
+    MINIMUM_DENSITY,
+    SectorBounds,
+)
+from nomadtables import (
+    Characteristic,
+    NomadDice,
+    Settlement,
+    TechAge,
+    TradeClass,
+    WorldTag,
+    characteristic,
+    population,
+    tech_age,
+    trade_class,
+    world_tag,
+)
+
+####################### ENUMERATION ##############################
+
+
+class _NeedRoll(Exception):
+    def __init__(self, key: tuple[int, int, int, int]) -> None:
+        super().__init__(key)
+        self.key: tuple[int, int, int, int] = key
+
+
+class _ReplayDice:
+    """
+    A `NomadDice` that replays a fixed sequence of results, and raises
+    `_NeedRoll` when asked for one more.
+    """
+
+    def __init__(self, results: tuple[int, ...]) -> None:
+        self.results: tuple[int, ...] = results
+        self.index: int = 0
+
+    def __call__(
+        self, nkeep: int = 2, nadv: int = 0, nsides: int = 6, low: int = 1
+    ) -> int:
+        if self.index >= len(self.results):
+            raise _NeedRoll((nkeep, nadv, nsides, low))
+        self.index += 1
+        return self.results[self.index - 1]
+
+
+def enumerate_outcomes(
+    fn: Callable[[NomadDice], Hashable],
+) -> dict[Hashable, Fraction]:
+    """
+    Return the exact probability of every value `fn(roll)` can return,
+    by calling it once for every possible sequence of dice results.
+    `fn` must be deterministic apart from its dice.
+    """
+    result: dict[Hashable, Fraction] = {}
+    pending: list[tuple[tuple[int, ...], Fraction]] = [((), Fraction(1))]
+    while pending:
+        results, prob = pending.pop()
+        try:
+            value = fn(_ReplayDice(results))
+        except _NeedRoll as need:
+            for face, p in dice_distribution(*need.key).items():
+                pending.append((results + (face,), prob * p))
+            continue
+        result[value] = result.get(value, Fraction(0)) + prob
+    return result
+
+
+def _sorted_by(dist: dict, key: Callable) -> dict:
+    return {k: dist[k] for k in sorted(dist, key=key)}
+
+
+######################## PER WORLD ################################
+
+
+def star_odds(density: int = DEFAULT_DENSITY) -> Fraction:
+    """Return the chance that a hex has a star (as `make_stars` rolls it)."""
+    assert MINIMUM_DENSITY <= density <= MAXIMUM_DENSITY
+    return enumerate_outcomes(
+        lambda roll: roll(1, 0, MAXIMUM_DENSITY, MINIMUM_DENSITY) <= density
+    ).get(True, Fraction(0))
+
+
+def trade_class_odds(settle: Settlement | None) -> dict[TradeClass, Fraction]:
+    return _sorted_by(
+        enumerate_outcomes(lambda roll: trade_class(settle, roll)),
+        lambda t: t.value,
+    )
+
+
+def characteristic_odds(tc: TradeClass) -> dict[Characteristic, Fraction]:
+    return _sorted_by(
+        enumerate_outcomes(lambda roll: characteristic(tc, roll)),
+        lambda c: c.value,
+    )
+
+
+def population_odds(tc: TradeClass, settle: Settlement | None) -> dict[int, Fraction]:
+    return _sorted_by(
+        enumerate_outcomes(lambda roll: population(tc, settle, roll)), int
+    )
+
+
+def tech_age_odds(pop: int, avg_age: TechAge | None) -> dict[TechAge, Fraction]:
+    return _sorted_by(
+        enumerate_outcomes(lambda roll: tech_age(pop, avg_age, roll)),
+        lambda a: a.value,
+    )
+
+
+def world_tag_odds(index: int) -> dict[WorldTag, Fraction]:
+    return enumerate_outcomes(lambda roll: world_tag(index, roll))
+
+
+def _mix(parts: list[tuple[Fraction, dict]]) -> dict:
+    # sum of weighted distributions
+    result: dict = {}
+    for weight, dist in parts:
+        for k, p in dist.items():
+            result[k] = result.get(k, Fraction(0)) + weight * p
+    return result
+
+
+@dataclass(frozen=True, slots=True)
+class WorldOdds:
+    """
+    The exact marginal distributions of one world's attributes.
+    """
+
+    trade_class: dict[TradeClass, Fraction]
+    characteristic: dict[Characteristic, Fraction]
+    population: dict[int, Fraction]
+    tech_age: dict[TechAge, Fraction]
+    world_tag_1: dict[WorldTag, Fraction]
+    world_tag_2: dict[WorldTag, Fraction]
+
+    @property
+    def populated(self) -> Fraction:
+        return 1 - self.population.get(0, Fraction(0))
+
+    @property
+    def mean_population(self) -> Fraction:
+        return sum((v * p for v, p in self.population.items()), Fraction(0))
+
+    @property
+    def mean_square_population(self) -> Fraction:
+        return sum((v * v * p for v, p in self.population.items()), Fraction(0))
+
+
+def world_odds(
+    settlement: Settlement | None = None, avg_age: TechAge | None = None
+) -> WorldOdds:
+    """
+    Return the exact distribution of every attribute `make_planet` rolls
+    for one world with the given settlement level and average tech age.
+    """
+    tcs: dict[TradeClass, Fraction] = trade_class_odds(settlement)
+    pops: dict[TradeClass, dict[int, Fraction]] = {
+        tc: population_odds(tc, settlement) for tc in tcs
+    }
+    pop: dict[int, Fraction] = _sorted_by(
+        _mix([(p, pops[tc]) for tc, p in tcs.items()]), int
+    )
+    # tech age only depends on whether the world is populated
+    unpopulated: Fraction = pop.get(0, Fraction(0))
+    ages: dict[TechAge, Fraction] = _mix(
+        [
+            (unpopulated, tech_age_odds(0, avg_age)),
+            (1 - unpopulated, tech_age_odds(1, avg_age)),
+        ]
+    )
+    return WorldOdds(
+        trade_class=tcs,
+        characteristic=_sorted_by(
+            _mix([(p, characteristic_odds(tc)) for tc, p in tcs.items()]),
+            lambda c: c.value,
+        ),
+        population=pop,
+        tech_age=_sorted_by(
+            {a: p for a, p in ages.items() if p}, lambda a: a.value
+        ),
+        world_tag_1=world_tag_odds(1),
+        world_tag_2=world_tag_odds(2),
+    )
+
+
+def world_joint_odds(
+    settlement: Settlement | None = None, avg_age: TechAge | None = None
+) -> dict[tuple[TradeClass, Characteristic, int, TechAge], Fraction]:
+    """
+    Return the exact joint distribution of (trade class, characteristic,
+    population, tech age) for one world; the world tags are independent
+    of these (see `world_tags_odds()`).
+    """
+    ages: dict[bool, dict[TechAge, Fraction]] = {
+        populated: tech_age_odds(int(populated), avg_age)
+        for populated in (False, True)
+    }
+    result: dict[tuple[TradeClass, Characteristic, int, TechAge], Fraction] = {}
+    for tc, ptc in trade_class_odds(settlement).items():
+        charas: dict[Characteristic, Fraction] = characteristic_odds(tc)
+        for pop, ppop in population_odds(tc, settlement).items():
+            for age, page in ages[pop > 0].items():
+                for cha, pcha in charas.items():
+                    result[(tc, cha, pop, age)] = ptc * pcha * ppop * page
+    return result
+
+
+def world_tags_odds() -> dict[tuple[WorldTag, WorldTag], Fraction]:
+    """Return the exact joint distribution of both world tags."""
+    return enumerate_outcomes(lambda roll: (world_tag(1, roll), world_tag(2, roll)))
+
+
+####################### PER SECTOR ################################
+
+
+def binomial_quantiles(n: int, q: float, percentiles: list[int]) -> list[int]:
+    """
+    Return the given percentiles of the number of successes in `n`
+    independent trials that each succeed with probability `q`.
+    """
+    if n == 0 or q <= 0:
+        return [0] * len(percentiles)
+    if q >= 1:
+        return [n] * len(percentiles)
+    mean: float = n * q
+    spread: int = math.ceil(12 * math.sqrt(n * q * (1 - q))) + 1
+    lo: int = max(0, math.floor(mean) - spread)
+    hi: int = min(n, math.ceil(mean) + spread)
+    logc: float = math.lgamma(n + 1)
+    logq: float = math.log(q)
+    lognq: float = math.log1p(-q)
+    pmf: list[float] = [
+        math.exp(
+            logc - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+            + k * logq + (n - k) * lognq
+        )
+        for k in range(lo, hi + 1)
+    ]
+    total: float = sum(pmf)
+    result: list[int] = []
+    for pct in percentiles:
+        target: float = pct / 100 * total
+        cumulative: float = 0.0
+        k: int = lo
+        for k, p in enumerate(pmf, lo):
+            cumulative += p
+            if cumulative >= target:
+                break
+        result.append(k)
+    return result
+
+
+@dataclass(frozen=True, slots=True)
+class SectorOdds:
+    """
+    Exact expectations for a whole sector.  Each hex holds a world
+    independently, so the number of worlds with any attribute is
+    binomial over the hexes.
+    """
+
+    hexes: int
+    star: Fraction
+    world: WorldOdds
+
+    def expected_count(self, per_world: Fraction = Fraction(1)) -> Fraction:
+        return self.hexes * self.star * per_world
+
+    def count_variance(self, per_world: Fraction = Fraction(1)) -> Fraction:
+        q: Fraction = self.star * per_world
+        return self.hexes * q * (1 - q)
+
+    def count_quantiles(
+        self, percentiles: list[int], per_world: Fraction = Fraction(1)
+    ) -> list[int]:
+        return binomial_quantiles(
+            self.hexes, float(self.star * per_world), percentiles
+        )
+
+    @property
+    def expected_population(self) -> Fraction:
+        return self.hexes * self.star * self.world.mean_population
+
+    @property
+    def population_variance(self) -> Fraction:
+        mean: Fraction = self.star * self.world.mean_population
+        square: Fraction = self.star * self.world.mean_square_population
+        return self.hexes * (square - mean * mean)
+
+
+def sector_odds(
+    bounds: SectorBounds | None = None,
+    density: int = DEFAULT_DENSITY,
+    settlement: Settlement | None = None,
+    avg_age: TechAge | None = None,
+) -> SectorOdds:
+    """
+    Return the exact odds for a sector made by `sector()` with the same
+    arguments, without generating anything.
+    """
+    b: SectorBounds = bounds if bounds else SectorBounds()
+    return SectorOdds(
+        hexes=b.width * b.height,
+        star=star_odds(density),
+        world=world_odds(settlement, avg_age),
+    )
@@ -0,0 +1,47 @@
+# The defaults and choices `nomadsec.py` offers on its command line.
+# This module imports nothing, so `nomadsec.py --help` and mistyped
+# arguments are answered without loading the generator.  `nomadgen.py`
+# takes its defaults from here; `testformats.py` checks the choices
+# against the tables they name.
+
+###################### CONSTANTS ###############################
+
+DEFAULT_SECTOR_HEIGHT: int = 10
+DEFAULT_SECTOR_WIDTH: int = 8
+
+# MINIMUM_DENSITY <= density < MAXIMUM_DENSITY
+DEFAULT_DENSITY: int = 3
+MAXIMUM_DENSITY: int = 6
+MINIMUM_DENSITY: int = 1
+
+# Hexes between the lattice points of the coarsest octave of noise (see
+# `nomadmask.py`)
+NOISE_SCALE: int = 16
+
+# Keys of SETTLEMENT_TYPE_NAMES and TECHNOLOGY_AGES_ABBREVS (see
+# `nomadtables.py`), in order
+SETTLEMENT_TYPE_CHOICES: tuple[str, ...] = (
+    "core",
+    "settled",
+    "conflict",
+    "frontier",
+    "unexplored",
+)
+TECHNOLOGY_AGE_CHOICES: tuple[str, ...] = (
+    "ep",
+    "lp",
+    "em",
+    "lm",
+    "ea",
+    "la",
+    "es",
+    "ls",
+    "ei",
+    "li",
+    "eg",
+    "lg",
+)
+
+# Keys of SUFFIX_SCHEMES (see `nomadgen.py`)
+SUFFIX_SCHEME_CHOICES: tuple[str, ...] = ("roman", "letter", "number")
+DEFAULT_SUFFIX_SCHEME: str = "roman"
@@ -0,0 +1,275 @@
+import csv
+import itertools
+import json
+from collections.abc import Callable, Iterable, Iterator
+from enum import Enum
+from typing import Any
+
+from nomadgen import (
+    Planet,
+    Sector,
+    SectorBounds,
+    StarHex,
+    StarSystem,
+    collect_star_systems,
+)
+from nomadtables import (
+    Characteristic,
+    TechAge,
+    TradeClass,
+    WorldTag,
+    chara_abbrev,
+    chara_str,
+    population_abbrev,
+    tech_age_abbrev,
+    tech_age_str,
+    trade_class_abbrev,
+    trade_class_str,
+    world_tag_str,
+)
+
+####################### OUTPUT #####################################
+
+# Planets per record batch in Arrow and Parquet output
+ARROW_BATCH_SIZE: int = 65_536
+
+
+def max_name_length(planets: Iterable[Planet]) -> int:
+    if isinstance(planets, Sector):
+        return planets.name_length
+    length: int = 0
+    for p in planets:
+        length = max(length, len(p.name), len(p.star.name))
+    return length
+
+
+def max_location_length(planets: Iterable[Planet]) -> int:
+    if isinstance(planets, Sector):
+        return max(planets.location_length, 4)
+    return max((len(p.location) for p in planets), default=4)
+
+
+def write_as_xsv(outfile, planets: Iterable[Planet], sep: str = ",") -> None:
+    writer = csv.writer(
+        outfile, delimiter=sep, quotechar='"', quoting=csv.QUOTE_MINIMAL
+    )
+    writer.writerow(
+        [
+            "Planet",
+            "Hex",
+            "Trade Class",
+            "Chara.",
+            "Population",
+            "Tech. Age",
+            "World Tag 1",
+            "World Tag 2",
+        ]
+    )
+    for p in planets:
+        writer.writerow(
+            [
+                p.name,
+                p.location,
+                trade_class_str(p.trade_class),
+                chara_str(p.chara),
+                str(p.population),
+                tech_age_str(p.tech_age),
+                world_tag_str(p.world_tag_1),
+                world_tag_str(p.world_tag_2),
+            ]
+        )
+
+
+def write_as_text(outfile, planets: Iterable[Planet]) -> None:
+    length: int = max_name_length(planets)
+    hexlen: int = max_location_length(planets)
+
+    outfile.write(
+        f"|{'Planet':{length}s}|{'Hex':{hexlen}s}|Trade Class     |Chara.    "
+        "|    Population|Tech. Age         |World Tags\n"
+    )
+    outfile.write(
+        f"|{'-'*(length)}|{'-'*(hexlen)}|----------------|----------"
+        "|-------------:|------------------|------------------------------\n"
+    )
+    for p in planets:
+        outfile.write(
+            f"|{p.name:{length}s}"
+            f"|{p.location:{hexlen}s}"
+            f"|{trade_class_str(p.trade_class):16s}"
+            f"|{chara_str(p.chara):10s}"
+            f"|{p.population:14_d}"
+            f"|{tech_age_str(p.tech_age):18s}"
+            f"|{world_tag_str(p.world_tag_1)}, {world_tag_str(p.world_tag_2)}\n"
+        )
+
+
+def write_as_short_text(outfile, planets: Iterable[Planet]) -> None:
+    length: int = max_name_length(planets)
+    hexlen: int = max_location_length(planets)
+
+    outfile.write(
+        f"|{'Planet':{length}s}|{'Hex':{hexlen}s}"
+        "|TC|Ch|    Population|TA|World Tags\n"
+    )
+    outfile.write(
+        f"|{'-'*(length)}|{'-'*(hexlen)}"
+        "|--|--|-----:|--|------------------------------\n"
+    )
+    for p in planets:
+        outfile.write(
+            f"|{p.name:{length}s}"
+            f"|{p.location:{hexlen}s}"
+            f"|{trade_class_abbrev(p.trade_class):2s}"
+            f"|{chara_abbrev(p.chara):2s}"
+            f"|{population_abbrev(p.population):6s}"
+            f"|{tech_age_abbrev(p.tech_age):2s}"
+            f"|{world_tag_str(p.world_tag_1)}, {world_tag_str(p.world_tag_2)}\n"
+        )
+
+
+class StarPlanetEncoder(json.JSONEncoder):
+    def default(self, o) -> dict[str, Any]:
+        if isinstance(o, Planet):
+            p: Planet = o
+            return {
+                "name": p.name,
+                "hex": p.location,
+                "x": p.star.x,
+                "y": p.star.y,
+                "trade_class": trade_class_str(p.trade_class),
+                "characteristic": chara_str(p.chara),
+                "population": p.population,
+                "technology_age": tech_age_str(p.tech_age),
+                "world_tags": [
+                    world_tag_str(p.world_tag_1),
+                    world_tag_str(p.world_tag_2),
+                ],
+            }
+        if isinstance(o, StarHex):
+            s: StarHex = o
+            return {
+                "name": s.name,
+                "hex": s.location,
+                "x": s.x,
+                "y": s.y,
+            }
+        if isinstance(o, StarSystem):
+            ss: StarSystem = o
+            return {
+                "star": ss.star,
+                "planets": ss.planets,
+            }
+        return json.JSONEncoder.default(self, o)
+
+
+def write_as_json(
+    outfile,
+    bounds: SectorBounds,
+    planets: Iterable[Planet],
+    stars: Iterable[StarHex] | None = None,
+    systems: list[StarSystem] | None = None,
+) -> None:
+    if systems is None:
+        systems = collect_star_systems(planets, stars)
+    if isinstance(planets, Sector):
+        planets = planets.planets
+    obj: dict = {
+        "x": bounds.x,
+        "y": bounds.y,
+        "width": bounds.width,
+        "height": bounds.height,
+        "planets": planets,
+        "systems": systems,
+    }
+    json.dump(obj, outfile, cls=StarPlanetEncoder, indent=4)
+
+
+def write_as_json_lines(outfile, planets: Iterable[Planet]) -> None:
+    encoder = StarPlanetEncoder()
+    for p in planets:
+        outfile.write(encoder.encode(p))
+        outfile.write("\n")
+
+
+def _codes(
+    members: Iterable[Enum], to_str: Callable[[Any], str]
+) -> tuple[list[str], dict[Any, int]]:
+    # every name an enum can take, and each member's index into them
+    names: list[str] = []
+    codes: dict[Any, int] = {}
+    for i, m in enumerate(members):
+        names.append(to_str(m))
+        codes[m] = i
+    return names, codes
+
+
+def write_as_arrow(
+    outfile,
+    planets: Iterable[Planet],
+    parquet: bool = False,
+    batch_size: int = ARROW_BATCH_SIZE,
+) -> None:
+    """
+    Write planets to the binary file `outfile` as an Arrow IPC file, or
+    as Parquet if `parquet`, one record batch of `batch_size` planets at
+    a time so only one batch is in memory.  Trade class, characteristic,
+    tech age and world tags are dictionary-encoded against every value
+    they can take, so all batches share the same dictionaries.  Needs
+    `pyarrow`.
+    """
+    import pyarrow as pa  # type: ignore
+
+    tc_names, tc_codes = _codes(TradeClass, trade_class_str)
+    ch_names, ch_codes = _codes(Characteristic, chara_str)
+    age_names, age_codes = _codes(TechAge, tech_age_str)
+    tag_names, tag_codes = _codes(WorldTag, world_tag_str)
+    tcs, chs, ages, tags = (
+        pa.array(names, pa.string())
+        for names in (tc_names, ch_names, age_names, tag_names)
+    )
+    encoded = pa.dictionary(pa.int8(), pa.string())
+    schema = pa.schema(
+        [
+            ("name", pa.string()),
+            ("x", pa.int32()),
+            ("y", pa.int32()),
+            ("trade_class", encoded),
+            ("characteristic", encoded),
+            ("population", pa.int64()),
+            ("technology_age", encoded),
+            ("world_tag_1", encoded),
+            ("world_tag_2", encoded),
+        ]
+    )
+
+    def encode(codes: list[int | None], dictionary) -> Any:
+        return pa.DictionaryArray.from_arrays(pa.array(codes, pa.int8()), dictionary)
+
+    def record_batch(chunk: tuple[Planet, ...]) -> Any:
+        return pa.record_batch(
+            [
+                pa.array([p.name for p in chunk], pa.string()),
+                pa.array([p.star.x for p in chunk], pa.int32()),
+                pa.array([p.star.y for p in chunk], pa.int32()),
+                encode([tc_codes[p.trade_class] for p in chunk], tcs),
+                encode([ch_codes[p.chara] for p in chunk], chs),
+                pa.array([p.population for p in chunk], pa.int64()),
+                encode([age_codes[p.tech_age] for p in chunk], ages),
+                # a missing tag is null
+                encode([tag_codes.get(p.world_tag_1) for p in chunk], tags),
+                encode([tag_codes.get(p.world_tag_2) for p in chunk], tags),
+            ],
+            schema=schema,
+        )
+
+    if parquet:
+        import pyarrow.parquet as pq  # type: ignore
+
+        writer = pq.ParquetWriter(outfile, schema)
+    else:
+        writer = pa.ipc.new_file(outfile, schema)
+    with writer:
+        it: Iterator[Planet] = iter(planets)
+        while chunk := tuple(itertools.islice(it, batch_size)):
+            writer.write_batch(record_batch(chunk))
@@ -0,0 +1,423 @@
+import csv
+import json
+import re
+from collections.abc import Iterable, Iterator
+from enum import auto
+from enum import Enum
+from typing import Any
+
+from nomadgen import (
+    Planet,
+    Sector,
+    SectorBounds,
+    StarHex,
+    TRAVELLER_SECTOR_HEIGHT,
+    TRAVELLER_SECTOR_WIDTH,
+)
+from nomadtables import (
+    Characteristic,
+    TechAge,
+    TradeClass,
+    WorldTag,
+    chara_abbrev,
+    chara_str,
+    tech_age_abbrev,
+    tech_age_str,
+    trade_class_abbrev,
+    trade_class_str,
+    world_tag_str,
+)
+
+###################### FORMATS ###############################
+
+
+class SectorFormat(Enum):
+    TEXT = auto()
+    SHORT_TEXT = auto()
+    XSV = auto()
+    JSON = auto()
+    JSON_LINES = auto()
+
+
+# Column headers written by `nomadsec.write_as_xsv`
+XSV_NAME_COL: str = "Planet"
+XSV_HEX_COL: str = "Hex"
+XSV_TRADE_CLASS_COL: str = "Trade Class"
+XSV_CHARACTERISTIC_COL: str = "Chara."
+XSV_POPULATION_COL: str = "Population"
+XSV_TECH_AGE_COL: str = "Tech. Age"
+XSV_WORLD_TAG_1_COL: str = "World Tag 1"
+XSV_WORLD_TAG_2_COL: str = "World Tag 2"
+XSV_COLUMNS: tuple[str, ...] = (
+    XSV_NAME_COL,
+    XSV_HEX_COL,
+    XSV_TRADE_CLASS_COL,
+    XSV_CHARACTERISTIC_COL,
+    XSV_POPULATION_COL,
+    XSV_TECH_AGE_COL,
+    XSV_WORLD_TAG_1_COL,
+    XSV_WORLD_TAG_2_COL,
+)
+
+# Column indexes in both the full and the abbreviated text tables
+TEXT_NAME_COL: int = 1
+TEXT_HEX_COL: int = 2
+TEXT_TRADE_CLASS_COL: int = 3
+TEXT_CHARACTERISTIC_COL: int = 4
+TEXT_POPULATION_COL: int = 5
+TEXT_TECH_AGE_COL: int = 6
+TEXT_WORLD_TAGS_COL: int = 7
+
+# Column headers written by `nomadsec.write_as_text` and
+# `nomadsec.write_as_short_text`
+TEXT_COLUMNS: tuple[str, ...] = (
+    "Planet",
+    "Hex",
+    "Trade Class",
+    "Chara.",
+    "Population",
+    "Tech. Age",
+    "World Tags",
+)
+SHORT_TEXT_COLUMNS: tuple[str, ...] = (
+    "Planet",
+    "Hex",
+    "TC",
+    "Ch",
+    "Population",
+    "TA",
+    "World Tags",
+)
+
+###################### LOOKUPS ###############################
+
+# Every lookup accepts both the full name and the abbreviation, in any case,
+# and always returns the same (interned) enum member or string.
+
+TRADE_CLASS_NAMES: dict[str, TradeClass] = {
+    **{trade_class_str(t).lower(): t for t in TradeClass},
+    **{trade_class_abbrev(t).lower(): t for t in TradeClass},
+}
+
+
+CHARACTERISTIC_NAMES: dict[str, Characteristic] = {
+    **{chara_str(c).lower(): c for c in Characteristic},
+    **{chara_abbrev(c).lower(): c for c in Characteristic},
+}
+
+
+TECH_AGE_NAMES: dict[str, TechAge] = {
+    **{tech_age_str(a).lower(): a for a in TechAge},
+    **{tech_age_abbrev(a).lower(): a for a in TechAge},
+}
+
+
+WORLD_TAG_NAMES: dict[str, WorldTag] = {
+    world_tag_str(tag).lower(): tag for tag in WorldTag
+}
+
+
+# [sector across "." sector down ":"] hex code
+LOCATION_PATTERN: re.Pattern = re.compile(
+    r"^\s*(?:(-?\d+)\.(-?\d+):)?((?:\d\d)+)\s*$"
+)
+
+
+POPULATION_SUFFIXES: dict[str, int] = {
+    "K": 1_000,
+    "M": 1_000_000,
+    "B": 1_000_000_000,
+}
+
+
+def _lookup(names: dict[str, Any], kind: str, value: str) -> Any:
+    key: str = value.strip().lower()
+    if key not in names:
+        raise ValueError(f"unknown {kind}: {value!r}")
+    return names[key]
+
+
+def str_to_trade_class(value: str) -> TradeClass:
+    return _lookup(TRADE_CLASS_NAMES, "trade class", value)
+
+
+def str_to_characteristic(value: str) -> Characteristic:
+    return _lookup(CHARACTERISTIC_NAMES, "characteristic", value)
+
+
+def str_to_any_tech_age(value: str) -> TechAge:
+    return _lookup(TECH_AGE_NAMES, "technology age", value)
+
+
+def str_to_world_tag(value: str) -> WorldTag | None:
+    # a missing tag is blank
+    return _lookup(WORLD_TAG_NAMES, "world tag", value) if value.strip() else None
+
+
+def str_to_population(value: str) -> int:
+    pop: str = value.strip().replace("_", "").replace(",", "")
+    if pop and pop[-1] in POPULATION_SUFFIXES:
+        return int(pop[:-1]) * POPULATION_SUFFIXES[pop[-1]]
+    return int(pop)
+
+
+def str_to_coords(location: str) -> tuple[int, int]:
+    """
+    Return the global (x, y) of a location written by `location_of()`,
+    i.e. a hex code with an optional "sx.sy:" sector prefix.  Codes
+    without a prefix are split in half, so maps written before sectors
+    (e.g. "100100") read back to the same coordinates.
+    """
+    m = LOCATION_PATTERN.match(location)
+    if not m:
+        raise ValueError(f"bad hex code: {location!r}")
+    sx, sy, code = m.groups()
+    half: int = len(code) // 2
+    x, y = int(code[:half]), int(code[half:])
+    if sx is None:
+        return x, y
+    if len(code) != 4:
+        raise ValueError(f"bad hex code: {location!r}")
+    return (
+        int(sx) * TRAVELLER_SECTOR_WIDTH + x,
+        int(sy) * TRAVELLER_SECTOR_HEIGHT + y,
+    )
+
+
+####################### PARSING ###############################
+
+
+class PlanetBuilder:
+    """
+    Turn raw field values into `Planet` objects, sharing one `StarHex`
+    per hex so planets in the same system compare and hash as one star.
+    """
+
+    def __init__(self, star_names: dict[str, str] | None = None) -> None:
+        self.star_names: dict[str, str] = star_names or {}
+        self.stars: dict[str, StarHex] = {}
+        # only JSON records the bounds of the map
+        self.bounds: SectorBounds | None = None
+
+    def star(self, location: str, default_name: str) -> StarHex:
+        code: str = location.strip()
+        if code not in self.stars:
+            x, y = str_to_coords(code)
+            name: str = self.star_names.get(code, default_name)
+            self.stars[code] = StarHex(x=x, y=y, name=name)
+        return self.stars[code]
+
+    def planet(
+        self,
+        name: str,
+        location: str,
+        trade: str,
+        chara: str,
+        pop: str | int,
+        age: str,
+        tag1: str,
+        tag2: str,
+    ) -> Planet:
+        name = name.strip()
+        return Planet(
+            name=name,
+            star=self.star(location, name),
+            trade_class=str_to_trade_class(trade),
+            chara=str_to_characteristic(chara),
+            population=pop if isinstance(pop, int) else str_to_population(pop),
+            tech_age=str_to_any_tech_age(age),
+            world_tag_1=str_to_world_tag(tag1),
+            world_tag_2=str_to_world_tag(tag2),
+        )
+
+    def planet_from_json(self, obj: dict[str, Any]) -> Planet:
+        tags: list[str] = list(obj.get("world_tags", [])) + ["", ""]
+        return self.planet(
+            obj["name"],
+            obj["hex"],
+            obj["trade_class"],
+            obj["characteristic"],
+            int(obj["population"]),
+            obj["technology_age"],
+            tags[0],
+            tags[1],
+        )
+
+
+def detect_format(firstline: str) -> tuple[SectorFormat, str | None]:
+    """
+    Guess the format of `nomadsec.py` output from its first line;
+    also return the separator if the format is XSV.
+    """
+    line: str = firstline.lstrip("\ufeff").strip()
+    if line.startswith("{"):
+        try:
+            json.loads(line)
+        except json.JSONDecodeError:
+            return SectorFormat.JSON, None
+        return SectorFormat.JSON_LINES, None
+    if line.startswith("|"):
+        cels: list[str] = re.split(r"\s*\|\s*", line)
+        if len(cels) > TEXT_NAME_COL and cels[TEXT_NAME_COL] == XSV_NAME_COL:
+            if len(cels) > TEXT_TRADE_CLASS_COL and cels[TEXT_TRADE_CLASS_COL] == "TC":
+                return SectorFormat.SHORT_TEXT, None
+            return SectorFormat.TEXT, None
+    # the separator is whatever follows the first column name
+    elif line.startswith(XSV_NAME_COL) and len(line) > len(XSV_NAME_COL):
+        sep: str = line[len(XSV_NAME_COL)]
+        if not sep.isalnum():
+            return SectorFormat.XSV, sep
+    if not line:
+        raise ValueError("cannot detect format of empty input")
+    raise ValueError("not nomadsec output")
+
+
+def read_text(lines: Iterable[str], builder: PlanetBuilder) -> Iterator[Planet]:
+    for line in lines:
+        if not line.strip():
+            continue
+        cels: list[str] = re.split(r"\s*\|\s*", line.rstrip())
+        if len(cels) <= TEXT_WORLD_TAGS_COL:
+            raise ValueError(f"bad table row: {line!r}")
+        if cels[TEXT_NAME_COL][:1] == "-" or cels[TEXT_NAME_COL] == "Planet":
+            continue
+        tags: list[str] = re.split(r"\s*,\s*", cels[TEXT_WORLD_TAGS_COL]) + [""]
+        yield builder.planet(
+            cels[TEXT_NAME_COL],
+            cels[TEXT_HEX_COL],
+            cels[TEXT_TRADE_CLASS_COL],
+            cels[TEXT_CHARACTERISTIC_COL],
+            cels[TEXT_POPULATION_COL],
+            cels[TEXT_TECH_AGE_COL],
+            tags[0],
+            tags[1],
+        )
+
+
+def read_xsv(
+    lines: Iterable[str], builder: PlanetBuilder, sep: str = ","
+) -> Iterator[Planet]:
+    reader = csv.DictReader(lines, delimiter=sep)
+    header: list[str] = list(reader.fieldnames or [])
+    missing: list[str] = [col for col in XSV_COLUMNS if col not in header]
+    if missing:
+        raise ValueError(f"missing columns: {', '.join(missing)}")
+    for row in reader:
+        name: str = row[XSV_NAME_COL] or ""
+        hexcode: str = row[XSV_HEX_COL] or ""
+        if name[:1] == "-" or hexcode[:1] == "-":
+            continue
+        yield builder.planet(
+            name,
+            hexcode,
+            row[XSV_TRADE_CLASS_COL],
+            row[XSV_CHARACTERISTIC_COL],
+            row[XSV_POPULATION_COL],
+            row[XSV_TECH_AGE_COL],
+            row[XSV_WORLD_TAG_1_COL],
+            row[XSV_WORLD_TAG_2_COL],
+        )
+
+
+def read_json_lines(
+    lines: Iterable[str], builder: PlanetBuilder
+) -> Iterator[Planet]:
+    for line in lines:
+        if line.strip():
+            yield builder.planet_from_json(json.loads(line))
+
+
+def read_json(text: str, builder: PlanetBuilder) -> Iterator[Planet]:
+    jsondata: dict[str, Any] = json.loads(text)
+    if all(k in jsondata for k in ("x", "y", "width", "height")):
+        builder.bounds = SectorBounds(
+            height=jsondata["height"],
+            width=jsondata["width"],
+            x=jsondata["x"],
+            y=jsondata["y"],
+        )
+    for ss in jsondata.get("systems", []):
+        star: dict[str, Any] = ss["star"]
+        builder.star_names[star["hex"]] = star["name"]
+        builder.star(star["hex"], star["name"])
+    for p in jsondata["planets"]:
+        yield builder.planet_from_json(p)
+
+
+def read_planets(
+    infile,
+    fmt: SectorFormat | None = None,
+    sep: str | None = None,
+) -> Iterator[Planet]:
+    """
+    Read `Planet` objects from any format `nomadsec.py` writes,
+    detecting the format from the first line unless `fmt` is given.
+    """
+    return _read(infile, fmt, sep, PlanetBuilder())
+
+
+def read_stars(
+    infile,
+    fmt: SectorFormat | None = None,
+    sep: str | None = None,
+) -> Iterator[StarHex]:
+    """
+    Read the distinct `StarHex` objects from `nomadsec.py` output,
+    including stars without planets if the format records them.
+    """
+    builder = PlanetBuilder()
+    for _ in _read(infile, fmt, sep, builder):
+        pass
+    return iter(sorted(builder.stars.values()))
+
+
+def read_sector(
+    infile,
+    fmt: SectorFormat | None = None,
+    sep: str | None = None,
+) -> Sector:
+    """
+    Read a whole `Sector` from `nomadsec.py` output.  Only JSON records
+    the bounds of the map; for other formats they are the smallest
+    rectangle that holds every star.
+    """
+    builder = PlanetBuilder()
+    planets: list[Planet] = list(_read(infile, fmt, sep, builder))
+    stars: list[StarHex] = sorted(builder.stars.values())
+    return Sector(builder.bounds or bounds_of(stars), stars, planets)
+
+
+def bounds_of(stars: list[StarHex]) -> SectorBounds:
+    xs: list[int] = [s.x for s in stars]
+    ys: list[int] = [s.y for s in stars]
+    if not xs:
+        return SectorBounds()
+    return SectorBounds(
+        height=max(ys) - min(ys) + 1,
+        width=max(xs) - min(xs) + 1,
+        x=min(xs),
+        y=min(ys),
+    )
+
+
+def _read(
+    infile, fmt: SectorFormat | None, sep: str | None, builder: PlanetBuilder
+) -> Iterator[Planet]:
+    firstline: str = infile.readline()
+    if fmt is None:
+        fmt, sniffed = detect_format(firstline)
+        sep = sep or sniffed
+
+    lines: Iterator[str] = _chain_first(firstline.lstrip("\ufeff"), infile)
+    if fmt == SectorFormat.JSON:
+        return read_json("".join(lines), builder)
+    if fmt == SectorFormat.JSON_LINES:
+        return read_json_lines(lines, builder)
+    if fmt == SectorFormat.XSV:
+        return read_xsv(lines, builder, sep or ",")
+    return read_text(lines, builder)
+
+
+def _chain_first(first: str, rest: Iterable[str]) -> Iterator[str]:
+    yield first
+    yield from rest
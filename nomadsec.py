@@ -7,867 +7,63 @@
 # ]
 # ///
 
-import argparse
-import csv
-import itertools
-import json
-import random
-import string
+import os
 import sys
+import time
 from collections.abc import Iterable
-from dataclasses import dataclass, field
-from enum import auto
-from enum import Enum
-from typing import Any, Protocol, Tuple
-
-from namemaker import make_name_set  # type: ignore
-
-###################### CONSTANTS ###############################
-
-# Coordinates are expressed as (number across, number down) starting at 1
-# ergo, the highest coordinate is f"{x+width-1:0d}{y+height-1:0d}"
-DEFAULT_SECTOR_X: int = 1
-DEFAULT_SECTOR_Y: int = 1
-DEFAULT_SECTOR_HEIGHT: int = 10
-DEFAULT_SECTOR_WIDTH: int = 8
-
-# MINIMUM_DENSITY <= density < MAXIMUM_DENSITY
-DEFAULT_DENSITY: int = 3
-MAXIMUM_DENSITY: int = 6
-MINIMUM_DENSITY: int = 1
-
-##################### PROTOCOLS ##############################
-
-
-class NomadDice(Protocol):
-    def __call__(
-        self, nkeep: int = 2, nadv: int = 0, nsides: int = 6, low: int = 1
-    ) -> int:
-        return 0    # keep type checkers happy
-
-
-class NameSet(Protocol):
-    def make_name(self) -> str:
-        return ""   # keep type checkers happy
-
-    def add_to_history(self, name_s) -> None: ...
-
-
-####################### DICE #################################
-
-
-def nomad_dice(nkeep: int = 2, nadv: int = 0, nsides: int = 6, low: int = 1) -> int:
-    """
-    Roll `nkeep` + abs(`nadv`) `nsides`-sided dice;
-    if nadv is negative, keep the `nkeep`
-    lowest, else keep the `nkeep` highest.
-    """
-
-    def one_die():
-        return random.randint(low, nsides + low - 1)
-
-    if nkeep == 1 and nadv == 0:
-        return one_die()
-
-    ntotal: int = nkeep + abs(nadv)
-    rolls: list[int] = [one_die() for _ in range(ntotal)]
-    rolls.sort()
-    return sum(rolls[:nkeep]) if nadv < 0 else sum(rolls[-nkeep:])
-
-
-####################### TABLES ################################
-
-# All tables copied from the XD6 SRD.
-
-
-class Settlement(Enum):
-    CORE = auto()
-    SETTLED = auto()
-    CONFLICT = auto()
-    FRONTIER = auto()
-    UNEXPLORED = auto()
-
-
-SETTLEMENT_TYPES: list[Settlement] = list(Settlement)
-
-
-SETTLEMENT_TYPE_NAMES: dict[str, Settlement] = {
-    "core": Settlement.CORE,
-    "settled": Settlement.SETTLED,
-    "conflict": Settlement.CONFLICT,
-    "frontier": Settlement.FRONTIER,
-    "unexplored": Settlement.UNEXPLORED,
-}
-
-
-class TradeClass(Enum):
-    AGRICULTURAL = auto()
-    GARDEN = auto()
-    INDUSTRIAL = auto()
-    NON_AGRICULTURAL = auto()
-    NON_INDUSTRIAL = auto()
-    POOR = auto()
-    RESOURCE = auto()
-    RICH = auto()
-
-
-TRADE_CLASS_TYPES: list[TradeClass] = list(TradeClass)
-
-
-TRADE_CLASS_TO_ABBREVS: dict[TradeClass, str] = {
-    TradeClass.AGRICULTURAL: "Ag",
-    TradeClass.GARDEN: "Ga",
-    TradeClass.INDUSTRIAL: "In",
-    TradeClass.NON_AGRICULTURAL: "Na",
-    TradeClass.NON_INDUSTRIAL: "Ni",
-    TradeClass.POOR: "Po",
-    TradeClass.RESOURCE: "Re",
-    TradeClass.RICH: "Ri",
-}
-
-
-TRADE_CLASS_SETTLED: dict[int, TradeClass] = {
-    2: TradeClass.GARDEN,
-    3: TradeClass.RESOURCE,
-    4: TradeClass.POOR,
-    5: TradeClass.POOR,
-    6: TradeClass.NON_AGRICULTURAL,
-    7: TradeClass.NON_INDUSTRIAL,
-    8: TradeClass.AGRICULTURAL,
-    9: TradeClass.AGRICULTURAL,
-    10: TradeClass.RICH,
-    11: TradeClass.RICH,
-    12: TradeClass.INDUSTRIAL,
-}
-
-
-TRADE_CLASS_UNEXPLORED: dict[int, TradeClass] = {
-    2: TradeClass.POOR,
-    3: TradeClass.GARDEN,
-    4: TradeClass.GARDEN,
-    5: TradeClass.GARDEN,
-    6: TradeClass.RESOURCE,
-    7: TradeClass.RESOURCE,
-    8: TradeClass.POOR,
-    9: TradeClass.POOR,
-    10: TradeClass.POOR,
-    11: TradeClass.POOR,
-    12: TradeClass.POOR,
-}
-
-
-class Characteristic(Enum):
-    ASTEROID = auto()
-    CORROSIVE = auto()
-    DESERT = auto()
-    ICEBALL = auto()
-    INERT = auto()
-    MARGINAL = auto()
-    OCEAN = auto()
-    PRIME = auto()
-    PRIMORDIAL = auto()
-    ROCKBALL = auto()
-    TAINTED = auto()
-
-
-CHARACTERISTICS_TO_ABBREVS: dict[Characteristic, str] = {
-    Characteristic.ASTEROID: "As",
-    Characteristic.CORROSIVE: "Co",
-    Characteristic.DESERT: "De",
-    Characteristic.ICEBALL: "Ic",
-    Characteristic.INERT: "In",
-    Characteristic.MARGINAL: "Ma",
-    Characteristic.OCEAN: "Oc",
-    Characteristic.PRIME: "Pr",
-    Characteristic.PRIMORDIAL: "Pl",
-    Characteristic.ROCKBALL: "Ro",
-    Characteristic.TAINTED: "Ta",
-}
-
-
-CHARACTERISTICS: dict[TradeClass, list[Characteristic]] = {
-    TradeClass.AGRICULTURAL: [
-        Characteristic.PRIME,
-        Characteristic.PRIME,
-        Characteristic.TAINTED,
-        Characteristic.TAINTED,
-        Characteristic.MARGINAL,
-        Characteristic.OCEAN,
-    ],
-    TradeClass.GARDEN: [
-        Characteristic.PRIME,
-        Characteristic.TAINTED,
-        Characteristic.MARGINAL,
-        Characteristic.OCEAN,
-        Characteristic.DESERT,
-        Characteristic.PRIMORDIAL,
-    ],
-    TradeClass.INDUSTRIAL: [
-        Characteristic.ASTEROID,
-        Characteristic.ROCKBALL,
-        Characteristic.MARGINAL,
-        Characteristic.TAINTED,
-        Characteristic.TAINTED,
-        Characteristic.ICEBALL,
-    ],
-    TradeClass.NON_AGRICULTURAL: [
-        Characteristic.ASTEROID,
-        Characteristic.ROCKBALL,
-        Characteristic.ICEBALL,
-        Characteristic.MARGINAL,
-        Characteristic.TAINTED,
-        Characteristic.INERT,
-    ],
-    TradeClass.NON_INDUSTRIAL: [
-        Characteristic.ASTEROID,
-        Characteristic.ROCKBALL,
-        Characteristic.ROCKBALL,
-        Characteristic.MARGINAL,
-        Characteristic.TAINTED,
-        Characteristic.INERT,
-    ],
-    TradeClass.POOR: [
-        Characteristic.ROCKBALL,
-        Characteristic.ROCKBALL,
-        Characteristic.ICEBALL,
-        Characteristic.ASTEROID,
-        Characteristic.INERT,
-        Characteristic.CORROSIVE,
-    ],
-    TradeClass.RESOURCE: [
-        Characteristic.ASTEROID,
-        Characteristic.ROCKBALL,
-        Characteristic.ICEBALL,
-        Characteristic.MARGINAL,
-        Characteristic.INERT,
-        Characteristic.CORROSIVE,
-    ],
-    TradeClass.RICH: [
-        Characteristic.PRIME,
-        Characteristic.PRIME,
-        Characteristic.TAINTED,
-        Characteristic.TAINTED,
-        Characteristic.MARGINAL,
-        Characteristic.OCEAN,
-    ],
-}
-
-
-@dataclass(frozen=True, slots=True)
-class PopulationSpec:
-    ndice: int
-    modifier: int
-    multiplier: int
-
-
-POPULATION: dict[TradeClass, PopulationSpec] = {
-    TradeClass.AGRICULTURAL: PopulationSpec(1, 0, 50_000_000),
-    TradeClass.GARDEN: PopulationSpec(0, 0, 0),
-    TradeClass.INDUSTRIAL: PopulationSpec(2, 0, 500_000_000),
-    TradeClass.NON_AGRICULTURAL: PopulationSpec(1, 0, 200_000_000),
-    TradeClass.NON_INDUSTRIAL: PopulationSpec(2, 0, 50_000),
-    TradeClass.POOR: PopulationSpec(2, -8, 500),  # none if unexplored
-    TradeClass.RESOURCE: PopulationSpec(0, 0, 0),
-    TradeClass.RICH: PopulationSpec(4, 0, 100_000_000),
-}
-
-
-class TechAge(Enum):
-    NO_TECHNOLOGY = 0
-    EARLY_PRIMITIVE = 1
-    LATE_PRIMITIVE = 2
-    EARLY_MECHANICAL = 3
-    LATE_MECHANICAL = 4
-    EARLY_ATOMIC = 5
-    LATE_ATOMIC = 6
-    EARLY_SPACE = 7
-    LATE_SPACE = 8
-    EARLY_INTERSTELLAR = 9
-    LATE_INTERSTELLAR = 10
-    EARLY_GALACTIC = 11
-    LATE_GALACTIC = 12
-    COSMIC = 13
-
-
-TECHNOLOGY_AGES: list[TechAge] = list(TechAge)
-
-
-TECHNOLOGY_AGES_ABBREVS: dict[str, TechAge] = {
-    "ep": TechAge.EARLY_PRIMITIVE,
-    "lp": TechAge.LATE_PRIMITIVE,
-    "em": TechAge.EARLY_MECHANICAL,
-    "lm": TechAge.LATE_MECHANICAL,
-    "ea": TechAge.EARLY_ATOMIC,
-    "la": TechAge.LATE_ATOMIC,
-    "es": TechAge.EARLY_SPACE,
-    "ls": TechAge.LATE_SPACE,
-    "ei": TechAge.EARLY_INTERSTELLAR,
-    "li": TechAge.LATE_INTERSTELLAR,
-    "eg": TechAge.EARLY_GALACTIC,
-    "lg": TechAge.LATE_GALACTIC,
-}
-
-
-TECHNOLOGY_AGES_TO_ABBREVS: dict[TechAge, str] = {
-    TechAge.NO_TECHNOLOGY: "NT",
-    TechAge.EARLY_PRIMITIVE: "EP",
-    TechAge.LATE_PRIMITIVE: "LP",
-    TechAge.EARLY_MECHANICAL: "EM",
-    TechAge.LATE_MECHANICAL: "LM",
-    TechAge.EARLY_ATOMIC: "EA",
-    TechAge.LATE_ATOMIC: "LA",
-    TechAge.EARLY_SPACE: "ES",
-    TechAge.LATE_SPACE: "LS",
-    TechAge.EARLY_INTERSTELLAR: "EI",
-    TechAge.LATE_INTERSTELLAR: "LI",
-    TechAge.EARLY_GALACTIC: "EG",
-    TechAge.LATE_GALACTIC: "LG",
-    TechAge.COSMIC: "C",
-}
-
-
-TECHNOLOGY_AGES_TABLE: dict[int, TechAge] = {
-    2: TechAge.EARLY_PRIMITIVE,
-    3: TechAge.LATE_PRIMITIVE,
-    4: TechAge.LATE_MECHANICAL,
-    5: TechAge.LATE_ATOMIC,
-    6: TechAge.EARLY_SPACE,
-    7: TechAge.LATE_SPACE,
-    8: TechAge.EARLY_INTERSTELLAR,
-    9: TechAge.LATE_INTERSTELLAR,
-    10: TechAge.EARLY_INTERSTELLAR,  # (sic)
-    11: TechAge.EARLY_GALACTIC,
-    12: TechAge.LATE_GALACTIC,
+from typing import IO, Any
+
+from nomadoptions import (
+    DEFAULT_DENSITY,
+    DEFAULT_SECTOR_HEIGHT,
+    DEFAULT_SECTOR_WIDTH,
+    DEFAULT_SUFFIX_SCHEME,
+    MAXIMUM_DENSITY,
+    MINIMUM_DENSITY,
+    NOISE_SCALE,
+    SETTLEMENT_TYPE_CHOICES,
+    SUFFIX_SCHEME_CHOICES,
+    TECHNOLOGY_AGE_CHOICES,
+)
+
+# Re-export the library so `from nomadsec import ...` keeps working, but
+# only load it on first use, so `--help` and bad arguments need nothing
+# beyond `nomadoptions.py`.  The first module with a name wins, as the
+# last of the star imports it replaces did.
+LIBRARY_MODULES: tuple[str, ...] = ("nomadgen", "nomadtables", "nomaddice")
+
+# Writers (and with them `csv` and `json`) come from `nomadout.py`
+OUTPUT_NAMES: set[str] = {
+    "StarPlanetEncoder",
+    "max_name_length",
+    "write_as_arrow",
+    "write_as_json",
+    "write_as_json_lines",
+    "write_as_short_text",
+    "write_as_text",
+    "write_as_xsv",
 }
 
 
-TECHNOLOGY_AGES_OFFSET_TABLE: dict[int, int] = {
-    2: -2,
-    3: -1,
-    4: -1,
-    5: -1,
-    6: +0,
-    7: +0,
-    8: +0,
-    9: +0,
-    10: +1,
-    11: +1,
-    12: +2,
-}
-
-
-WORLD_TAG_TABLE_1: list[list[str]] = [
-    [
-        "Alien Ruins",
-        "Ancient Ruins",
-        "Battleground",
-        "Capitalist",
-        "Caste System",
-        "Civil War",
-    ],
-    [
-        "Corporate",
-        "Declining Population",
-        "Desert",
-        "Feral World",
-        "Forbidden Tech",
-        "Glaciers",
-    ],
-    [
-        "Historical Culture",
-        "Honorable",
-        "Impending Doom",
-        "Liberal",
-        "Mercenaries",
-        "Misandry/Misogyny",
-    ],
-    [
-        "Multiple Species",
-        "Nomads",
-        "Peaceful",
-        "Police State",
-        "Psionics",
-        "Radioactive",
-    ],
-    [
-        "Restrictive Laws",
-        "Robots",
-        "Segregated",
-        "Separate Cultures",
-        "Superstitious",
-        "Terraforming",
-    ],
-    [
-        "Trade Hub",
-        "Underground Cities",
-        "Unusual Tech",
-        "Utopia",
-        "Xeno-archeology",
-        "Xenophobia",
-    ],
-]
-
-
-WORLD_TAG_TABLE_2: list[list[str]] = [
-    [
-        "Altered Humanity",
-        "Athenian Democracy",
-        "Beautiful",
-        "Captive Government",
-        "Charismatic Dictator",
-        "Cold War",
-    ],
-    [
-        "Cyborgs",
-        "Democracy",
-        "Eugenics",
-        "Feudal",
-        "Freak Weather",
-        "Gladiators",
-    ],
-    [
-        "Holy War",
-        "Hostile Space",
-        "Jungle World",
-        "Megafauna",
-        "Minimal Laws",
-        "Multiple Govs.",
-    ],
-    [
-        "Night/Day",
-        "Oceans",
-        "Pleasure World",
-        "Primitives",
-        "Quarantined",
-        "Religious",
-    ],
-    [
-        "Rigid Culture",
-        "Salvage Economy",
-        "Seismic Instability",
-        "Slavery",
-        "Taboo Custom",
-        "Theocracy",
-    ],
-    [
-        "Transhuman",
-        "Unusual Custom",
-        "Unusual Weather",
-        "Warlords",
-        "Xenophiles",
-        "Zombies",
-    ],
-]
-
-####################### TABLE LOOKUPS #############################
-
-
-def str_to_settlement(name: str | None) -> Settlement | None:
-    return SETTLEMENT_TYPE_NAMES.get(name) if name else None
-
-
-def trade_class(settle: Settlement | None, roll: NomadDice = nomad_dice) -> TradeClass:
-    assert not settle or settle in SETTLEMENT_TYPES
-    assert roll
-
-    result: int
-    if settle == Settlement.UNEXPLORED:
-        result = roll(2)
-        return TRADE_CLASS_UNEXPLORED[result]
-    if settle == Settlement.CORE:
-        result = roll(2, +2)
-    elif settle == Settlement.FRONTIER:
-        result = roll(2, -1)
-    elif settle == Settlement.CONFLICT:
-        result = roll(2, +1)
-    else:
-        result = roll(2)
-    return TRADE_CLASS_SETTLED[result]
-
-
-def trade_class_str(trade: TradeClass | None) -> str:
-    assert not trade or trade in TRADE_CLASS_TYPES
-    if not trade:
-        return ""
-    return string.capwords(trade.name.replace("_", " ")).replace(" ", "-")
-
-
-def trade_class_abbrev(trade: TradeClass | None) -> str:
-    assert not trade or trade in TRADE_CLASS_TYPES
-    return TRADE_CLASS_TO_ABBREVS[trade] if trade else ""
-
-
-def characteristic(tc: TradeClass, roll: NomadDice = nomad_dice) -> Characteristic:
-    assert tc in CHARACTERISTICS
-    return CHARACTERISTICS[tc][roll(1) - 1]
-
-
-def chara_str(c: Characteristic | None) -> str:
-    return c.name.capitalize() if c else ""
-
-
-def chara_abbrev(c: Characteristic | None) -> str:
-    return CHARACTERISTICS_TO_ABBREVS[c] if c else ""
-
-
-def population(
-    tc: TradeClass, settle: Settlement | None, roll: NomadDice = nomad_dice
-) -> int:
-    assert tc in TRADE_CLASS_TYPES
-    assert not settle or settle in SETTLEMENT_TYPES
-    assert roll
-
-    if tc == TradeClass.POOR and settle == Settlement.UNEXPLORED:
-        return 0
-    assert tc in POPULATION
-    popspec: PopulationSpec = POPULATION[tc]
-    pop: int = (roll(popspec.ndice) + popspec.modifier) * popspec.multiplier
-    return max(pop, 0)
-
-
-def population_abbrev(pop: int) -> str:
-    # sourcery skip: assign-if-exp, reintroduce-else
-    if pop == 0:
-        return f"{pop:6d}"
-    if pop % 1_000_000_000 == 0:
-        return f"{pop//1_000_000_000:5d}B"
-    if pop % 1_000_000 == 0:
-        return f"{pop//1_000_000:5d}M"
-    if pop % 1_000 == 0:
-        return f"{pop//1_000:5d}K"
-    return f"{pop:6d}"
-
-
-def tech_age_random(roll: NomadDice = nomad_dice) -> TechAge:
-    assert roll
-    return TECHNOLOGY_AGES_TABLE[roll(2)]
-
-
-def tech_age_offset(age: TechAge, roll: NomadDice = nomad_dice) -> TechAge:
-    assert age in TECHNOLOGY_AGES
-    assert roll
-
-    offset: int = TECHNOLOGY_AGES_OFFSET_TABLE[roll(2)]
-    index: int = age.value
-    if index + offset < TechAge.EARLY_PRIMITIVE.value:
-        return TechAge.EARLY_PRIMITIVE
-    if index + offset > TechAge.LATE_GALACTIC.value:
-        return TechAge.LATE_GALACTIC
-    return TECHNOLOGY_AGES[index + offset]
-
-
-def tech_age(
-    pop: int, avg_age: TechAge | None = None, roll: NomadDice = nomad_dice
-) -> TechAge:
-    assert not avg_age or avg_age in TECHNOLOGY_AGES
-    assert roll
-    if pop == 0:
-        return TechAge.NO_TECHNOLOGY
-    return tech_age_offset(avg_age, roll) if avg_age else tech_age_random(roll)
-
-
-def tech_age_str(age: TechAge | None) -> str:
-    return string.capwords(age.name.replace("_", " ")) if age else ""
-
-
-def tech_age_abbrev(age: TechAge | None) -> str:
-    return TECHNOLOGY_AGES_TO_ABBREVS.get(age, "") if age else ""
-
-
-def str_to_tech_age(agestr: str | None) -> TechAge | None:
-    return TECHNOLOGY_AGES_ABBREVS.get(agestr) if agestr else None
-
-
-def world_tag(index: int = 1, roll: NomadDice = nomad_dice) -> str:
-    assert roll
-    if index % 2 == 1:
-        return WORLD_TAG_TABLE_1[roll(1) - 1][roll(1) - 1]
-    return WORLD_TAG_TABLE_2[roll(1) - 1][roll(1) - 1]
-
-
-####################### SECTORS ###############################
-
-
-@dataclass(frozen=True, order=True, kw_only=True, slots=True)
-class StarHex:
-    x: int
-    y: int
-    name: str
-
-    @property
-    def hexcode(self) -> str:
-        return f"{self.x:02d}{self.y:02d}"
-
-    def repr(self) -> str:
-        return f"StarHex({self.hexcode}, {repr(self.name)})"
+def __getattr__(name: str) -> Any:
+    if name in OUTPUT_NAMES:
+        import nomadout
 
+        return getattr(nomadout, name)
+    if not name.startswith("_"):
+        import importlib
 
-@dataclass(frozen=True, order=True, repr=True, kw_only=True, slots=True)
-class Planet():
-    name: str
-    star: StarHex
-    trade_class: TradeClass
-    chara: Characteristic
-    population: int
-    tech_age: TechAge
-    world_tag_1: str
-    world_tag_2: str
-
-    @property
-    def hexcode(self) -> str:
-        return self.star.hexcode if self.star else "????"
-
-
-@dataclass(order=True, repr=True)
-class StarSystem:
-    star: StarHex
-    planets: list[Planet] = field(default_factory=list)
-
-    def add_planet(self, p: Planet) -> None:
-        self.planets.append(p)
-
-
-@dataclass(repr=True)
-class SectorBounds:
-    height: int = DEFAULT_SECTOR_HEIGHT
-    width: int = DEFAULT_SECTOR_WIDTH
-    x: int = DEFAULT_SECTOR_X
-    y: int = DEFAULT_SECTOR_Y
-
-
-    def x_range(self) -> Iterable[int]:
-        return range(self.x, self.width + self.x)
-
-
-    def y_range(self) -> Iterable[int]:
-        return range(self.y, self.height + self.y)
-
-
-def collect_star_systems(
-    planets: Iterable[Planet], stars: Iterable[StarHex] | None = None
-) -> list[StarSystem]:
-    starmap: dict[StarHex, StarSystem] = (
-        {s: StarSystem(s) for s in stars} if stars else {}
-    )
-    for p in planets:
-        s = p.star
-        if s not in starmap:
-            starmap[s] = StarSystem(s)
-        starmap[s].add_planet(p)
-    return sorted(starmap.values())
-
-
-def make_stars(
-    nameset: NameSet,
-    density: int = DEFAULT_DENSITY,
-    bounds: SectorBounds | None = None,
-    roll: NomadDice = nomad_dice,
-) -> list[StarHex]:
-
-    b: SectorBounds = bounds if bounds else SectorBounds()
-
-    # Check args
-    assert MINIMUM_DENSITY <= density <= MAXIMUM_DENSITY
-    assert b.height > 0
-    assert b.width > 0
-    assert b.x > 0
-    assert b.y > 0
-    assert roll
-
-    return [
-        StarHex(x=x, y=y, name=nameset.make_name())
-        for x, y in itertools.product(b.x_range(), b.y_range())
-        if roll(1, 0, MAXIMUM_DENSITY, MINIMUM_DENSITY) <= density
-    ]
-
-
-def make_planet(
-    star: StarHex,
-    name: str,
-    settlement: Settlement | None = None,
-    avg_age: TechAge | None = None,
-    tcin: TradeClass | None = None,
-    roll: NomadDice = nomad_dice,
-) -> Planet:
-    assert star
-    assert name
-    assert not settlement or settlement in SETTLEMENT_TYPES
-    assert not avg_age or avg_age in TECHNOLOGY_AGES
-    assert not tcin or tcin in TRADE_CLASS_TYPES
-    assert roll
-
-    tc: TradeClass = tcin or trade_class(settlement, roll)
-    cha: Characteristic = characteristic(tc, roll)
-    pop: int = population(tc, settlement, roll)
-    ta: TechAge = tech_age(pop, avg_age, roll)
-
-    return Planet(
-        star=star,
-        name=name,
-        trade_class=tc,
-        chara=cha,
-        population=pop,
-        tech_age=ta,
-        world_tag_1=world_tag(1, roll),
-        world_tag_2=world_tag(2, roll),
-    )
-
-
-def sector(
-    nameset: NameSet,
-    avg_age: TechAge | None = None,
-    settlement: Settlement | None = None,
-    density: int = DEFAULT_DENSITY,
-    bounds: SectorBounds | None = None,
-    roll: NomadDice = nomad_dice,
-) -> Tuple[list[Planet], list[StarHex]]:
-
-    # generate a map of stars
-    stars: list[StarHex] = make_stars(
-        nameset, density=density, bounds=bounds, roll=roll
-    )
-
-    # generate (one) planet for each star
-    planets: list[Planet] = [
-        make_planet(s, s.name, settlement, avg_age, None, roll) for s in stars
-    ]
-
-    return planets, stars
-
-
-####################### OUTPUT #####################################
-
-
-def max_name_length(planets: Iterable[Planet]) -> int:
-    length: int = 0
-    for p in planets:
-        length = max(length, len(p.name), len(p.star.name))
-    return length
-
-
-def write_as_xsv(outfile, planets: Iterable[Planet], sep: str = ",") -> None:
-    writer = csv.writer(
-        outfile, delimiter=sep, quotechar='"', quoting=csv.QUOTE_MINIMAL
-    )
-    writer.writerow(
-        [
-            "Planet",
-            "Hex",
-            "Trade Class",
-            "Chara.",
-            "Population",
-            "Tech. Age",
-            "World Tag 1",
-            "World Tag 2",
-        ]
-    )
-    for p in planets:
-        writer.writerow(
-            [
-                p.name,
-                p.hexcode,
-                trade_class_str(p.trade_class),
-                chara_str(p.chara),
-                str(p.population),
-                tech_age_str(p.tech_age),
-                p.world_tag_1,
-                p.world_tag_2,
-            ]
-        )
-
-
-def write_as_text(outfile, planets: Iterable[Planet]) -> None:
-    length: int = max_name_length(planets)
-
-    outfile.write(
-        f"|{'Planet':{length}s}|Hex |Trade Class     |Chara.    "
-        "|    Population|Tech. Age         |World Tags\n"
-    )
-    outfile.write(
-        f"|{'-'*(length)}|----|----------------|----------"
-        "|-------------:|------------------|------------------------------\n"
-    )
-    for p in planets:
-        outfile.write(
-            f"|{p.name:{length}s}"
-            f"|{p.hexcode}"
-            f"|{trade_class_str(p.trade_class):16s}"
-            f"|{chara_str(p.chara):10s}"
-            f"|{p.population:14_d}"
-            f"|{tech_age_str(p.tech_age):18s}"
-            f"|{p.world_tag_1}, {p.world_tag_2}\n"
-        )
-
-
-def write_as_short_text(outfile, planets: Iterable[Planet]) -> None:
-    length: int = max_name_length(planets)
-
-    outfile.write(f"|{'Planet':{length}s}|Hex |TC|Ch|    Population|TA|World Tags\n")
-    outfile.write(
-        f"|{'-'*(length)}|----|--|--|-----:|--|------------------------------\n"
-    )
-    for p in planets:
-        outfile.write(
-            f"|{p.name:{length}s}"
-            f"|{p.hexcode}"
-            f"|{trade_class_abbrev(p.trade_class):2s}"
-            f"|{chara_abbrev(p.chara):2s}"
-            f"|{population_abbrev(p.population):6s}"
-            f"|{tech_age_abbrev(p.tech_age):2s}"
-            f"|{p.world_tag_1}, {p.world_tag_2}\n"
-        )
-
-
-class StarPlanetEncoder(json.JSONEncoder):
-    def default(self, o) -> dict[str, Any]:
-        if isinstance(o, Planet):
-            p: Planet = o
-            return {
-                "name": p.name,
-                "hex": p.hexcode,
-                "trade_class": trade_class_str(p.trade_class),
-                "characteristic": chara_str(p.chara),
-                "population": p.population,
-                "technology_age": tech_age_str(p.tech_age),
-                "world_tags": [p.world_tag_1, p.world_tag_2],
-            }
-        if isinstance(o, StarHex):
-            s: StarHex = o
-            return {
-                "name": s.name,
-                "hex": s.hexcode,
-            }
-        if isinstance(o, StarSystem):
-            ss: StarSystem = o
-            return {
-                "star": ss.star,
-                "planets": ss.planets,
-            }
-        return json.JSONEncoder.default(self, o)
-
-
-def write_as_json(
-    outfile,
-    bounds: SectorBounds,
-    planets: Iterable[Planet],
-    stars: Iterable[StarHex] | None = None,
-) -> None:
-    systems: list[StarSystem] = collect_star_systems(planets, stars)
-    obj: dict = {
-        "x": bounds.x,
-        "y": bounds.y,
-        "width": bounds.width,
-        "height": bounds.height,
-        "planets": planets,
-        "systems": systems,
-    }
-    json.dump(obj, outfile, cls=StarPlanetEncoder, indent=4)
+        for module_name in LIBRARY_MODULES:
+            module = importlib.import_module(module_name)
+            if hasattr(module, name):
+                return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 ######################### MAIN #########################################
 
 
-def read_exclude_file(nameset: NameSet, infile) -> None:
+def read_exclude_file(nameset, infile) -> None:
     with infile:
         for line in infile.readlines():
             name: str = line.strip()
@@ -878,24 +74,56 @@ def debug(*args, **kwargs) -> None:
     print("DEBUG:", *args, file=sys.stderr, **kwargs)
 
 
+# Output suffixes that `nomadcompress.py` compresses; only these import it
+COMPRESSED_SUFFIXES: tuple[str, ...] = (".gz", ".bz2", ".xz", ".zst")
+
+
+def _output_file(path: str) -> IO:
+    import argparse
+
+    if path.endswith(COMPRESSED_SUFFIXES):
+        from nomadcompress import CompressedFileType
+
+        return CompressedFileType(mode="w", encoding="UTF-8")(path)
+    return argparse.FileType(mode="w", encoding="UTF-8")(path)
+
+
 def main() -> None:
     # sourcery skip: extract-method
     # Parse arguments
+    parse_start: float = time.perf_counter()
+    import argparse
+
     parser = argparse.ArgumentParser(
         description="Generate a sector for the _FTL: Nomad_ RPG"
     )
     parser.add_argument(
         "-n",
         "--namelist",
-        help="text file providing example names",
+        help="text file providing example names, or a model compiled from one"
+        " by `nomadnames.py`",
         default="Greek mythology.txt",
     )
+    parser.add_argument(
+        "--compiled",
+        help="make names from NAMELIST with `nomadnames.py` instead of namemaker,"
+        " compiling it into NAMELIST.nmodel next to it",
+        action="store_true",
+    )
     parser.add_argument(
         "-x",
         "--exclude-list",
-        help="text file providing names NOT to use",
+        help="text file providing names NOT to use, or a store built from them"
+        " by `nomadexclude.py`",
         type=argparse.FileType(mode="r", encoding="UTF-8"),
     )
+    parser.add_argument(
+        "--min-distance",
+        help="make each name at least this many letter edits from every other"
+        " name and those in a text exclude list (1 only rules out repeats)",
+        default=1,
+        type=int,
+    )
     parser.add_argument(
         "-W",
         "--width",
@@ -938,27 +166,77 @@ def main() -> None:
         help="settlement level of sector",
         default="settled",
         type=str,
-        choices=list(SETTLEMENT_TYPE_NAMES),
+        choices=SETTLEMENT_TYPE_CHOICES,
     )
     parser.add_argument(
         "-t",
         "--tech",
         help="technology age of sector",
         type=str,
-        choices=list(TECHNOLOGY_AGES_ABBREVS),
+        choices=TECHNOLOGY_AGE_CHOICES,
+    )
+    parser.add_argument(
+        "--mask",
+        help="per-hex density, settlement and tech age, as a mask file or"
+        " text grid from `nomadmask.py`; hexes it leaves unset use -d, -s and -t",
+    )
+    parser.add_argument(
+        "--noise",
+        help="let settlement level and tech age drift smoothly across the map,"
+        " from this seed; maps made with the same seed join up",
+        type=int,
+        metavar="SEED",
+    )
+    parser.add_argument(
+        "--noise-scale",
+        help=f"size in hexes of the largest features of --noise"
+        f" (default {NOISE_SCALE})",
+        default=NOISE_SCALE,
+        type=int,
+    )
+    parser.add_argument(
+        "-m",
+        "--systems",
+        help="roll a whole system of worlds for each star",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--suffix",
+        help="how to name the other worlds of a system after its star"
+        f" (default {DEFAULT_SUFFIX_SCHEME})",
+        default=DEFAULT_SUFFIX_SCHEME,
+        choices=SUFFIX_SCHEME_CHOICES,
+    )
+    parser.add_argument(
+        "-c",
+        "--constraint",
+        help="require a number of worlds to match, e.g. 'trade_class=Rich>=2'"
+        " or 'tag=Quarantined==0' (may be repeated)",
+        action="append",
+        default=[],
     )
     parser.add_argument(
         "-D",
         "--debug",
-        help="write debugging info to error stream",
+        help="write debugging info and stage timings to error stream",
         action="store_true",
     )
+    parser.add_argument(
+        "--trace",
+        help="write stage timings and dice counts as JSON to this file",
+        type=argparse.FileType(mode="w", encoding="UTF-8"),
+    )
+    parser.add_argument(
+        "--profile",
+        help="write cProfile statistics (for `pstats`) to this file",
+    )
     parser.add_argument(
         "-o",
         "--output",
-        help="output file",
+        help="output file; *.gz, *.bz2, *.xz and *.zst are compressed as they"
+        " are written",
         default="-",
-        type=argparse.FileType(mode="w", encoding="UTF-8"),
+        type=_output_file,
     )
     parser.add_argument(
         "-a",
@@ -972,6 +250,11 @@ def main() -> None:
         help="write output as JSON",
         action="store_true",
     )
+    parser.add_argument(
+        "--jsonl",
+        help="write output as JSON Lines, one planet per line",
+        action="store_true",
+    )
     parser.add_argument(
         "--separator",
         help="write with the given character as a separator",
@@ -990,8 +273,68 @@ def main() -> None:
         dest="separator",
         const="\t",
     )
+    parser.add_argument(
+        "--arrow",
+        help="write as an Arrow IPC file (needs pyarrow)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--parquet",
+        help="write as a Parquet file (needs pyarrow)",
+        action="store_true",
+    )
     args = parser.parse_args()
 
+    if args.arrow or args.parquet:
+        import importlib.util
+
+        if importlib.util.find_spec("pyarrow") is None:
+            parser.error("--arrow and --parquet need pyarrow (pip install pyarrow)")
+
+    # the generator, now the arguments are known to be good
+    from nomaddice import BatchDice, nomad_dice
+    from nomadgen import (
+        Mask,
+        NameSet,
+        Planet,
+        Profiler,
+        Sector,
+        SectorBounds,
+        StarHex,
+        StarSystem,
+        _stage,
+        sector,
+        star_systems,
+    )
+    from nomadtables import (
+        NomadDice,
+        Settlement,
+        TechAge,
+        str_to_settlement,
+        str_to_tech_age,
+    )
+
+    if (args.mask or args.noise is not None) and args.constraint:
+        parser.error("--constraint cannot be combined with --mask or --noise")
+    if args.noise_scale <= 0:
+        parser.error("--noise-scale must be at least 1")
+    if args.min_distance < 1:
+        parser.error("--min-distance must be at least 1")
+
+    if args.constraint:
+        from nomadconstraints import ConstraintError, parse_constraint, satisfy
+
+        try:
+            constraints = [parse_constraint(c) for c in args.constraint]
+        except ValueError as e:
+            parser.error(str(e))
+
+    profiler: Profiler | None = (
+        Profiler() if args.debug or args.trace else None
+    )
+    if profiler:
+        profiler.add("arguments", parse_start, time.perf_counter())
+
     if args.debug:
         debug(f"namelist={args.namelist}")
         debug(f"x={args.start_width} y={args.start_height}")
@@ -999,12 +342,69 @@ def main() -> None:
         debug(f"density={args.density}")
         debug(f"settlement={args.settlement}")
         debug(f"tech={args.tech}")
-
-    # initialize namemaker
-    nameset: NameSet = make_name_set(args.namelist)
-
-    if args.exclude_list:
-        read_exclude_file(nameset, args.exclude_list)
+        debug(f"mask={args.mask}")
+        debug(f"noise={args.noise} scale={args.noise_scale}")
+        debug(f"min_distance={args.min_distance}")
+        for c in args.constraint:
+            debug(f"constraint={c}")
+
+    if args.profile:
+        import cProfile
+
+        cprofiler = cProfile.Profile()
+        cprofiler.enable()
+
+    # initialize the name generator (imported here so other scripts can
+    # import us); a compiled model is used when asked for or given
+    with _stage(profiler, "nameset"):
+        nameset: NameSet
+        compiled: bool = args.compiled
+        try:
+            if not compiled and os.path.isfile(args.namelist):
+                from nomadnames import is_model
+
+                compiled = is_model(args.namelist)
+            if compiled:
+                from nomadnames import open_names
+
+                nameset = open_names(args.namelist)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        if not compiled:
+            from namemaker import make_name_set  # type: ignore
+
+            nameset = make_name_set(args.namelist)
+
+    # a store is checked name by name; a text list goes into the history
+    exclude_file = args.exclude_list
+    if exclude_file and os.path.isfile(exclude_file.name):
+        from nomadexclude import ExcludedNameSet, is_store, open_store
+
+        if is_store(exclude_file.name):
+            exclude_file.close()
+            try:
+                nameset = ExcludedNameSet(nameset, open_store(exclude_file.name))
+            except (OSError, ValueError) as e:
+                parser.error(str(e))
+            exclude_file = None
+
+    if args.min_distance > 1:
+        from nomadnames import DistinctNameSet
+
+        nameset = DistinctNameSet(nameset, args.min_distance)
+
+    if exclude_file:
+        with _stage(profiler, "exclude"):
+            read_exclude_file(nameset, exclude_file)
+
+    mask: Mask | None = None
+    if args.mask:
+        from nomadmask import open_mask
+
+        try:
+            mask = open_mask(args.mask)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
 
     bounds: SectorBounds = SectorBounds(
         height=args.height,
@@ -1013,28 +413,121 @@ def main() -> None:
         y=args.start_height,
     )
 
-    planets, stars = sector(
-        nameset=nameset,
-        settlement=str_to_settlement(args.settlement),
-        avg_age=str_to_tech_age(args.tech),
-        density=args.density,
-        bounds=bounds,
+    if args.noise is not None:
+        from nomadmask import NoiseMask
+
+        with _stage(profiler, "noise"):
+            mask = NoiseMask(bounds, args.noise, args.noise_scale, mask)
+
+    settlement: Settlement | None = str_to_settlement(args.settlement)
+    avg_age: TechAge | None = str_to_tech_age(args.tech)
+    roll: NomadDice = BatchDice() if args.systems else nomad_dice
+    if profiler:
+        roll = profiler.counting_dice(roll)
+
+    # whole systems can go straight to formats that need no column widths
+    stream: bool = bool(
+        args.systems
+        and not args.constraint
+        and not args.json
+        and (args.jsonl or args.separator or args.arrow or args.parquet)
     )
 
-    if args.debug:
-        debug(f"stars={len(stars)}")
-        debug(f"planets={len(planets)}")
+    planets: Iterable[Planet]
+    # a name set that runs out of names raises ValueError
+    try:
+        if args.systems:
+            systems: Iterable[StarSystem] = star_systems(
+                nameset=nameset,
+                settlement=settlement,
+                avg_age=avg_age,
+                density=args.density,
+                bounds=bounds,
+                suffix=args.suffix,
+                roll=roll,
+                profiler=profiler,
+                mask=mask,
+            )
+            if stream:
+                planets = (p for s in systems for p in s.planets)
+            else:
+                with _stage(profiler, "planets"):
+                    systems = list(systems)
+                stars: list[StarHex] = [s.star for s in systems]
+                planets = [p for s in systems for p in s.planets]
+        else:
+            planets, stars = sector(
+                nameset=nameset,
+                settlement=settlement,
+                avg_age=avg_age,
+                density=args.density,
+                bounds=bounds,
+                roll=roll,
+                profiler=profiler,
+                mask=mask,
+            )
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.constraint:
+        with _stage(profiler, "constraints"):
+            try:
+                planets = satisfy(planets, constraints, settlement, avg_age)
+            except ConstraintError as e:
+                sys.exit(f"{parser.prog}: error: {e}")
+
+    if not stream:
+        with _stage(profiler, "collect"):
+            sec: Sector = Sector(bounds, stars, planets)
+        planets = sec
+
+        if args.debug:
+            debug(f"stars={len(sec.stars)}")
+            debug(f"planets={len(sec.planets)}")
+            debug(f"population={sec.population}")
 
     # Print out the list of stars
-    with args.output as outfile:
-        if args.json:
-            write_as_json(outfile, bounds, planets, stars)
-        elif args.separator:
-            write_as_xsv(outfile, planets, args.separator)
-        elif args.abbreviate:
-            write_as_short_text(outfile, planets)
-        else:
-            write_as_text(outfile, planets)
+    from nomadout import (
+        write_as_arrow,
+        write_as_json,
+        write_as_json_lines,
+        write_as_short_text,
+        write_as_text,
+        write_as_xsv,
+    )
+
+    # streamed systems are made as they are written, so may run out of
+    # names here
+    try:
+        with args.output as outfile:
+            with _stage(profiler, "output"):
+                if args.arrow or args.parquet:
+                    write_as_arrow(outfile.buffer, planets, parquet=args.parquet)
+                elif args.json:
+                    write_as_json(outfile, bounds, planets)
+                elif args.jsonl:
+                    write_as_json_lines(outfile, planets)
+                elif args.separator:
+                    write_as_xsv(outfile, planets, args.separator)
+                elif args.abbreviate:
+                    write_as_short_text(outfile, planets)
+                else:
+                    write_as_text(outfile, planets)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.profile:
+        cprofiler.disable()
+        cprofiler.dump_stats(args.profile)
+
+    if profiler and args.debug:
+        profiler.report(sys.stderr)
+
+    if profiler and args.trace:
+        import json
+
+        with args.trace as tracefile:
+            json.dump(profiler.as_dict(), tracefile, indent=4)
 
 
 if __name__ == "__main__":
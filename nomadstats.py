@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+import argparse
+import json
+import os
+import random
+import statistics
+from collections import Counter
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from nomaddice import BatchDice
+from nomadgen import (
+    DEFAULT_DENSITY,
+    DEFAULT_SECTOR_HEIGHT,
+    DEFAULT_SECTOR_WIDTH,
+    MAXIMUM_DENSITY,
+    MINIMUM_DENSITY,
+    Planet,
+    SectorBounds,
+    SerialNameSet,
+    sector,
+)
+from nomadtables import (
+    SETTLEMENT_TYPE_NAMES,
+    Settlement,
+    TECHNOLOGY_AGES_ABBREVS,
+    TechAge,
+    TradeClass,
+    str_to_settlement,
+    str_to_tech_age,
+    tech_age_str,
+    trade_class_str,
+)
+
+###################### CONSTANTS ###############################
+
+DEFAULT_RUNS: int = 1_000
+
+PERCENTILES: list[int] = [5, 25, 50, 75, 95]
+
+# Sectors per task handed to a worker process
+CHUNK_SIZE: int = 50
+
+####################### SIMULATION ##############################
+
+
+@dataclass(frozen=True, slots=True)
+class SectorSpec:
+    bounds: SectorBounds
+    density: int = DEFAULT_DENSITY
+    settlement: Settlement | None = None
+    avg_age: TechAge | None = None
+
+
+def summarize(planets: Iterable[Planet]) -> Counter:
+    """
+    Count what we want to know about one sector: the number of worlds,
+    populated worlds, total population, and worlds per trade class and
+    technology age (keyed by the enum members themselves).
+    """
+    counts: Counter = Counter()
+    for p in planets:
+        counts["worlds"] += 1
+        counts[p.trade_class] += 1
+        counts[p.tech_age] += 1
+        if p.population > 0:
+            counts["populated"] += 1
+            counts["population"] += p.population
+    return counts
+
+
+def simulate(spec: SectorSpec, runs: int, seed: int) -> list[Counter]:
+    roll = BatchDice(rng=random.Random(seed))
+    result: list[Counter] = []
+    for _ in range(runs):
+        planets, _ = sector(
+            SerialNameSet(),
+            avg_age=spec.avg_age,
+            settlement=spec.settlement,
+            density=spec.density,
+            bounds=spec.bounds,
+            roll=roll,
+        )
+        result.append(summarize(planets))
+    return result
+
+
+def run_simulations(
+    spec: SectorSpec, runs: int, jobs: int, seed: int | None = None
+) -> list[Counter]:
+    """
+    Generate `runs` sectors to `spec` across `jobs` processes and return
+    the summary of each.  The same `seed` always gives the same result.
+    """
+    seeder = random.Random(seed)
+    chunks: list[int] = [
+        min(CHUNK_SIZE, runs - start) for start in range(0, runs, CHUNK_SIZE)
+    ]
+    seeds: list[int] = [seeder.getrandbits(64) for _ in chunks]
+    if jobs <= 1:
+        return [c for n, s in zip(chunks, seeds) for c in simulate(spec, n, s)]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = pool.map(simulate, [spec] * len(chunks), chunks, seeds)
+        return [c for chunk in results for c in chunk]
+
+
+def metric_names() -> dict[str | TradeClass | TechAge, str]:
+    return {
+        "worlds": "worlds",
+        "populated": "populated",
+        "population": "population",
+        **{t: f"trade: {trade_class_str(t)}" for t in TradeClass},
+        **{a: f"tech: {tech_age_str(a)}" for a in TechAge},
+    }
+
+
+def aggregate(summaries: list[Counter]) -> dict[str, dict[str, float]]:
+    """
+    Return the mean, standard deviation, extremes and percentiles of
+    every metric across all `summaries`.
+    """
+    result: dict[str, dict[str, float]] = {}
+    for key, name in metric_names().items():
+        values: list[int] = sorted(s[key] for s in summaries)
+        if not any(values):
+            continue
+        cuts: list[float] = (
+            statistics.quantiles(values, n=100, method="inclusive")
+            if len(values) > 1
+            else [float(values[0])] * 99
+        )
+        stats: dict[str, float] = {
+            "mean": statistics.fmean(values),
+            "stdev": statistics.stdev(values) if len(values) > 1 else 0.0,
+            "min": values[0],
+            "max": values[-1],
+        }
+        for pct in PERCENTILES:
+            stats[f"p{pct}"] = cuts[pct - 1]
+        result[name] = stats
+    return result
+
+
+def exact_statistics(spec: SectorSpec) -> dict[str, dict[str, float]]:
+    """
+    Return the same statistics as `aggregate()` would converge to, worked
+    out from the tables instead of simulated.  Counts of worlds are
+    binomial, so their percentiles are exact; total population gets only
+    its mean and standard deviation.
+    """
+    from nomadodds import sector_odds
+
+    odds = sector_odds(spec.bounds, spec.density, spec.settlement, spec.avg_age)
+    per_world = {
+        "worlds": 1,
+        "populated": odds.world.populated,
+        **odds.world.trade_class,
+        **odds.world.tech_age,
+    }
+    result: dict[str, dict[str, float]] = {}
+    for key, name in metric_names().items():
+        if key == "population":
+            result[name] = {
+                "mean": float(odds.expected_population),
+                "stdev": float(odds.population_variance) ** 0.5,
+            }
+            continue
+        if key not in per_world:
+            continue
+        q = per_world[key]
+        stats: dict[str, float] = {
+            "mean": float(odds.expected_count(q)),
+            "stdev": float(odds.count_variance(q)) ** 0.5,
+            "min": 0,
+            "max": odds.hexes,
+        }
+        for pct, cut in zip(PERCENTILES, odds.count_quantiles(PERCENTILES, q)):
+            stats[f"p{pct}"] = cut
+        result[name] = stats
+    return result
+
+
+######################### OUTPUT #######################################
+
+
+def write_report(
+    outfile, stats: dict[str, dict[str, float]], runs: int | None
+) -> None:
+    width: int = max(len(n) for n in stats)
+    columns: list[str] = [
+        "mean",
+        "stdev",
+        "min",
+        *(f"p{p}" for p in PERCENTILES),
+        "max",
+    ]
+    outfile.write(f"{runs} sectors\n" if runs else "exact\n")
+    outfile.write(f"|{'':{width}s}|" + "|".join(f"{c:>10s}" for c in columns) + "\n")
+    outfile.write(f"|{'-' * width}|" + "|".join("-" * 9 + ":" for _ in columns) + "\n")
+    for name, s in stats.items():
+        cells: list[str] = [
+            f"{'':10s}" if c not in s
+            else f"{s[c]:10.2f}" if s[c] < 1e6
+            else f"{s[c]:10.4g}"
+            for c in columns
+        ]
+        outfile.write(f"|{name:{width}s}|" + "|".join(cells) + "\n")
+
+
+######################### MAIN #########################################
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Generate many sectors and summarize what they contain"
+    )
+    parser.add_argument(
+        "-k",
+        "--runs",
+        help=f"number of sectors to generate (default {DEFAULT_RUNS})",
+        default=DEFAULT_RUNS,
+        type=int,
+    )
+    parser.add_argument(
+        "-J",
+        "--jobs",
+        help="number of worker processes (default: one per CPU)",
+        default=os.cpu_count() or 1,
+        type=int,
+    )
+    parser.add_argument(
+        "--seed",
+        help="seed for reproducible results",
+        type=int,
+    )
+    parser.add_argument(
+        "-e",
+        "--exact",
+        help="work out the statistics from the tables instead of simulating",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-W",
+        "--width",
+        help="number of hexes/parsecs across",
+        default=DEFAULT_SECTOR_WIDTH,
+        type=int,
+    )
+    parser.add_argument(
+        "-H",
+        "--height",
+        help="number of hexes/parsecs down",
+        default=DEFAULT_SECTOR_HEIGHT,
+        type=int,
+    )
+    parser.add_argument(
+        "-d",
+        "--density",
+        help="density of stars (n in 6)",
+        default=DEFAULT_DENSITY,
+        type=int,
+        choices=range(MINIMUM_DENSITY, MAXIMUM_DENSITY),
+    )
+    parser.add_argument(
+        "-s",
+        "--settlement",
+        help="settlement level of sector",
+        default="settled",
+        type=str,
+        choices=list(SETTLEMENT_TYPE_NAMES),
+    )
+    parser.add_argument(
+        "-t",
+        "--tech",
+        help="technology age of sector",
+        type=str,
+        choices=list(TECHNOLOGY_AGES_ABBREVS),
+    )
+    parser.add_argument(
+        "-j",
+        "--json",
+        help="write statistics as JSON",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="output file",
+        default="-",
+        type=argparse.FileType(mode="w", encoding="UTF-8"),
+    )
+    args = parser.parse_args()
+
+    spec = SectorSpec(
+        bounds=SectorBounds(height=args.height, width=args.width),
+        density=args.density,
+        settlement=str_to_settlement(args.settlement),
+        avg_age=str_to_tech_age(args.tech),
+    )
+    if args.runs < 1:
+        parser.error("--runs must be at least 1")
+
+    runs: int | None = None if args.exact else args.runs
+    stats: dict[str, dict[str, float]] = (
+        aggregate(run_simulations(spec, args.runs, args.jobs, args.seed))
+        if runs
+        else exact_statistics(spec)
+    )
+
+    with args.output as outfile:
+        if args.json:
+            json.dump({"runs": runs, "statistics": stats}, outfile, indent=4)
+        else:
+            write_report(outfile, stats, runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,721 @@
+import string
+from collections.abc import Iterable
+from dataclasses import dataclass
+from enum import auto
+from enum import Enum
+from typing import Protocol
+
+from nomaddice import nomad_dice
+
+##################### PROTOCOLS ##############################
+
+
+class NomadDice(Protocol):
+    def __call__(
+        self, nkeep: int = 2, nadv: int = 0, nsides: int = 6, low: int = 1
+    ) -> int:
+        return 0    # keep type checkers happy
+
+
+####################### TABLES ################################
+
+# All tables copied from the XD6 SRD.
+
+
+class Settlement(Enum):
+    CORE = auto()
+    SETTLED = auto()
+    CONFLICT = auto()
+    FRONTIER = auto()
+    UNEXPLORED = auto()
+
+
+SETTLEMENT_TYPES: list[Settlement] = list(Settlement)
+
+
+SETTLEMENT_TYPE_NAMES: dict[str, Settlement] = {
+    "core": Settlement.CORE,
+    "settled": Settlement.SETTLED,
+    "conflict": Settlement.CONFLICT,
+    "frontier": Settlement.FRONTIER,
+    "unexplored": Settlement.UNEXPLORED,
+}
+
+
+class TradeClass(Enum):
+    AGRICULTURAL = auto()
+    GARDEN = auto()
+    INDUSTRIAL = auto()
+    NON_AGRICULTURAL = auto()
+    NON_INDUSTRIAL = auto()
+    POOR = auto()
+    RESOURCE = auto()
+    RICH = auto()
+
+
+TRADE_CLASS_TYPES: list[TradeClass] = list(TradeClass)
+
+
+TRADE_CLASS_TO_ABBREVS: dict[TradeClass, str] = {
+    TradeClass.AGRICULTURAL: "Ag",
+    TradeClass.GARDEN: "Ga",
+    TradeClass.INDUSTRIAL: "In",
+    TradeClass.NON_AGRICULTURAL: "Na",
+    TradeClass.NON_INDUSTRIAL: "Ni",
+    TradeClass.POOR: "Po",
+    TradeClass.RESOURCE: "Re",
+    TradeClass.RICH: "Ri",
+}
+
+
+TRADE_CLASS_SETTLED: dict[int, TradeClass] = {
+    2: TradeClass.GARDEN,
+    3: TradeClass.RESOURCE,
+    4: TradeClass.POOR,
+    5: TradeClass.POOR,
+    6: TradeClass.NON_AGRICULTURAL,
+    7: TradeClass.NON_INDUSTRIAL,
+    8: TradeClass.AGRICULTURAL,
+    9: TradeClass.AGRICULTURAL,
+    10: TradeClass.RICH,
+    11: TradeClass.RICH,
+    12: TradeClass.INDUSTRIAL,
+}
+
+
+TRADE_CLASS_UNEXPLORED: dict[int, TradeClass] = {
+    2: TradeClass.POOR,
+    3: TradeClass.GARDEN,
+    4: TradeClass.GARDEN,
+    5: TradeClass.GARDEN,
+    6: TradeClass.RESOURCE,
+    7: TradeClass.RESOURCE,
+    8: TradeClass.POOR,
+    9: TradeClass.POOR,
+    10: TradeClass.POOR,
+    11: TradeClass.POOR,
+    12: TradeClass.POOR,
+}
+
+
+class Characteristic(Enum):
+    ASTEROID = auto()
+    CORROSIVE = auto()
+    DESERT = auto()
+    ICEBALL = auto()
+    INERT = auto()
+    MARGINAL = auto()
+    OCEAN = auto()
+    PRIME = auto()
+    PRIMORDIAL = auto()
+    ROCKBALL = auto()
+    TAINTED = auto()
+
+
+CHARACTERISTICS_TO_ABBREVS: dict[Characteristic, str] = {
+    Characteristic.ASTEROID: "As",
+    Characteristic.CORROSIVE: "Co",
+    Characteristic.DESERT: "De",
+    Characteristic.ICEBALL: "Ic",
+    Characteristic.INERT: "In",
+    Characteristic.MARGINAL: "Ma",
+    Characteristic.OCEAN: "Oc",
+    Characteristic.PRIME: "Pr",
+    Characteristic.PRIMORDIAL: "Pl",
+    Characteristic.ROCKBALL: "Ro",
+    Characteristic.TAINTED: "Ta",
+}
+
+
+CHARACTERISTICS: dict[TradeClass, list[Characteristic]] = {
+    TradeClass.AGRICULTURAL: [
+        Characteristic.PRIME,
+        Characteristic.PRIME,
+        Characteristic.TAINTED,
+        Characteristic.TAINTED,
+        Characteristic.MARGINAL,
+        Characteristic.OCEAN,
+    ],
+    TradeClass.GARDEN: [
+        Characteristic.PRIME,
+        Characteristic.TAINTED,
+        Characteristic.MARGINAL,
+        Characteristic.OCEAN,
+        Characteristic.DESERT,
+        Characteristic.PRIMORDIAL,
+    ],
+    TradeClass.INDUSTRIAL: [
+        Characteristic.ASTEROID,
+        Characteristic.ROCKBALL,
+        Characteristic.MARGINAL,
+        Characteristic.TAINTED,
+        Characteristic.TAINTED,
+        Characteristic.ICEBALL,
+    ],
+    TradeClass.NON_AGRICULTURAL: [
+        Characteristic.ASTEROID,
+        Characteristic.ROCKBALL,
+        Characteristic.ICEBALL,
+        Characteristic.MARGINAL,
+        Characteristic.TAINTED,
+        Characteristic.INERT,
+    ],
+    TradeClass.NON_INDUSTRIAL: [
+        Characteristic.ASTEROID,
+        Characteristic.ROCKBALL,
+        Characteristic.ROCKBALL,
+        Characteristic.MARGINAL,
+        Characteristic.TAINTED,
+        Characteristic.INERT,
+    ],
+    TradeClass.POOR: [
+        Characteristic.ROCKBALL,
+        Characteristic.ROCKBALL,
+        Characteristic.ICEBALL,
+        Characteristic.ASTEROID,
+        Characteristic.INERT,
+        Characteristic.CORROSIVE,
+    ],
+    TradeClass.RESOURCE: [
+        Characteristic.ASTEROID,
+        Characteristic.ROCKBALL,
+        Characteristic.ICEBALL,
+        Characteristic.MARGINAL,
+        Characteristic.INERT,
+        Characteristic.CORROSIVE,
+    ],
+    TradeClass.RICH: [
+        Characteristic.PRIME,
+        Characteristic.PRIME,
+        Characteristic.TAINTED,
+        Characteristic.TAINTED,
+        Characteristic.MARGINAL,
+        Characteristic.OCEAN,
+    ],
+}
+
+
+@dataclass(frozen=True, slots=True)
+class PopulationSpec:
+    ndice: int
+    modifier: int
+    multiplier: int
+
+
+POPULATION: dict[TradeClass, PopulationSpec] = {
+    TradeClass.AGRICULTURAL: PopulationSpec(1, 0, 50_000_000),
+    TradeClass.GARDEN: PopulationSpec(0, 0, 0),
+    TradeClass.INDUSTRIAL: PopulationSpec(2, 0, 500_000_000),
+    TradeClass.NON_AGRICULTURAL: PopulationSpec(1, 0, 200_000_000),
+    TradeClass.NON_INDUSTRIAL: PopulationSpec(2, 0, 50_000),
+    TradeClass.POOR: PopulationSpec(2, -8, 500),  # none if unexplored
+    TradeClass.RESOURCE: PopulationSpec(0, 0, 0),
+    TradeClass.RICH: PopulationSpec(4, 0, 100_000_000),
+}
+
+
+class TechAge(Enum):
+    NO_TECHNOLOGY = 0
+    EARLY_PRIMITIVE = 1
+    LATE_PRIMITIVE = 2
+    EARLY_MECHANICAL = 3
+    LATE_MECHANICAL = 4
+    EARLY_ATOMIC = 5
+    LATE_ATOMIC = 6
+    EARLY_SPACE = 7
+    LATE_SPACE = 8
+    EARLY_INTERSTELLAR = 9
+    LATE_INTERSTELLAR = 10
+    EARLY_GALACTIC = 11
+    LATE_GALACTIC = 12
+    COSMIC = 13
+
+
+TECHNOLOGY_AGES: list[TechAge] = list(TechAge)
+
+
+TECHNOLOGY_AGES_ABBREVS: dict[str, TechAge] = {
+    "ep": TechAge.EARLY_PRIMITIVE,
+    "lp": TechAge.LATE_PRIMITIVE,
+    "em": TechAge.EARLY_MECHANICAL,
+    "lm": TechAge.LATE_MECHANICAL,
+    "ea": TechAge.EARLY_ATOMIC,
+    "la": TechAge.LATE_ATOMIC,
+    "es": TechAge.EARLY_SPACE,
+    "ls": TechAge.LATE_SPACE,
+    "ei": TechAge.EARLY_INTERSTELLAR,
+    "li": TechAge.LATE_INTERSTELLAR,
+    "eg": TechAge.EARLY_GALACTIC,
+    "lg": TechAge.LATE_GALACTIC,
+}
+
+
+TECHNOLOGY_AGES_TO_ABBREVS: dict[TechAge, str] = {
+    TechAge.NO_TECHNOLOGY: "NT",
+    TechAge.EARLY_PRIMITIVE: "EP",
+    TechAge.LATE_PRIMITIVE: "LP",
+    TechAge.EARLY_MECHANICAL: "EM",
+    TechAge.LATE_MECHANICAL: "LM",
+    TechAge.EARLY_ATOMIC: "EA",
+    TechAge.LATE_ATOMIC: "LA",
+    TechAge.EARLY_SPACE: "ES",
+    TechAge.LATE_SPACE: "LS",
+    TechAge.EARLY_INTERSTELLAR: "EI",
+    TechAge.LATE_INTERSTELLAR: "LI",
+    TechAge.EARLY_GALACTIC: "EG",
+    TechAge.LATE_GALACTIC: "LG",
+    TechAge.COSMIC: "C",
+}
+
+
+TECHNOLOGY_AGES_TABLE: dict[int, TechAge] = {
+    2: TechAge.EARLY_PRIMITIVE,
+    3: TechAge.LATE_PRIMITIVE,
+    4: TechAge.LATE_MECHANICAL,
+    5: TechAge.LATE_ATOMIC,
+    6: TechAge.EARLY_SPACE,
+    7: TechAge.LATE_SPACE,
+    8: TechAge.EARLY_INTERSTELLAR,
+    9: TechAge.LATE_INTERSTELLAR,
+    10: TechAge.EARLY_INTERSTELLAR,  # (sic)
+    11: TechAge.EARLY_GALACTIC,
+    12: TechAge.LATE_GALACTIC,
+}
+
+
+TECHNOLOGY_AGES_OFFSET_TABLE: dict[int, int] = {
+    2: -2,
+    3: -1,
+    4: -1,
+    5: -1,
+    6: +0,
+    7: +0,
+    8: +0,
+    9: +0,
+    10: +1,
+    11: +1,
+    12: +2,
+}
+
+
+# Not in the SRD: worlds in a star system (main world included) on 2D,
+# for generating whole systems instead of one world per star.
+WORLDS_PER_SYSTEM_TABLE: dict[int, int] = {
+    2: 1,
+    3: 1,
+    4: 1,
+    5: 2,
+    6: 2,
+    7: 2,
+    8: 3,
+    9: 3,
+    10: 4,
+    11: 4,
+    12: 5,
+}
+
+
+class WorldTag(Enum):
+    ALIEN_RUINS = auto()
+    ANCIENT_RUINS = auto()
+    BATTLEGROUND = auto()
+    CAPITALIST = auto()
+    CASTE_SYSTEM = auto()
+    CIVIL_WAR = auto()
+    CORPORATE = auto()
+    DECLINING_POPULATION = auto()
+    DESERT = auto()
+    FERAL_WORLD = auto()
+    FORBIDDEN_TECH = auto()
+    GLACIERS = auto()
+    HISTORICAL_CULTURE = auto()
+    HONORABLE = auto()
+    IMPENDING_DOOM = auto()
+    LIBERAL = auto()
+    MERCENARIES = auto()
+    MISANDRY_MISOGYNY = auto()
+    MULTIPLE_SPECIES = auto()
+    NOMADS = auto()
+    PEACEFUL = auto()
+    POLICE_STATE = auto()
+    PSIONICS = auto()
+    RADIOACTIVE = auto()
+    RESTRICTIVE_LAWS = auto()
+    ROBOTS = auto()
+    SEGREGATED = auto()
+    SEPARATE_CULTURES = auto()
+    SUPERSTITIOUS = auto()
+    TERRAFORMING = auto()
+    TRADE_HUB = auto()
+    UNDERGROUND_CITIES = auto()
+    UNUSUAL_TECH = auto()
+    UTOPIA = auto()
+    XENO_ARCHEOLOGY = auto()
+    XENOPHOBIA = auto()
+    ALTERED_HUMANITY = auto()
+    ATHENIAN_DEMOCRACY = auto()
+    BEAUTIFUL = auto()
+    CAPTIVE_GOVERNMENT = auto()
+    CHARISMATIC_DICTATOR = auto()
+    COLD_WAR = auto()
+    CYBORGS = auto()
+    DEMOCRACY = auto()
+    EUGENICS = auto()
+    FEUDAL = auto()
+    FREAK_WEATHER = auto()
+    GLADIATORS = auto()
+    HOLY_WAR = auto()
+    HOSTILE_SPACE = auto()
+    JUNGLE_WORLD = auto()
+    MEGAFAUNA = auto()
+    MINIMAL_LAWS = auto()
+    MULTIPLE_GOVS = auto()
+    NIGHT_DAY = auto()
+    OCEANS = auto()
+    PLEASURE_WORLD = auto()
+    PRIMITIVES = auto()
+    QUARANTINED = auto()
+    RELIGIOUS = auto()
+    RIGID_CULTURE = auto()
+    SALVAGE_ECONOMY = auto()
+    SEISMIC_INSTABILITY = auto()
+    SLAVERY = auto()
+    TABOO_CUSTOM = auto()
+    THEOCRACY = auto()
+    TRANSHUMAN = auto()
+    UNUSUAL_CUSTOM = auto()
+    UNUSUAL_WEATHER = auto()
+    WARLORDS = auto()
+    XENOPHILES = auto()
+    ZOMBIES = auto()
+
+    def __init__(self, *args) -> None:
+        # one bit per tag, for `world_tag_mask()`; a plain attribute
+        # because enum hashing and `.value` are slow in tight loops
+        self.bit: int = 1 << self._value_
+
+
+WORLD_TAGS_TO_NAMES: dict[WorldTag, str] = {
+    WorldTag.ALIEN_RUINS: "Alien Ruins",
+    WorldTag.ANCIENT_RUINS: "Ancient Ruins",
+    WorldTag.BATTLEGROUND: "Battleground",
+    WorldTag.CAPITALIST: "Capitalist",
+    WorldTag.CASTE_SYSTEM: "Caste System",
+    WorldTag.CIVIL_WAR: "Civil War",
+    WorldTag.CORPORATE: "Corporate",
+    WorldTag.DECLINING_POPULATION: "Declining Population",
+    WorldTag.DESERT: "Desert",
+    WorldTag.FERAL_WORLD: "Feral World",
+    WorldTag.FORBIDDEN_TECH: "Forbidden Tech",
+    WorldTag.GLACIERS: "Glaciers",
+    WorldTag.HISTORICAL_CULTURE: "Historical Culture",
+    WorldTag.HONORABLE: "Honorable",
+    WorldTag.IMPENDING_DOOM: "Impending Doom",
+    WorldTag.LIBERAL: "Liberal",
+    WorldTag.MERCENARIES: "Mercenaries",
+    WorldTag.MISANDRY_MISOGYNY: "Misandry/Misogyny",
+    WorldTag.MULTIPLE_SPECIES: "Multiple Species",
+    WorldTag.NOMADS: "Nomads",
+    WorldTag.PEACEFUL: "Peaceful",
+    WorldTag.POLICE_STATE: "Police State",
+    WorldTag.PSIONICS: "Psionics",
+    WorldTag.RADIOACTIVE: "Radioactive",
+    WorldTag.RESTRICTIVE_LAWS: "Restrictive Laws",
+    WorldTag.ROBOTS: "Robots",
+    WorldTag.SEGREGATED: "Segregated",
+    WorldTag.SEPARATE_CULTURES: "Separate Cultures",
+    WorldTag.SUPERSTITIOUS: "Superstitious",
+    WorldTag.TERRAFORMING: "Terraforming",
+    WorldTag.TRADE_HUB: "Trade Hub",
+    WorldTag.UNDERGROUND_CITIES: "Underground Cities",
+    WorldTag.UNUSUAL_TECH: "Unusual Tech",
+    WorldTag.UTOPIA: "Utopia",
+    WorldTag.XENO_ARCHEOLOGY: "Xeno-archeology",
+    WorldTag.XENOPHOBIA: "Xenophobia",
+    WorldTag.ALTERED_HUMANITY: "Altered Humanity",
+    WorldTag.ATHENIAN_DEMOCRACY: "Athenian Democracy",
+    WorldTag.BEAUTIFUL: "Beautiful",
+    WorldTag.CAPTIVE_GOVERNMENT: "Captive Government",
+    WorldTag.CHARISMATIC_DICTATOR: "Charismatic Dictator",
+    WorldTag.COLD_WAR: "Cold War",
+    WorldTag.CYBORGS: "Cyborgs",
+    WorldTag.DEMOCRACY: "Democracy",
+    WorldTag.EUGENICS: "Eugenics",
+    WorldTag.FEUDAL: "Feudal",
+    WorldTag.FREAK_WEATHER: "Freak Weather",
+    WorldTag.GLADIATORS: "Gladiators",
+    WorldTag.HOLY_WAR: "Holy War",
+    WorldTag.HOSTILE_SPACE: "Hostile Space",
+    WorldTag.JUNGLE_WORLD: "Jungle World",
+    WorldTag.MEGAFAUNA: "Megafauna",
+    WorldTag.MINIMAL_LAWS: "Minimal Laws",
+    WorldTag.MULTIPLE_GOVS: "Multiple Govs.",
+    WorldTag.NIGHT_DAY: "Night/Day",
+    WorldTag.OCEANS: "Oceans",
+    WorldTag.PLEASURE_WORLD: "Pleasure World",
+    WorldTag.PRIMITIVES: "Primitives",
+    WorldTag.QUARANTINED: "Quarantined",
+    WorldTag.RELIGIOUS: "Religious",
+    WorldTag.RIGID_CULTURE: "Rigid Culture",
+    WorldTag.SALVAGE_ECONOMY: "Salvage Economy",
+    WorldTag.SEISMIC_INSTABILITY: "Seismic Instability",
+    WorldTag.SLAVERY: "Slavery",
+    WorldTag.TABOO_CUSTOM: "Taboo Custom",
+    WorldTag.THEOCRACY: "Theocracy",
+    WorldTag.TRANSHUMAN: "Transhuman",
+    WorldTag.UNUSUAL_CUSTOM: "Unusual Custom",
+    WorldTag.UNUSUAL_WEATHER: "Unusual Weather",
+    WorldTag.WARLORDS: "Warlords",
+    WorldTag.XENOPHILES: "Xenophiles",
+    WorldTag.ZOMBIES: "Zombies",
+}
+
+
+WORLD_TAG_TABLE_1: list[list[WorldTag]] = [
+    [
+        WorldTag.ALIEN_RUINS,
+        WorldTag.ANCIENT_RUINS,
+        WorldTag.BATTLEGROUND,
+        WorldTag.CAPITALIST,
+        WorldTag.CASTE_SYSTEM,
+        WorldTag.CIVIL_WAR,
+    ],
+    [
+        WorldTag.CORPORATE,
+        WorldTag.DECLINING_POPULATION,
+        WorldTag.DESERT,
+        WorldTag.FERAL_WORLD,
+        WorldTag.FORBIDDEN_TECH,
+        WorldTag.GLACIERS,
+    ],
+    [
+        WorldTag.HISTORICAL_CULTURE,
+        WorldTag.HONORABLE,
+        WorldTag.IMPENDING_DOOM,
+        WorldTag.LIBERAL,
+        WorldTag.MERCENARIES,
+        WorldTag.MISANDRY_MISOGYNY,
+    ],
+    [
+        WorldTag.MULTIPLE_SPECIES,
+        WorldTag.NOMADS,
+        WorldTag.PEACEFUL,
+        WorldTag.POLICE_STATE,
+        WorldTag.PSIONICS,
+        WorldTag.RADIOACTIVE,
+    ],
+    [
+        WorldTag.RESTRICTIVE_LAWS,
+        WorldTag.ROBOTS,
+        WorldTag.SEGREGATED,
+        WorldTag.SEPARATE_CULTURES,
+        WorldTag.SUPERSTITIOUS,
+        WorldTag.TERRAFORMING,
+    ],
+    [
+        WorldTag.TRADE_HUB,
+        WorldTag.UNDERGROUND_CITIES,
+        WorldTag.UNUSUAL_TECH,
+        WorldTag.UTOPIA,
+        WorldTag.XENO_ARCHEOLOGY,
+        WorldTag.XENOPHOBIA,
+    ],
+]
+
+
+WORLD_TAG_TABLE_2: list[list[WorldTag]] = [
+    [
+        WorldTag.ALTERED_HUMANITY,
+        WorldTag.ATHENIAN_DEMOCRACY,
+        WorldTag.BEAUTIFUL,
+        WorldTag.CAPTIVE_GOVERNMENT,
+        WorldTag.CHARISMATIC_DICTATOR,
+        WorldTag.COLD_WAR,
+    ],
+    [
+        WorldTag.CYBORGS,
+        WorldTag.DEMOCRACY,
+        WorldTag.EUGENICS,
+        WorldTag.FEUDAL,
+        WorldTag.FREAK_WEATHER,
+        WorldTag.GLADIATORS,
+    ],
+    [
+        WorldTag.HOLY_WAR,
+        WorldTag.HOSTILE_SPACE,
+        WorldTag.JUNGLE_WORLD,
+        WorldTag.MEGAFAUNA,
+        WorldTag.MINIMAL_LAWS,
+        WorldTag.MULTIPLE_GOVS,
+    ],
+    [
+        WorldTag.NIGHT_DAY,
+        WorldTag.OCEANS,
+        WorldTag.PLEASURE_WORLD,
+        WorldTag.PRIMITIVES,
+        WorldTag.QUARANTINED,
+        WorldTag.RELIGIOUS,
+    ],
+    [
+        WorldTag.RIGID_CULTURE,
+        WorldTag.SALVAGE_ECONOMY,
+        WorldTag.SEISMIC_INSTABILITY,
+        WorldTag.SLAVERY,
+        WorldTag.TABOO_CUSTOM,
+        WorldTag.THEOCRACY,
+    ],
+    [
+        WorldTag.TRANSHUMAN,
+        WorldTag.UNUSUAL_CUSTOM,
+        WorldTag.UNUSUAL_WEATHER,
+        WorldTag.WARLORDS,
+        WorldTag.XENOPHILES,
+        WorldTag.ZOMBIES,
+    ],
+]
+
+####################### TABLE LOOKUPS #############################
+
+
+def str_to_settlement(name: str | None) -> Settlement | None:
+    return SETTLEMENT_TYPE_NAMES.get(name) if name else None
+
+
+def trade_class(settle: Settlement | None, roll: NomadDice = nomad_dice) -> TradeClass:
+    assert not settle or settle in SETTLEMENT_TYPES
+    assert roll
+
+    result: int
+    if settle == Settlement.UNEXPLORED:
+        result = roll(2)
+        return TRADE_CLASS_UNEXPLORED[result]
+    if settle == Settlement.CORE:
+        result = roll(2, +2)
+    elif settle == Settlement.FRONTIER:
+        result = roll(2, -1)
+    elif settle == Settlement.CONFLICT:
+        result = roll(2, +1)
+    else:
+        result = roll(2)
+    return TRADE_CLASS_SETTLED[result]
+
+
+def trade_class_str(trade: TradeClass | None) -> str:
+    assert not trade or trade in TRADE_CLASS_TYPES
+    if not trade:
+        return ""
+    return string.capwords(trade.name.replace("_", " ")).replace(" ", "-")
+
+
+def trade_class_abbrev(trade: TradeClass | None) -> str:
+    assert not trade or trade in TRADE_CLASS_TYPES
+    return TRADE_CLASS_TO_ABBREVS[trade] if trade else ""
+
+
+def characteristic(tc: TradeClass, roll: NomadDice = nomad_dice) -> Characteristic:
+    assert tc in CHARACTERISTICS
+    return CHARACTERISTICS[tc][roll(1) - 1]
+
+
+def chara_str(c: Characteristic | None) -> str:
+    return c.name.capitalize() if c else ""
+
+
+def chara_abbrev(c: Characteristic | None) -> str:
+    return CHARACTERISTICS_TO_ABBREVS[c] if c else ""
+
+
+def population(
+    tc: TradeClass, settle: Settlement | None, roll: NomadDice = nomad_dice
+) -> int:
+    assert tc in TRADE_CLASS_TYPES
+    assert not settle or settle in SETTLEMENT_TYPES
+    assert roll
+
+    if tc == TradeClass.POOR and settle == Settlement.UNEXPLORED:
+        return 0
+    assert tc in POPULATION
+    popspec: PopulationSpec = POPULATION[tc]
+    pop: int = (roll(popspec.ndice) + popspec.modifier) * popspec.multiplier
+    return max(pop, 0)
+
+
+def population_abbrev(pop: int) -> str:
+    # sourcery skip: assign-if-exp, reintroduce-else
+    if pop == 0:
+        return f"{pop:6d}"
+    if pop % 1_000_000_000 == 0:
+        return f"{pop//1_000_000_000:5d}B"
+    if pop % 1_000_000 == 0:
+        return f"{pop//1_000_000:5d}M"
+    if pop % 1_000 == 0:
+        return f"{pop//1_000:5d}K"
+    return f"{pop:6d}"
+
+
+def tech_age_random(roll: NomadDice = nomad_dice) -> TechAge:
+    assert roll
+    return TECHNOLOGY_AGES_TABLE[roll(2)]
+
+
+def tech_age_offset(age: TechAge, roll: NomadDice = nomad_dice) -> TechAge:
+    assert age in TECHNOLOGY_AGES
+    assert roll
+
+    offset: int = TECHNOLOGY_AGES_OFFSET_TABLE[roll(2)]
+    index: int = age.value
+    if index + offset < TechAge.EARLY_PRIMITIVE.value:
+        return TechAge.EARLY_PRIMITIVE
+    if index + offset > TechAge.LATE_GALACTIC.value:
+        return TechAge.LATE_GALACTIC
+    return TECHNOLOGY_AGES[index + offset]
+
+
+def tech_age(
+    pop: int, avg_age: TechAge | None = None, roll: NomadDice = nomad_dice
+) -> TechAge:
+    assert not avg_age or avg_age in TECHNOLOGY_AGES
+    assert roll
+    if pop == 0:
+        return TechAge.NO_TECHNOLOGY
+    return tech_age_offset(avg_age, roll) if avg_age else tech_age_random(roll)
+
+
+def tech_age_str(age: TechAge | None) -> str:
+    return string.capwords(age.name.replace("_", " ")) if age else ""
+
+
+def tech_age_abbrev(age: TechAge | None) -> str:
+    return TECHNOLOGY_AGES_TO_ABBREVS.get(age, "") if age else ""
+
+
+def str_to_tech_age(agestr: str | None) -> TechAge | None:
+    return TECHNOLOGY_AGES_ABBREVS.get(agestr) if agestr else None
+
+
+def world_tag(index: int = 1, roll: NomadDice = nomad_dice) -> WorldTag:
+    assert roll
+    if index % 2 == 1:
+        return WORLD_TAG_TABLE_1[roll(1) - 1][roll(1) - 1]
+    return WORLD_TAG_TABLE_2[roll(1) - 1][roll(1) - 1]
+
+
+def world_tag_str(tag: WorldTag | None) -> str:
+    return WORLD_TAGS_TO_NAMES.get(tag, "") if tag else ""
+
+
+def world_tag_mask(tags: Iterable[WorldTag | None]) -> int:
+    """
+    Return a bitmask with one bit set for each tag, so checking a world's
+    tags against a category is a bitwise AND.
+    """
+    mask: int = 0
+    for tag in tags:
+        if tag is not None:
+            mask |= tag.bit
+    return mask
+
+
+def worlds_per_system(roll: NomadDice = nomad_dice) -> int:
+    assert roll
+    return WORLDS_PER_SYSTEM_TABLE[roll(2)]
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+import argparse
+import json
+import math
+import sys
+from array import array
+from dataclasses import dataclass
+from operator import add, mul
+
+from nomadgen import Planet, Sector, StarHex, hex_distance
+from nomadtables import TechAge, TradeClass
+
+###################### CONSTANTS ###############################
+
+GOODS: tuple[str, ...] = ("food", "raw materials", "manufactured goods")
+FOOD, RAW, MANUFACTURED = range(len(GOODS))
+
+# What a world of each trade class makes and needs each turn, per unit
+# of economic weight, for each of GOODS
+TRADE_PROFILES: dict[TradeClass, tuple[tuple[float, ...], tuple[float, ...]]] = {
+    TradeClass.AGRICULTURAL: ((2.0, 0.0, 0.0), (0.0, 0.0, 0.5)),
+    TradeClass.GARDEN: ((1.0, 0.0, 0.0), (0.0, 0.0, 0.5)),
+    TradeClass.INDUSTRIAL: ((0.0, 0.0, 8.0), (2.0, 4.0, 0.0)),
+    TradeClass.NON_AGRICULTURAL: ((0.0, 0.5, 0.0), (2.0, 0.0, 0.0)),
+    TradeClass.NON_INDUSTRIAL: ((0.0, 0.5, 0.0), (0.0, 0.0, 1.0)),
+    TradeClass.POOR: ((0.0, 0.0, 0.0), (0.5, 0.0, 0.25)),
+    TradeClass.RESOURCE: ((0.0, 2.0, 0.0), (0.0, 0.0, 0.5)),
+    TradeClass.RICH: ((0.0, 0.0, 0.0), (1.0, 0.0, 1.0)),
+}
+
+# Parsecs a ship can cover between systems
+DEFAULT_JUMP: int = 2
+DEFAULT_TURNS: int = 52
+
+# Each turn a system ships this share of its stock of a good to its
+# neighbours that are short of it, and loses this share to spoilage
+SHIP_RATE: float = 0.5
+SPOILAGE: float = 0.1
+
+####################### MATRICES ###############################
+
+
+@dataclass(slots=True)
+class CSRMatrix:
+    """
+    A square sparse matrix in compressed sparse row form: the entries of
+    row i are `data[indptr[i]:indptr[i + 1]]`, in the columns given by
+    the same slice of `indices`.
+    """
+
+    size: int
+    indptr: array
+    indices: array
+    data: array
+
+    def __post_init__(self) -> None:
+        assert len(self.indptr) == self.size + 1
+        assert len(self.indices) == len(self.data) == self.indptr[-1]
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    def rows(self) -> list[tuple[list[int], list[float]]]:
+        """Return the columns and entries of each row."""
+        return [
+            (self.indices[a:b].tolist(), self.data[a:b].tolist())
+            for a, b in zip(self.indptr, self.indptr[1:])
+        ]
+
+    def row_indices(self) -> array:
+        """Return the row of each entry, to go with `indices`."""
+        return array(
+            "q",
+            (
+                i
+                for i, (a, b) in enumerate(zip(self.indptr, self.indptr[1:]))
+                for _ in range(a, b)
+            ),
+        )
+
+    def matvec(self, v: list[float]) -> list[float]:
+        return _matvec(self.rows(), v)
+
+
+def _matvec(
+    rows: list[tuple[list[int], list[float]]], v: list[float]
+) -> list[float]:
+    # one C-level loop per row
+    get = v.__getitem__
+    return [sum(map(mul, data, map(get, columns))) for columns, data in rows]
+
+
+def jump_routes(stars: list[StarHex], jump: int = DEFAULT_JUMP) -> CSRMatrix:
+    """
+    Return the symmetric matrix of routes between `stars` no more than
+    `jump` parsecs apart, each weighted by the inverse of its length.
+    """
+    assert jump > 0
+    where: dict[tuple[int, int], int] = {(s.x, s.y): i for i, s in enumerate(stars)}
+    indptr = array("q", [0])
+    indices = array("q")
+    data = array("d")
+    for star in stars:
+        row: list[tuple[int, int]] = []
+        for x in range(star.x - jump, star.x + jump + 1):
+            for y in range(star.y - jump - 1, star.y + jump + 2):
+                j: int | None = where.get((x, y))
+                if j is None or (x, y) == (star.x, star.y):
+                    continue
+                d: int = hex_distance(star.x, star.y, x, y)
+                if d <= jump:
+                    row.append((j, d))
+        row.sort()
+        indices.extend(j for j, _ in row)
+        data.extend(1 / d for _, d in row)
+        indptr.append(len(indices))
+    return CSRMatrix(len(stars), indptr, indices, data)
+
+
+######################## ECONOMY ###############################
+
+
+def economic_weight(p: Planet) -> float:
+    """
+    How much a world makes and needs: orders of magnitude of population
+    past a thousand, scaled from half to one and a half by tech age.
+    """
+    if p.population < 1000:
+        return 0.0
+    tech: float = 0.5 + p.tech_age.value / TechAge.COSMIC.value
+    return (math.log10(p.population) - 2) * tech
+
+
+class TradeNetwork:
+    """
+    The star systems of a sector as nodes, with what each makes and
+    needs of each of GOODS per turn (summed over its worlds, which trade
+    freely among themselves), and the jump routes between them.
+    """
+
+    def __init__(self, sec: Sector, jump: int = DEFAULT_JUMP) -> None:
+        self.stars: list[StarHex] = [system.star for system in sec.systems]
+        self.supply: list[list[float]] = [[0.0] * len(self.stars) for _ in GOODS]
+        self.demand: list[list[float]] = [[0.0] * len(self.stars) for _ in GOODS]
+        for i, system in enumerate(sec.systems):
+            for p in system.planets:
+                weight: float = economic_weight(p)
+                makes, needs = TRADE_PROFILES[p.trade_class]
+                for g in range(len(GOODS)):
+                    self.supply[g][i] += makes[g] * weight
+                    self.demand[g][i] += needs[g] * weight
+        self.routes: CSRMatrix = jump_routes(self.stars, jump)
+
+
+@dataclass(slots=True)
+class TradeResult:
+    """
+    Totals over every turn, per good and then per system: what was made,
+    needed, eaten or used up, exported and imported; and what moved
+    along each route, in the order of `TradeNetwork.routes.data`.
+    """
+
+    turns: int
+    supplied: list[list[float]]
+    demanded: list[list[float]]
+    consumed: list[list[float]]
+    exported: list[list[float]]
+    imported: list[list[float]]
+    route_flows: list[list[float]]
+
+
+def simulate(
+    network: TradeNetwork,
+    turns: int = DEFAULT_TURNS,
+    ship_rate: float = SHIP_RATE,
+    spoilage: float = SPOILAGE,
+) -> TradeResult:
+    """
+    Run the economy of `network` for `turns` turns.  Each turn, each
+    system adds what it makes to its stocks and uses what it needs from
+    them; then it ships `ship_rate` of what is left along its routes,
+    split among its neighbours by their shortfall and the weight of the
+    route, to arrive the next turn.  Stocks left over spoil by
+    `spoilage`.  Each turn is a pair of sparse products per good:
+    routes @ shortfall for each sender's total pull, and routes @
+    (shipped / pull) for what each receiver gets.
+    """
+    assert turns >= 0 and 0 <= ship_rate <= 1 and 0 <= spoilage <= 1
+    n: int = len(network.stars)
+    routes: CSRMatrix = network.routes
+    rows = routes.rows()
+    senders: array = routes.row_indices()
+    zeros: list[float] = [0.0] * n
+
+    def totals() -> list[list[float]]:
+        return [list(zeros) for _ in GOODS]
+
+    result = TradeResult(
+        turns,
+        [[s * turns for s in supply] for supply in network.supply],
+        [[d * turns for d in demand] for demand in network.demand],
+        totals(),
+        totals(),
+        totals(),
+        [[0.0] * routes.nnz for _ in GOODS],
+    )
+    for g in range(len(GOODS)):
+        supply, demand = network.supply[g], network.demand[g]
+        if not any(supply) or not any(demand):
+            continue
+        stock: list[float] = list(zeros)
+        consumed, exported = result.consumed[g], result.exported[g]
+        imported, flows = result.imported[g], result.route_flows[g]
+        for _ in range(turns):
+            stock = [x + s for x, s in zip(stock, supply)]
+            used: list[float] = [min(x, d) for x, d in zip(stock, demand)]
+            short: list[float] = [d - u for d, u in zip(demand, used)]
+            stock = [x - u for x, u in zip(stock, used)]
+            pull: list[float] = _matvec(rows, short)
+            share: list[float] = [
+                ship_rate * x / p if p > 0 else 0.0 for x, p in zip(stock, pull)
+            ]
+            arrived: list[float] = [
+                s * r for s, r in zip(short, _matvec(rows, share))
+            ]
+            shipped: list[float] = [
+                ship_rate * x if p > 0 else 0.0 for x, p in zip(stock, pull)
+            ]
+            stock = [
+                (x - out) * (1 - spoilage) + a
+                for x, out, a in zip(stock, shipped, arrived)
+            ]
+            consumed[:] = map(add, consumed, used)
+            exported[:] = map(add, exported, shipped)
+            imported[:] = map(add, imported, arrived)
+            # route i -> j carried share[i] * weight * short[j]
+            carried = map(
+                mul,
+                map(mul, map(share.__getitem__, senders), routes.data),
+                map(short.__getitem__, routes.indices),
+            )
+            flows[:] = map(add, flows, carried)
+    return result
+
+
+def busiest_routes(
+    network: TradeNetwork, result: TradeResult, count: int
+) -> list[tuple[float, int, StarHex, StarHex]]:
+    """
+    Return the `count` biggest flows of one good along one route, as
+    (amount, good, from, to).
+    """
+    routes: CSRMatrix = network.routes
+    senders: array = routes.row_indices()
+    flows: list[tuple[float, int, int]] = [
+        (amount, g, k)
+        for g, route_flows in enumerate(result.route_flows)
+        for k, amount in enumerate(route_flows)
+        if amount > 0
+    ]
+    flows.sort(reverse=True)
+    return [
+        (
+            amount,
+            g,
+            network.stars[senders[k]],
+            network.stars[routes.indices[k]],
+        )
+        for amount, g, k in flows[:count]
+    ]
+
+
+def summarize(network: TradeNetwork, result: TradeResult) -> dict:
+    """Return the totals of `result` per good and per system, for JSON."""
+    goods: dict[str, dict[str, float]] = {}
+    for g, good in enumerate(GOODS):
+        demanded: float = sum(result.demanded[g])
+        goods[good] = {
+            "supplied": sum(result.supplied[g]),
+            "demanded": demanded,
+            "consumed": sum(result.consumed[g]),
+            # goods shipped on again count each time they move
+            "moved": sum(result.exported[g]),
+            "satisfied": sum(result.consumed[g]) / demanded if demanded else 1.0,
+        }
+    systems: list[dict] = [
+        {
+            "name": star.name,
+            "hex": star.location,
+            **{
+                good: {
+                    "supplied": result.supplied[g][i],
+                    "demanded": result.demanded[g][i],
+                    "consumed": result.consumed[g][i],
+                    "exported": result.exported[g][i],
+                    "imported": result.imported[g][i],
+                }
+                for g, good in enumerate(GOODS)
+            },
+        }
+        for i, star in enumerate(network.stars)
+    ]
+    return {"turns": result.turns, "goods": goods, "systems": systems}
+
+
+def write_report(
+    outfile, network: TradeNetwork, result: TradeResult, top: int
+) -> None:
+    summary: dict = summarize(network, result)
+    print(
+        f"{len(network.stars)} systems, {network.routes.nnz // 2} routes,"
+        f" {result.turns} turns",
+        file=outfile,
+    )
+    print(file=outfile)
+    print(
+        f"{'Good':<20}{'Supplied':>12}{'Demanded':>12}{'Moved':>12}{'Met':>8}",
+        file=outfile,
+    )
+    for good, totals in summary["goods"].items():
+        print(
+            f"{good:<20}{totals['supplied']:>12.0f}{totals['demanded']:>12.0f}"
+            f"{totals['moved']:>12.0f}{totals['satisfied']:>8.0%}",
+            file=outfile,
+        )
+    print(file=outfile)
+    for amount, g, source, dest in busiest_routes(network, result, top):
+        print(
+            f"{amount:>10.1f} {GOODS[g]:<20} {source.name} ({source.location})"
+            f" -> {dest.name} ({dest.location})",
+            file=outfile,
+        )
+
+
+######################### MAIN #########################################
+
+
+def main() -> None:
+    # Parse arguments
+    parser = argparse.ArgumentParser(
+        description="Simulate trade between the worlds of `nomadsec.py` output"
+    )
+    parser.add_argument(
+        "inputfile",
+        help="file containing `nomadsec.py` data in any text format, compressed"
+        " or not",
+    )
+    parser.add_argument(
+        "-J",
+        "--jump",
+        help=f"longest route between systems, in parsecs (default {DEFAULT_JUMP})",
+        default=DEFAULT_JUMP,
+        type=int,
+    )
+    parser.add_argument(
+        "-T",
+        "--turns",
+        help=f"number of turns (default {DEFAULT_TURNS})",
+        default=DEFAULT_TURNS,
+        type=int,
+    )
+    parser.add_argument(
+        "--top",
+        help="number of busiest routes to list (default 20)",
+        default=20,
+        type=int,
+    )
+    parser.add_argument(
+        "-j",
+        "--json",
+        help="write the totals for each good and system as JSON",
+        action="store_true",
+    )
+    args = parser.parse_args()
+
+    if args.jump <= 0:
+        parser.error("--jump must be at least 1")
+    if args.turns < 0:
+        parser.error("--turns must be at least 0")
+    if args.top < 0:
+        parser.error("--top must be at least 0")
+
+    from nomadcompress import open_compressed
+    from nomadread import read_sector
+
+    try:
+        with open_compressed(args.inputfile, encoding="UTF-8") as f:
+            sec: Sector = read_sector(f)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    network = TradeNetwork(sec, args.jump)
+    result: TradeResult = simulate(network, args.turns)
+    if args.json:
+        json.dump(summarize(network, result), sys.stdout, indent=4)
+        print()
+    else:
+        write_report(sys.stdout, network, result, args.top)
+
+
+if __name__ == "__main__":
+    main()
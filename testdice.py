@@ -5,119 +5,385 @@
 # dependencies = []
 # ///
 
+import argparse
+import math
+import sys
 import time
+from collections import Counter
+from collections.abc import Callable, Hashable
+from fractions import Fraction
 
-from nomadsec import nomad_dice
-
-NUM_TRIALS = 1_000_000
-
-CHISQ_TOLERANCE = 0.05  # maybe? any stats experts here?
-
-EXPECT_1D: dict[int, float] = {
-    1: 1 / 6,
-    2: 1 / 6,
-    3: 1 / 6,
-    4: 1 / 6,
-    5: 1 / 6,
-    6: 1 / 6,
-}
-
-EXPECT_2D: dict[int, float] = {
-    2: 1 / 36,
-    3: 2 / 36,
-    4: 3 / 36,
-    5: 4 / 36,
-    6: 5 / 36,
-    7: 6 / 36,
-    8: 5 / 36,
-    9: 4 / 36,
-    10: 3 / 36,
-    11: 2 / 36,
-    12: 1 / 36,
-}
-
-EXPECT_2D_P_1D: dict[int, float] = {
-    2: 0.00462962962963,
-    3: 0.01388888888888,
-    4: 0.0324074074074,
-    5: 0.05555555555556,
-    6: 0.087962962963,
-    7: 0.125,
-    8: 0.157497497497,
-    9: 1 / 6,
-    10: 0.157407407407,
-    11: 0.125,
-    12: 0.0740740740741,
-}
-
-EXPECT_2D_M_1D: dict[int, float] = {
-    12: 0.00462962962963,
-    11: 0.01388888888888,
-    10: 0.0324074074074,
-    9: 0.05555555555556,
-    8: 0.087962962963,
-    7: 0.125,
-    6: 0.157497497497,
-    5: 1 / 6,
-    4: 0.157407407407,
-    3: 0.125,
-    2: 0.0740740740741,
-}
-
-EXPECT_2D_P_2D: dict[int, float] = {
-    2: 0.000771604938272,
-    3: 0.00308641975309,
-    4: 0.0115740740741,
-    5: 0.0246912580247,
-    6: 0.0501543209877,
-    7: 1 / 12,
-    8: 0.1319444444444,
-    9: 0.172839406173,
-    10: 0.2012888888889,
-    11: 0.188271604938,
-    12: 0.1219444444444,
-}
-
-
-def init_histogram(start: int = 2, end: int = 2) -> dict[int, float]:
-    return {x: 0.0 for x in range(start, end + 1)}
-
-
-def test_dice(title: str, expect: dict[int, float], nkeep: int, nbonus: int) -> None:
-    start_time: float = time.time()
+from nomaddice import (
+    BatchDice,
+    dice_distribution,
+    nomad_dice,
+    roll_many,
+    skip_sample,
+)
+
+NUM_TRIALS: int = 1_000_000
+
+# Derived tables are sampled through the real lookup functions,
+# which is slower than sampling the dice alone.
+NUM_TABLE_TRIALS: int = 200_000
+
+# Reject a distribution if a deviation this large would happen by chance
+# less often than this.
+SIGNIFICANCE: float = 0.001
+
+# Bins expected to hold fewer than this many results are merged so the
+# chi-square approximation holds.
+MINIMUM_EXPECTED: float = 5.0
+
+
+####################### STATISTICS ##############################
+
+
+def _gamma_series(a: float, x: float) -> float:
+    # regularized lower incomplete gamma P(a, x) by its power series
+    term: float = 1.0 / a
+    total: float = term
+    n: float = a
+    while abs(term) > abs(total) * 1e-15:
+        n += 1
+        term *= x / n
+        total += term
+    return total * math.exp(-x + a * math.log(x) - math.lgamma(a))
+
+
+def _gamma_fraction(a: float, x: float) -> float:
+    # regularized upper incomplete gamma Q(a, x) by Lentz's continued fraction
+    tiny: float = 1e-300
+    b: float = x + 1 - a
+    c: float = 1 / tiny
+    d: float = 1 / b
+    h: float = d
+    i: int = 1
+    while True:
+        an: float = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta: float = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+        i += 1
+    return h * math.exp(-x + a * math.log(x) - math.lgamma(a))
+
+
+def chi2_sf(x: float, df: int) -> float:
+    """
+    Return the probability that a chi-square variable with `df` degrees
+    of freedom is at least `x` (the p-value of a chi-square statistic).
+    """
+    if x <= 0:
+        return 1.0
+    a: float = df / 2
+    half: float = x / 2
+    if half < a + 1:
+        return 1.0 - _gamma_series(a, half)
+    return _gamma_fraction(a, half)
+
+
+def chi_square(
+    observed: Counter, expected: dict[Hashable, Fraction], trials: int
+) -> tuple[float, int, list[Hashable]]:
+    """
+    Return the chi-square statistic and degrees of freedom for `observed`
+    counts against `expected` probabilities, plus any results that
+    should be impossible.
+    """
+    impossible: list[Hashable] = [k for k in observed if k not in expected]
+    bins: list[tuple[float, int]] = []
+    pooled_e: float = 0.0
+    pooled_o: int = 0
+    for k, p in expected.items():
+        e: float = float(p) * trials
+        if e < MINIMUM_EXPECTED:
+            pooled_e += e
+            pooled_o += observed[k]
+        else:
+            bins.append((e, observed[k]))
+    if pooled_e > 0:
+        bins.append((pooled_e, pooled_o))
+    chisq: float = sum((o - e) ** 2 / e for e, o in bins)
+    return chisq, max(len(bins) - 1, 1), impossible
+
+
+####################### EXPECTATIONS ##############################
+
+# The odds of each dice variant, worked out without `nomaddice` so a
+# wrong outcome table cannot agree with itself: ways of rolling each
+# total from 2 up, out of 216 (three dice) or 1296 (four).  Keeping the
+# highest two was counted by hand; 12, for one, needs two or more sixes,
+# 3 * 5 + 1 = 16 ways of three dice and 6 * 25 + 4 * 5 + 1 = 171 of four.
+HIGHEST_TWO_OF_THREE: list[int] = [1, 3, 7, 12, 19, 27, 34, 36, 34, 27, 16]
+HIGHEST_TWO_OF_FOUR: list[int] = [1, 4, 15, 32, 65, 108, 171, 224, 261, 244, 171]
+
+
+def expected_dice(nkeep: int, nbonus: int) -> dict[int, Fraction]:
+    """Return the exact odds of `nomad_dice(nkeep, nbonus)` for d6."""
+    if (nkeep, nbonus) == (1, 0):
+        return {n: Fraction(1, 6) for n in range(1, 7)}
+    if (nkeep, nbonus) == (2, 0):
+        return {n: Fraction(6 - abs(7 - n), 36) for n in range(2, 13)}
+    if (nkeep, nbonus) == (2, +1):
+        return {n: Fraction(c, 216) for n, c in enumerate(HIGHEST_TWO_OF_THREE, 2)}
+    if (nkeep, nbonus) == (2, -1):
+        # turning every die over (f -> 7 - f) swaps the lowest two for the
+        # highest two, and a total n for 14 - n
+        return {
+            14 - n: Fraction(c, 216) for n, c in enumerate(HIGHEST_TWO_OF_THREE, 2)
+        }
+    if (nkeep, nbonus) == (2, +2):
+        return {n: Fraction(c, 1296) for n, c in enumerate(HIGHEST_TWO_OF_FOUR, 2)}
+    raise ValueError(f"no expectation for {nkeep}D{nbonus:+d}D")
+
+
+
+def map_distribution(
+    dist: dict[int, Fraction], fn: Callable[[int], Hashable]
+) -> dict[Hashable, Fraction]:
+    result: dict[Hashable, Fraction] = {}
+    for k, p in dist.items():
+        key = fn(k)
+        result[key] = result.get(key, Fraction(0)) + p
+    return result
+
+
+######################### TESTS #########################################
+
+
+def check(
+    title: str,
+    expect: dict[Hashable, Fraction],
+    samples: list,
+    start_time: float,
+    verbose: bool,
+) -> bool:
+    trials: int = len(samples)
+    histogram: Counter = Counter(samples)
+    chisq, df, impossible = chi_square(histogram, expect, trials)
+    pvalue: float = chi2_sf(chisq, df)
 
     print(f"=== {title} ===")
-    histogram: dict[int, float] = init_histogram(nkeep, nkeep * 6)
-    for _ in range(NUM_TRIALS):
-        result = nomad_dice(nkeep, nbonus)
-        histogram[result] += 1
-
-    print("Roll\tActual Prob.\tExpected\tChi**2")
-    chisqtotal: float = 0
-    for x in range(nkeep, nkeep * 6 + 1):
-        actual = histogram[x] / NUM_TRIALS
-        chisq = ((actual - expect[x]) / expect[x]) ** 2
-        chisqtotal += chisq
-        print(f"{x:2d}\t{actual:.8f}\t{expect[x]:.8f}\t{chisq:.10f}")
-    print(f"{'':2s}\t{'':10s}\t{'TOTAL':10s}\t{chisqtotal:.10f}")
-
-    end_time:float = time.time()
-
-    elapsed_time: float = end_time - start_time
-
-    if chisqtotal < CHISQ_TOLERANCE:
-        print(f"OK ({elapsed_time:.3f} s)")
-    else:
-        print(f"FAIL ({elapsed_time:.3f} s)")
+    if verbose:
+        print("Result\tActual Prob.\tExpected")
+        for k, p in expect.items():
+            print(f"{str(k):20s}\t{histogram[k] / trials:.8f}\t{float(p):.8f}")
+    for k in impossible:
+        print(f"IMPOSSIBLE: {k} ({histogram[k]} times)")
+    print(f"chi**2={chisq:.4f} df={df} p={pvalue:.4f}")
+
+    elapsed_time: float = time.perf_counter() - start_time
+    ok: bool = pvalue >= SIGNIFICANCE and not impossible
+    print(f"{'OK' if ok else 'FAIL'} ({elapsed_time:.3f} s)")
     print("================")
+    return ok
+
+
+def test_dice_distribution(title: str, nkeep: int, nbonus: int) -> bool:
+    # exact, so no sampling: every probability must match
+    start_time: float = time.perf_counter()
+    expect: dict[int, Fraction] = expected_dice(nkeep, nbonus)
+    actual: dict = dice_distribution(nkeep, nbonus)
+    print(f"=== {title} ===")
+    for k in sorted(expect.keys() | actual.keys()):
+        if expect.get(k) != actual.get(k):
+            print(f"WRONG: {k} has odds {actual.get(k)}, expected {expect.get(k)}")
+    elapsed_time: float = time.perf_counter() - start_time
+    ok: bool = actual == expect
+    print(f"{'OK' if ok else 'FAIL'} ({elapsed_time:.3f} s)")
+    print("================")
+    return ok
+
+
+def test_dice(
+    title: str, nkeep: int, nbonus: int, trials: int, verbose: bool
+) -> bool:
+    start_time: float = time.perf_counter()
+    samples: list[int] = roll_many(trials, nkeep, nbonus)
+    return check(
+        title, dice_distribution(nkeep, nbonus), samples, start_time, verbose
+    )
+
+
+def test_nomad_dice(
+    title: str, nkeep: int, nbonus: int, trials: int, verbose: bool
+) -> bool:
+    # the one-roll-at-a-time path everything else uses by default
+    start_time: float = time.perf_counter()
+    samples: list[int] = [nomad_dice(nkeep, nbonus) for _ in range(trials)]
+    return check(
+        title, dice_distribution(nkeep, nbonus), samples, start_time, verbose
+    )
+
+
+def test_trade_class(trials: int, verbose: bool) -> bool:
+    from nomadtables import (
+        Settlement,
+        TRADE_CLASS_SETTLED,
+        TRADE_CLASS_UNEXPLORED,
+        trade_class,
+    )
+
+    # (nkeep, nadv, table) for each level of settlement, per the SRD
+    rolls: dict[Settlement | None, tuple[int, int, dict]] = {
+        None: (2, 0, TRADE_CLASS_SETTLED),
+        Settlement.CORE: (2, +2, TRADE_CLASS_SETTLED),
+        Settlement.SETTLED: (2, 0, TRADE_CLASS_SETTLED),
+        Settlement.CONFLICT: (2, +1, TRADE_CLASS_SETTLED),
+        Settlement.FRONTIER: (2, -1, TRADE_CLASS_SETTLED),
+        Settlement.UNEXPLORED: (2, 0, TRADE_CLASS_UNEXPLORED),
+    }
+    ok: bool = True
+    for settle, (nkeep, nadv, table) in rolls.items():
+        start_time: float = time.perf_counter()
+        roll = BatchDice()
+        samples = [trade_class(settle, roll) for _ in range(trials)]
+        expect = map_distribution(dice_distribution(nkeep, nadv), table.__getitem__)
+        name: str = settle.name if settle else "None"
+        ok &= check(f"trade_class({name})", expect, samples, start_time, verbose)
+    return ok
+
+
+def test_tech_age_offset(trials: int, verbose: bool) -> bool:
+    from nomadtables import (
+        TECHNOLOGY_AGES,
+        TECHNOLOGY_AGES_OFFSET_TABLE,
+        TechAge,
+        tech_age_offset,
+    )
+
+    lowest: int = TechAge.EARLY_PRIMITIVE.value
+    highest: int = TechAge.LATE_GALACTIC.value
+    ok: bool = True
+    for age in (
+        TechAge.EARLY_PRIMITIVE,
+        TechAge.LATE_PRIMITIVE,
+        TechAge.EARLY_SPACE,
+        TechAge.EARLY_GALACTIC,
+        TechAge.LATE_GALACTIC,
+    ):
+        start_time: float = time.perf_counter()
+        roll = BatchDice()
+        samples = [tech_age_offset(age, roll) for _ in range(trials)]
+        expect = map_distribution(
+            dice_distribution(2),
+            lambda r: TECHNOLOGY_AGES[
+                min(max(age.value + TECHNOLOGY_AGES_OFFSET_TABLE[r], lowest), highest)
+            ],
+        )
+        ok &= check(
+            f"tech_age_offset({age.name})", expect, samples, start_time, verbose
+        )
+    return ok
+
+
+def test_world_tag(trials: int, verbose: bool) -> bool:
+    from nomadtables import WORLD_TAG_TABLE_1, WORLD_TAG_TABLE_2, world_tag
+
+    ok: bool = True
+    for index, table in ((1, WORLD_TAG_TABLE_1), (2, WORLD_TAG_TABLE_2)):
+        start_time: float = time.perf_counter()
+        roll = BatchDice()
+        samples = [world_tag(index, roll) for _ in range(trials)]
+        expect: dict[Hashable, Fraction] = {}
+        for row in table:
+            for tag in row:
+                expect[tag] = expect.get(tag, Fraction(0)) + Fraction(1, 36)
+        ok &= check(f"world_tag({index})", expect, samples, start_time, verbose)
+    return ok
+
+
+def test_worlds_per_system(trials: int, verbose: bool) -> bool:
+    from nomadtables import WORLDS_PER_SYSTEM_TABLE, worlds_per_system
+
+    start_time: float = time.perf_counter()
+    roll = BatchDice()
+    samples = [worlds_per_system(roll) for _ in range(trials)]
+    expect = map_distribution(
+        dice_distribution(2), WORLDS_PER_SYSTEM_TABLE.__getitem__
+    )
+    return check("worlds_per_system", expect, samples, start_time, verbose)
+
+
+def test_skip_sample(trials: int, verbose: bool) -> bool:
+    # which of a few hexes get a star must match independent rolls per hex
+    hexes: int = 4
+    ok: bool = True
+    for density in range(1, 6):
+        start_time: float = time.perf_counter()
+        chance: Fraction = Fraction(density, 6)
+        samples: list[int] = [
+            sum(1 << i for i in skip_sample(hexes, density / 6))
+            for _ in range(trials)
+        ]
+        expect: dict[Hashable, Fraction] = {}
+        for mask in range(1 << hexes):
+            stars: int = bin(mask).count("1")
+            expect[mask] = chance**stars * (1 - chance) ** (hexes - stars)
+        ok &= check(
+            f"skip_sample({hexes}, {density}/6)", expect, samples, start_time, verbose
+        )
+    return ok
 
 
 def main() -> None:
-    test_dice("1D", EXPECT_1D, 1, 0)
-    test_dice("2D", EXPECT_2D, 2, 0)
-    test_dice("2D+1D", EXPECT_2D_P_1D, 2, +1)
-    test_dice("2D-1D", EXPECT_2D_M_1D, 2, -1)
-    test_dice("2D+2D", EXPECT_2D_P_2D, 2, +2)
+    parser = argparse.ArgumentParser(
+        description="Check the dice and tables against their exact distributions"
+    )
+    parser.add_argument(
+        "-n",
+        "--trials",
+        help=f"rolls per dice test (default {NUM_TRIALS})",
+        default=NUM_TRIALS,
+        type=int,
+    )
+    parser.add_argument(
+        "-t",
+        "--table-trials",
+        help=f"rolls per table test (default {NUM_TABLE_TRIALS})",
+        default=NUM_TABLE_TRIALS,
+        type=int,
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        help="print each histogram",
+        action="store_true",
+    )
+    args = parser.parse_args()
+
+    start_time: float = time.perf_counter()
+    ok: bool = True
+    for title, nkeep, nbonus in (
+        ("1D", 1, 0),
+        ("2D", 2, 0),
+        ("2D+1D", 2, +1),
+        ("2D-1D", 2, -1),
+        ("2D+2D", 2, +2),
+    ):
+        ok &= test_dice_distribution(
+            f"dice_distribution {title}", nkeep, nbonus
+        )
+        ok &= test_dice(title, nkeep, nbonus, args.trials, args.verbose)
+        ok &= test_nomad_dice(
+            f"nomad_dice {title}", nkeep, nbonus, args.table_trials, args.verbose
+        )
+    ok &= test_trade_class(args.table_trials, args.verbose)
+    ok &= test_tech_age_offset(args.table_trials, args.verbose)
+    ok &= test_world_tag(args.table_trials, args.verbose)
+    ok &= test_worlds_per_system(args.table_trials, args.verbose)
+    ok &= test_skip_sample(args.table_trials, args.verbose)
+
+    print(f"{'ALL OK' if ok else 'FAILED'} ({time.perf_counter() - start_time:.3f} s)")
+    if not ok:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
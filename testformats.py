@@ -0,0 +1,628 @@
+#!/usr/bin/env python3
+
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from nomadgen import Planet, SectorBounds, SerialNameSet, sector, star_systems
+from nomadout import (
+    write_as_json,
+    write_as_json_lines,
+    write_as_short_text,
+    write_as_text,
+    write_as_xsv,
+)
+
+SEED: int = 1
+
+# A name list to learn from, plus a name that is not ASCII
+NAME_LIST: str = os.path.join(os.path.dirname(__file__), "names", "kobol-names.txt")
+
+# The map written in every format, and the regions extracted from it:
+# one inside, one across its edge and one with no planets
+MAP_BOUNDS: SectorBounds = SectorBounds(height=30, width=24, x=5, y=3)
+REGIONS: tuple[SectorBounds, ...] = (
+    SectorBounds(height=7, width=5, x=9, y=10),
+    SectorBounds(height=40, width=4, x=1, y=1),
+    SectorBounds(height=3, width=3, x=100, y=100),
+)
+
+# Each format's writer, as `nomadsec.py` calls it
+WRITERS: dict[str, Callable] = {
+    "json": lambda f, b, sec: write_as_json(f, b, sec),
+    "jsonl": lambda f, b, sec: write_as_json_lines(f, sec),
+    "csv": lambda f, b, sec: write_as_xsv(f, sec, ","),
+    "tsv": lambda f, b, sec: write_as_xsv(f, sec, "\t"),
+    "text": lambda f, b, sec: write_as_text(f, sec),
+    "short text": lambda f, b, sec: write_as_short_text(f, sec),
+}
+
+
+######################### TESTS #########################################
+
+
+def check(title: str, failures: list[str], start_time: float) -> bool:
+    print(f"=== {title} ===")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    elapsed_time: float = time.perf_counter() - start_time
+    ok: bool = not failures
+    print(f"{'OK' if ok else 'FAIL'} ({elapsed_time:.3f} s)")
+    print("================")
+    return ok
+
+
+def _write_sample(path: str, fmt: str, seed: int) -> None:
+    random.seed(seed)
+    planets, _ = sector(SerialNameSet(), bounds=MAP_BOUNDS)
+    with open(path, "w", encoding="UTF-8") as f:
+        WRITERS[fmt](f, MAP_BOUNDS, planets)
+
+
+def _compare_extracts(path: str, failures: list[str]) -> None:
+    # everything `extract()` finds must be exactly what reading the
+    # whole file and keeping the planets in each region gives
+    from nomadextract import extract, open_index
+    from nomadread import read_sector
+
+    with open(path, encoding="UTF-8") as f:
+        planets: list[Planet] = read_sector(f).planets
+    for bounds in REGIONS:
+        expect: list[Planet] = [
+            p
+            for p in planets
+            if p.star.x in bounds.x_range() and p.star.y in bounds.y_range()
+        ]
+        with open_index(path) as index:
+            found: list[Planet] = extract(path, bounds, index).planets
+        if found != expect:
+            failures.append(
+                f"{bounds}: extracted {len(found)} planets, expected {len(expect)}"
+            )
+
+
+def test_extract(fmt: str) -> bool:
+    from nomadextract import INDEX_SUFFIX, HexIndex
+
+    start_time: float = time.perf_counter()
+    failures: list[str] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path: str = os.path.join(tmp, "sector")
+        _write_sample(path, fmt, SEED)
+        _compare_extracts(path, failures)
+
+        # a different map in the same file must rebuild the stale index;
+        # its modification time is moved on in case the clock is coarse
+        _write_sample(path, fmt, SEED + 1)
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        _compare_extracts(path, failures)
+        with HexIndex(path + INDEX_SUFFIX) as index:
+            if not index.matches(path):
+                failures.append("index not rebuilt after the file changed")
+    return check(f"extract({fmt})", failures, start_time)
+
+
+def _expect_error(
+    failures: list[str], what: str, error: type[Exception], f: Callable
+) -> None:
+    try:
+        f()
+    except error:
+        return
+    failures.append(f"{what}: no {error.__name__}")
+
+
+# A grid with every layer, unset cells and cells several hexes across
+MASK_GRID: str = """
+origin 3 -2
+cell 4 2
+density
+0 1 2 3 4 5 6
+6 . 4 . 2 . 0
+settlement
+core settled . conflict frontier unexplored core
+. . . . . . .
+tech
+ep lp em lm ea la es
+ls ei li eg lg . ep
+"""
+
+
+def test_mask() -> bool:
+    from nomadmask import (
+        DENSITY,
+        HexMask,
+        MaskError,
+        compile_grid,
+        grid_lines,
+        open_mask,
+    )
+
+    start_time: float = time.perf_counter()
+    failures: list[str] = []
+    data: bytes = compile_grid(MASK_GRID.splitlines())
+    with tempfile.TemporaryDirectory() as tmp:
+        path: str = os.path.join(tmp, "sector.hexmask")
+        with open(path, "wb") as f:
+            f.write(data)
+        with open_mask(path) as mask:
+            if compile_grid(grid_lines(mask)) != data:
+                failures.append("grid written back compiles differently")
+            cells: list[int] = [
+                mask.cell(DENSITY, column, 1) for column in range(mask.columns)
+            ]
+            if cells != [6, 0xFF, 4, 0xFF, 2, 0xFF, 0]:
+                failures.append(f"second row of densities read as {cells}")
+            bounds = SectorBounds(height=4, width=30, x=1, y=-2)
+            columns: list[bytes] = mask.densities(bounds, 3)
+            if columns[0] != b"\3" * 4 or columns[2] != b"\0\0\6\6":
+                failures.append("densities() does not follow the cells")
+
+        # a file that starts with the magic number must be a whole mask
+        with open(path, "wb") as f:
+            f.write(data[:-1])
+        _expect_error(failures, "truncated file", MaskError, lambda: open_mask(path))
+    _expect_error(
+        failures, "bad magic", MaskError, lambda: HexMask(b"NOMADMK0" + data[8:])
+    )
+    _expect_error(failures, "short header", MaskError, lambda: HexMask(data[:10]))
+    return check("hex mask", failures, start_time)
+
+
+def _noise_levels(mask: Any, x: int, y: int) -> tuple:
+    from nomadtables import Settlement
+
+    return (
+        mask.settlement_at(x, y, Settlement.SETTLED),
+        mask.tech_age_at(x, y, None),
+    )
+
+
+def test_noise() -> bool:
+    from nomadmask import NOISE_LIMITS, NoiseMask, noise_field
+
+    start_time: float = time.perf_counter()
+    failures: list[str] = []
+    for x, y in ((1, 1), (-37, -21), (-5, 30)):
+        union = SectorBounds(height=45, width=50, x=x, y=y)
+        # side by side, and one above the other
+        left = SectorBounds(height=45, width=19, x=x, y=y)
+        right = SectorBounds(height=45, width=31, x=x + 19, y=y)
+        top = SectorBounds(height=17, width=50, x=x, y=y)
+        bottom = SectorBounds(height=28, width=50, x=x, y=y + 17)
+        for scale in (16, 5, 1):
+            for layer in NOISE_LIMITS:
+                what: str = f"origin ({x}, {y}) scale {scale} layer {layer}"
+                whole: list[bytes] = noise_field(union, SEED, layer, scale)
+                west: list[bytes] = noise_field(left, SEED, layer, scale)
+                east: list[bytes] = noise_field(right, SEED, layer, scale)
+                if west + east != whole:
+                    failures.append(f"{what}: fields side by side differ")
+                above: list[bytes] = noise_field(top, SEED, layer, scale)
+                below: list[bytes] = noise_field(bottom, SEED, layer, scale)
+                if [a + b for a, b in zip(above, below)] != whole:
+                    failures.append(f"{what}: fields one above the other differ")
+
+        # and so do masks made for each part
+        whole_mask = NoiseMask(union, SEED)
+        parts: tuple[NoiseMask, ...] = (NoiseMask(left, SEED), NoiseMask(right, SEED))
+        for hx in union.x_range():
+            part: NoiseMask = parts[hx >= right.x]
+            for hy in union.y_range():
+                if _noise_levels(part, hx, hy) != _noise_levels(whole_mask, hx, hy):
+                    failures.append(f"masks differ at ({hx}, {hy})")
+    return check("noise", failures, start_time)
+
+
+def test_name_model() -> bool:
+    from nomadnames import (
+        MODEL_SUFFIX,
+        MarkovNameSet,
+        NameModel,
+        compile_model,
+        open_model,
+        read_corpus,
+    )
+
+    start_time: float = time.perf_counter()
+    failures: list[str] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus: str = os.path.join(tmp, "names.txt")
+        with open(NAME_LIST, encoding="UTF-8") as f:
+            names: str = f.read()
+        with open(corpus, "w", encoding="UTF-8") as f:
+            f.write(names.rstrip("\n") + "\nÉlis\n")
+        model: NameModel = open_model(corpus)
+        if not os.path.exists(corpus + MODEL_SUFFIX):
+            failures.append("open_model() did not save the compiled model")
+        loaded: NameModel = open_model(corpus + MODEL_SUFFIX)
+        fields = ("order", "alphabet", "names", "starts", "symbols", "next_states")
+        for name in fields + ("source_size", "source_mtime_ns"):
+            if getattr(loaded, name) != getattr(model, name):
+                failures.append(f"{name} differs after loading")
+        made: list[list[str]] = [
+            MarkovNameSet(m, random.Random(SEED)).make_names(20)
+            for m in (model, loaded)
+        ]
+        if made[0] != made[1]:
+            failures.append("the loaded model makes different names")
+
+        # a changed corpus must be compiled again
+        with open(corpus, "a", encoding="UTF-8") as f:
+            f.write("Delphi\n")
+        if "Delphi" not in open_model(corpus).names:
+            failures.append("model not rebuilt after the corpus changed")
+        if NameModel.load(corpus + MODEL_SUFFIX).names != read_corpus(corpus):
+            failures.append("rebuilt model not saved")
+
+    data: bytes = compile_model(["Athens", "Sparta"]).to_bytes()
+    load = NameModel.from_bytes
+    _expect_error(failures, "bad magic", ValueError, lambda: load(b"X" + data[1:]))
+    _expect_error(failures, "truncated file", ValueError, lambda: load(data[:-1]))
+    _expect_error(failures, "short header", ValueError, lambda: load(data[:20]))
+    few = MarkovNameSet(compile_model(["Ab", "Ba"]), random.Random(SEED))
+    _expect_error(failures, "out of names", ValueError, lambda: few.make_names(5))
+    return check("name model", failures, start_time)
+
+
+def _levenshtein(a: str, b: str) -> int:
+    # the textbook table, to check the banded `edit_distance()` against
+    previous: list[int] = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current: list[int] = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            )
+        previous = current
+    return previous[-1]
+
+
+def test_name_index() -> bool:
+    from nomadnames import DistinctNameSet, NameIndex, edit_distance
+
+    # short names from few letters, so many are within a few edits
+    rng = random.Random(SEED)
+
+    def random_name() -> str:
+        return "".join(rng.choice("abcA") for _ in range(rng.randrange(1, 9)))
+
+    start_time: float = time.perf_counter()
+    failures: list[str] = []
+    for k in range(4):
+        index = NameIndex(k)
+        names: list[str] = [random_name() for _ in range(200)]
+        for name in names:
+            index.add(name)
+        keys: list[str] = [name.lower() for name in names]
+        for _ in range(200):
+            query: str = random_name()
+            key: str = query.lower()
+            near: str | None = index.near(query)
+            exact: list[int] = [_levenshtein(key, other) for other in keys]
+            for other, d in zip(keys, exact):
+                if edit_distance(key, other, k) != min(d, k + 1):
+                    failures.append(f"k={k}: edit_distance({key!r}, {other!r})")
+            if near is None:
+                if min(exact) <= k:
+                    failures.append(f"k={k}: missed a name near {query!r}")
+            elif _levenshtein(key, near) > k:
+                failures.append(f"k={k}: {near!r} is not near {query!r}")
+
+    # every "Star n" is within 10 edits of "Star 1"
+    distinct = DistinctNameSet(SerialNameSet(), 10)
+    distinct.make_name()
+    _expect_error(failures, "all too close", ValueError, distinct.make_name)
+    return check("name index", failures, start_time)
+
+
+def test_exclude_store() -> bool:
+    from nomadexclude import (
+        ExcludeError,
+        ExcludeStore,
+        add_names,
+        build_store,
+        open_store,
+    )
+
+    start_time: float = time.perf_counter()
+    failures: list[str] = []
+    names: list[str] = [f"Star {i}" for i in range(500)]
+    names += ["Ærø", " Padded ", "", "Star 7", "Zeta"]
+    expect: list[str] = sorted(
+        {n.strip() for n in names} - {""}, key=lambda n: n.encode("UTF-8")
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        path: str = os.path.join(tmp, "names.nexclude")
+        if add_names(path, names) != len(expect):
+            failures.append("add_names() miscounted a new store")
+        with open_store(path) as store:
+            if list(store) != expect or len(store) != len(expect):
+                failures.append("names do not read back sorted and unique")
+            missing: list[str] = [n for n in expect if n not in store]
+            if missing:
+                failures.append(f"{len(missing)} stored names not found")
+            found: list[str] = [f"Star {i}" for i in range(500, 5000)]
+            found = [n for n in found if n in store]
+            if found:
+                failures.append(f"{len(found)} names found that were never stored")
+        if add_names(path, ["Zeta", "Omega", "Star 501"]) != 2:
+            failures.append("add_names() miscounted an existing store")
+        with open_store(path) as store:
+            if "Omega" not in store or len(store) != len(expect) + 2:
+                failures.append("names added to a store are missing")
+
+        data: bytes = build_store(names)
+        with open(path, "wb") as f:
+            f.write(data[:-1])
+        _expect_error(
+            failures, "truncated file", ExcludeError, lambda: open_store(path)
+        )
+        with open(path, "wb") as f:
+            f.write(b"X" + data[1:])
+        _expect_error(failures, "bad magic", ExcludeError, lambda: open_store(path))
+    _expect_error(
+        failures, "short header", ExcludeError, lambda: ExcludeStore(data[:20])
+    )
+    return check("exclude store", failures, start_time)
+
+
+def test_compression() -> bool:
+    import bz2
+    import gzip
+    import io
+    import lzma
+
+    from nomadcompress import CODECS, BlockCompressor, open_compressed
+    from nomadsec import COMPRESSED_SUFFIXES
+
+    decompress: dict[str, Callable[[bytes], bytes]] = {
+        "gzip": gzip.decompress,
+        "bzip2": bz2.decompress,
+        "xz": lzma.decompress,
+    }
+    rng = random.Random(SEED)
+    text: bytes = "".join(
+        f"Star {rng.randrange(10**6)}\n" for _ in range(2000)
+    ).encode("UTF-8")
+    start_time: float = time.perf_counter()
+    failures: list[str] = []
+    if sorted(COMPRESSED_SUFFIXES) != sorted(codec.suffix for codec in CODECS):
+        failures.append("nomadsec.COMPRESSED_SUFFIXES does not match CODECS")
+    for codec in CODECS:
+        if codec.name not in decompress:
+            continue
+        # small blocks, so the sample spans many of them and a write
+        # can end anywhere in one
+        small = codec._replace(block_size=1000)
+        for data in (b"", b"x", text):
+            out = io.BytesIO()
+            with BlockCompressor(out, small, threads=3, closefd=False) as f:
+                for i in range(0, len(data), 777):
+                    f.write(data[i : i + 777])
+            if decompress[codec.name](out.getvalue()) != data:
+                failures.append(f"{codec.name}: {len(data)} bytes read back wrong")
+
+        # and by name, through open_compressed() both ways
+        with tempfile.TemporaryDirectory() as tmp:
+            path: str = os.path.join(tmp, "sector.csv" + codec.suffix)
+            with open_compressed(path, "w", encoding="UTF-8") as f:
+                f.write(text.decode("UTF-8"))
+            with open_compressed(path, encoding="UTF-8") as f:
+                if f.read().encode("UTF-8") != text:
+                    failures.append(f"{codec.name}: file read back wrong")
+    return check("compression", failures, start_time)
+
+
+def _sample_systems() -> Iterator[Planet]:
+    # the planets of a `-m` run, made one system at a time as they are
+    # written, as `nomadsec.py` streams them
+    random.seed(SEED)
+    systems = star_systems(SerialNameSet(), bounds=MAP_BOUNDS)
+    return (p for s in systems for p in s.planets)
+
+
+def test_arrow() -> bool:
+    import importlib.util
+
+    if importlib.util.find_spec("pyarrow") is None:
+        print("=== arrow ===")
+        print("SKIPPED (needs pyarrow)")
+        print("================")
+        return True
+
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+
+    from nomadout import write_as_arrow
+    from nomadtables import chara_str, tech_age_str, trade_class_str, world_tag_str
+
+    encoded: tuple[str, ...] = (
+        "trade_class",
+        "characteristic",
+        "technology_age",
+        "world_tag_1",
+        "world_tag_2",
+    )
+
+    def row(p: Planet) -> dict:
+        return {
+            "name": p.name,
+            "x": p.star.x,
+            "y": p.star.y,
+            "trade_class": trade_class_str(p.trade_class),
+            "characteristic": chara_str(p.chara),
+            "population": p.population,
+            "technology_age": tech_age_str(p.tech_age),
+            "world_tag_1": world_tag_str(p.world_tag_1) if p.world_tag_1 else None,
+            "world_tag_2": world_tag_str(p.world_tag_2) if p.world_tag_2 else None,
+        }
+
+    start_time: float = time.perf_counter()
+    failures: list[str] = []
+    random.seed(SEED)
+    planets: list[Planet] = sector(SerialNameSet(), bounds=MAP_BOUNDS)[0]
+    system_planets: list[Planet] = list(_sample_systems())
+    with tempfile.TemporaryDirectory() as tmp:
+        for parquet in (False, True):
+            for title, source, expect in (
+                ("sector", lambda: planets, planets),
+                ("streamed systems", _sample_systems, system_planets),
+            ):
+                what: str = f"{'Parquet' if parquet else 'Arrow'} {title}"
+                path: str = os.path.join(tmp, "sector.arrow")
+                # small batches, so the rows span several of them
+                with open(path, "wb") as f:
+                    write_as_arrow(f, source(), parquet=parquet, batch_size=50)
+                if parquet:
+                    table = pq.read_table(path)
+                else:
+                    with pa.memory_map(path) as source_file:
+                        table = pa.ipc.open_file(source_file).read_all()
+                for column in encoded:
+                    if not pa.types.is_dictionary(table.schema.field(column).type):
+                        failures.append(f"{what}: {column} is not dictionary-encoded")
+                if table.to_pylist() != [row(p) for p in expect]:
+                    failures.append(f"{what}: rows read back wrong")
+    return check("arrow", failures, start_time)
+
+
+def _close(a: float, b: float) -> bool:
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+
+
+def test_trade() -> bool:
+    from nomadgen import Sector, StarHex
+    from nomadtables import Characteristic, TechAge, TradeClass
+    from nomadtrade import GOODS, TradeNetwork, simulate
+
+    # a chain of systems two parsecs or less apart, one a jump beyond the
+    # chain's end and one on its own, each with a world of its own kind
+    worlds: tuple[tuple[int, int, TradeClass], ...] = (
+        (1, 1, TradeClass.AGRICULTURAL),
+        (2, 1, TradeClass.INDUSTRIAL),
+        (3, 2, TradeClass.NON_AGRICULTURAL),
+        (5, 2, TradeClass.RICH),
+        (6, 4, TradeClass.RESOURCE),
+        (12, 12, TradeClass.POOR),
+    )
+    stars: list[StarHex] = []
+    planets: list[Planet] = []
+    for x, y, trade_class in worlds:
+        star = StarHex(x=x, y=y, name=f"Star {x}-{y}")
+        stars.append(star)
+        planets.append(
+            Planet(
+                name=star.name,
+                star=star,
+                trade_class=trade_class,
+                chara=Characteristic.PRIME,
+                population=10_000_000,
+                tech_age=TechAge.LATE_SPACE,
+                world_tag_1=None,
+                world_tag_2=None,
+            )
+        )
+    network = TradeNetwork(Sector(SectorBounds(height=12, width=12), stars, planets))
+    routes = network.routes
+    senders = routes.row_indices()
+
+    start_time: float = time.perf_counter()
+    failures: list[str] = []
+    moved: list[float] = [0.0] * len(GOODS)
+    for turns in range(1, 6):
+        result = simulate(network, turns)
+        for g, good in enumerate(GOODS):
+            what: str = f"{good} after {turns} turns"
+            # whatever leaves a system arrives at another, and the routes
+            # carry exactly what each system sent and received
+            exported, imported = result.exported[g], result.imported[g]
+            if not _close(sum(exported), sum(imported)):
+                failures.append(
+                    f"{what}: shipped {sum(exported)}, arrived {sum(imported)}"
+                )
+            if sum(exported) < moved[g]:
+                failures.append(f"{what}: less shipped than in fewer turns")
+            moved[g] = sum(exported)
+            out: list[float] = [0.0] * len(stars)
+            into: list[float] = [0.0] * len(stars)
+            for k, amount in enumerate(result.route_flows[g]):
+                out[senders[k]] += amount
+                into[routes.indices[k]] += amount
+            for i, star in enumerate(stars):
+                if not _close(out[i], exported[i]):
+                    failures.append(f"{what}: routes from {star.name} != exported")
+                if not _close(into[i], imported[i]):
+                    failures.append(f"{what}: routes to {star.name} != imported")
+    if not all(moved):
+        failures.append(f"nothing moved of some good: {moved}")
+    return check("trade", failures, start_time)
+
+
+def test_options() -> bool:
+    import nomadoptions
+    from nomadgen import SUFFIX_SCHEMES
+    from nomadtables import SETTLEMENT_TYPE_NAMES, TECHNOLOGY_AGES_ABBREVS
+
+    # `nomadsec.py` offers these without importing the tables they index
+    start_time: float = time.perf_counter()
+    failures: list[str] = []
+    for name, choices, table in (
+        (
+            "SETTLEMENT_TYPE_CHOICES",
+            nomadoptions.SETTLEMENT_TYPE_CHOICES,
+            SETTLEMENT_TYPE_NAMES,
+        ),
+        (
+            "TECHNOLOGY_AGE_CHOICES",
+            nomadoptions.TECHNOLOGY_AGE_CHOICES,
+            TECHNOLOGY_AGES_ABBREVS,
+        ),
+        ("SUFFIX_SCHEME_CHOICES", nomadoptions.SUFFIX_SCHEME_CHOICES, SUFFIX_SCHEMES),
+    ):
+        if choices != tuple(table):
+            failures.append(f"nomadoptions.{name} does not match its table")
+    if nomadoptions.DEFAULT_SUFFIX_SCHEME not in SUFFIX_SCHEMES:
+        failures.append("nomadoptions.DEFAULT_SUFFIX_SCHEME is not a scheme")
+    return check("command-line choices", failures, start_time)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Check that the file formats read back what was written"
+    )
+    parser.parse_args()
+
+    start_time: float = time.perf_counter()
+    ok: bool = True
+    for fmt in WRITERS:
+        ok &= test_extract(fmt)
+    ok &= test_mask()
+    ok &= test_noise()
+    ok &= test_name_model()
+    ok &= test_name_index()
+    ok &= test_exclude_store()
+    ok &= test_compression()
+    ok &= test_trade()
+    ok &= test_arrow()
+    ok &= test_options()
+
+    print(f"{'ALL OK' if ok else 'FAILED'} ({time.perf_counter() - start_time:.3f} s)")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()